@@ -0,0 +1,365 @@
+"""Vectorized donation analytics for organizations.
+
+``DonationColumns`` keeps a columnar copy of the donations ledger under a
+cache directory: one flat little-endian file per column (donation_id,
+user_id, campaign_id, amount in cents, donation time in seconds) plus
+``manifest.json`` holding the row count and the highest donation_id copied.
+Reports memory-map the files; ``refresh`` streams only the donations above
+that watermark, in ``chunk_size`` chunks, and appends them, so repeat reports
+never rescan the table. ``DonationAnalytics`` computes totals by day, week or
+month, gift-size histograms, donor retention and goal progress with NumPy::
+
+    python analytics.py report --organization-id 8 [--cache-dir .analytics]
+    python analytics.py rebuild
+
+Only this module needs NumPy. The copy assumes donations are only ever
+appended; run ``rebuild`` after donations are deleted (e.g. with a campaign).
+``refresh`` stops at a missing donation_id until ``commit_lag`` seconds have
+passed (see ``watermarks.committed``), so late commits aren't skipped.
+"""
+import argparse
+import datetime
+import json
+import os
+from decimal import Decimal
+
+from database import Database
+from watermarks import COMMIT_LAG, committed, database_now
+
+try:
+    import numpy as np
+except ImportError:  # the rest of the code base runs without it
+    np = None
+
+COLUMNS = (
+    ("donation_id", "<i8"),
+    ("user_id", "<i8"),
+    ("campaign_id", "<i8"),
+    ("amount_cents", "<i8"),
+    ("donated_at", "<M8[s]"),
+)
+# Gift-size bucket edges in dollars; the last bucket is open-ended
+GIFT_BINS = (0, 10, 25, 50, 100, 250, 500, 1000, 5000)
+PERIODS = ("day", "week", "month")
+EPOCH = datetime.date(1970, 1, 1)
+
+def _dollars(cents):
+    return (Decimal(int(round(cents))) / 100).quantize(Decimal("0.01"))
+
+def _period_index(donated_at, period):
+    """Consecutive integers per day, Monday-based week or calendar month."""
+    if period == "month":
+        return donated_at.astype("datetime64[M]").astype(np.int64)
+    days = donated_at.astype("datetime64[D]").astype(np.int64)
+    if period == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (days + 3) // 7
+    return days
+
+def _period_start(index, period):
+    if period == "month":
+        return np.datetime64(int(index), "M").astype("datetime64[D]").item()
+    if period == "week":
+        return EPOCH + datetime.timedelta(days=int(index) * 7 - 3)
+    return EPOCH + datetime.timedelta(days=int(index))
+
+class DonationColumns:
+    """On-disk columnar copy of ``donations``, refreshed by donation_id watermark."""
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, db, directory, chunk_size=50000, commit_lag=COMMIT_LAG):
+        if np is None:
+            raise RuntimeError("Donation analytics needs NumPy (pip install numpy).")
+        self.__db = db
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.commit_lag = commit_lag
+        os.makedirs(directory, exist_ok=True)
+        self.__manifest = self.__read_manifest()
+        self.__maps = None
+        self.__check_files()
+
+    def __len__(self):
+        return self.__manifest["rows"]
+
+    @property
+    def last_donation_id(self):
+        return self.__manifest["last_donation_id"]
+
+    def __path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def __read_manifest(self):
+        path = os.path.join(self.directory, self.MANIFEST)
+        if not os.path.exists(path):
+            return {"rows": 0, "last_donation_id": 0}
+        with open(path, encoding="utf-8") as manifest:
+            return json.load(manifest)
+
+    def __write_manifest(self):
+        path = os.path.join(self.directory, self.MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as manifest:
+            json.dump(self.__manifest, manifest)
+        os.replace(path + ".tmp", path)
+
+    def __check_files(self):
+        """Cut off rows a refresh appended without recording them; start over if a column is short."""
+        rows = self.__manifest["rows"]
+        for name, dtype in COLUMNS:
+            path = self.__path(name)
+            expected = rows * np.dtype(dtype).itemsize
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < expected:
+                print(f"⚠️ Analytics cache column {name} is incomplete; it will be rebuilt.")
+                self.__reset()
+                return
+            if size > expected:
+                with open(path, "r+b") as column:
+                    column.truncate(expected)
+
+    def __reset(self):
+        self.__maps = None
+        for name, _ in COLUMNS:
+            if os.path.exists(self.__path(name)):
+                os.remove(self.__path(name))
+        self.__manifest = {"rows": 0, "last_donation_id": 0}
+        self.__write_manifest()
+
+    def __append(self, files, chunk):
+        donation_ids, user_ids, campaign_ids, amounts, dates = zip(*chunk)
+        arrays = (
+            np.array(donation_ids, dtype="<i8"),
+            np.array(user_ids, dtype="<i8"),
+            np.array([-1 if campaign_id is None else campaign_id for campaign_id in campaign_ids], dtype="<i8"),
+            np.rint(np.array(amounts, dtype=np.float64) * 100).astype("<i8"),
+            np.array(dates, dtype="<M8[s]"),
+        )
+        for column, array in zip(files, arrays):
+            array.tofile(column)
+        self.__manifest["rows"] += len(chunk)
+        self.__manifest["last_donation_id"] = int(donation_ids[-1])
+
+    def refresh(self):
+        """Append donations above the watermark; returns how many were added."""
+        query = """
+        SELECT donation_id, user_id, campaign_id, amount, donation_date
+        FROM donations
+        WHERE donation_id > %s
+        ORDER BY donation_id
+        """
+        before = self.__manifest["rows"]
+        with self.__db.transaction() as cursor:
+            now = database_now(cursor)
+        last_id = self.last_donation_id
+        stream = self.__db.stream(query, (last_id,), chunk_size=self.chunk_size)
+        files = [open(self.__path(name), "ab") for name, _ in COLUMNS]
+        try:
+            chunk = []
+            for row in committed(stream, last_id, now, self.commit_lag):
+                chunk.append(row)
+                if len(chunk) == self.chunk_size:
+                    self.__append(files, chunk)
+                    chunk = []
+            if chunk:
+                self.__append(files, chunk)
+        finally:
+            stream.close()
+            for column in files:
+                column.close()
+        added = self.__manifest["rows"] - before
+        if added:
+            self.__write_manifest()
+        return added
+
+    def rebuild(self):
+        """Drop the copy and extract every donation again."""
+        self.__reset()
+        return self.refresh()
+
+    def columns(self):
+        """Read-only memory maps of every column, keyed by column name."""
+        rows = self.__manifest["rows"]
+        if self.__maps is not None and self.__maps[0] == rows:
+            return self.__maps[1]
+        if rows == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        maps = {name: np.memmap(self.__path(name), dtype=dtype, mode="r", shape=(rows,)) for name, dtype in COLUMNS}
+        self.__maps = (rows, maps)
+        return maps
+
+class DonationAnalytics:
+    def __init__(self, db, cache_dir=".analytics", chunk_size=50000, commit_lag=COMMIT_LAG):
+        self.__db = db
+        self.columns = DonationColumns(db, cache_dir, chunk_size, commit_lag)
+        self.__by_campaign = None
+
+    def refresh(self):
+        """Bring the cached columns up to date; returns how many donations were added."""
+        return self.columns.refresh()
+
+    def __campaign_ids(self, organization_id):
+        rows = self.__db.fetch("SELECT campaign_id FROM campaigns WHERE user_id = %s", (organization_id,))
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def __campaign_rows(self, data, campaign_ids):
+        """Row numbers of the given campaigns' donations via a campaign-sorted permutation.
+
+        The permutation is rebuilt only when the cache has grown, so a
+        per-organization report reads its own rows instead of masking them all.
+        """
+        if self.__by_campaign is None or self.__by_campaign[0] != len(data["campaign_id"]):
+            order = np.argsort(data["campaign_id"], kind="stable")
+            self.__by_campaign = (len(order), order, data["campaign_id"][order])
+        _, order, sorted_campaigns = self.__by_campaign
+        starts = np.searchsorted(sorted_campaigns, campaign_ids, side="left")
+        ends = np.searchsorted(sorted_campaigns, campaign_ids, side="right")
+        return np.sort(np.concatenate([order[start:end] for start, end in zip(starts, ends)] + [order[:0]]))
+
+    def __select(self, organization_id=None, campaign_ids=None, start=None, end=None):
+        """Donation columns filtered to an organization/campaigns and a [start, end) time range."""
+        data = self.columns.columns()
+        if organization_id is not None or campaign_ids is not None:
+            wanted = self.__campaign_ids(organization_id) if organization_id is not None else None
+            if campaign_ids is not None:
+                campaign_ids = np.array(list(campaign_ids), dtype=np.int64)
+                wanted = campaign_ids if wanted is None else np.intersect1d(wanted, campaign_ids)
+            rows = self.__campaign_rows(data, np.unique(wanted))
+            data = {name: column[rows] for name, column in data.items()}
+        donated_at = data["donated_at"]
+        mask = ~np.isnat(donated_at)
+        if start is not None:
+            mask &= donated_at >= np.datetime64(start, "s")
+        if end is not None:
+            mask &= donated_at < np.datetime64(end, "s")
+        return {name: column[mask] for name, column in data.items()}
+
+    def totals_by_period(self, period="day", **filters):
+        """Return ``(period_start, total, count)`` rows, oldest first."""
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        data = self.__select(**filters)
+        keys, inverse = np.unique(_period_index(data["donated_at"], period), return_inverse=True)
+        totals = np.bincount(inverse, weights=data["amount_cents"], minlength=len(keys))
+        counts = np.bincount(inverse, minlength=len(keys))
+        return [(_period_start(key, period), _dollars(total), int(count))
+                for key, total, count in zip(keys, totals, counts)]
+
+    def gift_histogram(self, bins=GIFT_BINS, **filters):
+        """Return ``(low, high, count, total)`` per gift-size bucket; ``high`` is None for the last."""
+        data = self.__select(**filters)
+        edges = np.array([int(Decimal(str(edge)) * 100) for edge in bins], dtype=np.int64)
+        buckets = np.clip(np.searchsorted(edges, data["amount_cents"], side="right") - 1, 0, len(edges) - 1)
+        counts = np.bincount(buckets, minlength=len(edges))
+        totals = np.bincount(buckets, weights=data["amount_cents"], minlength=len(edges))
+        highs = list(edges[1:]) + [None]
+        return [(_dollars(low), None if high is None else _dollars(high), int(count), _dollars(total))
+                for low, high, count, total in zip(edges, highs, counts, totals)]
+
+    def donor_retention(self, period="month", **filters):
+        """Return ``(period_start, active, new, retained, retention_rate)`` rows.
+
+        ``retained`` counts donors who also gave in the previous period and
+        ``retention_rate`` divides it by that period's active donors (None when
+        nobody gave then).
+        """
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        data = self.__select(**filters)
+        pairs = np.unique((_period_index(data["donated_at"], period) << 32) | data["user_id"])
+        periods, users = pairs >> 32, pairs & 0xFFFFFFFF
+        # Sort by donor, then period: a donor's first row is new, a row one period after the last is retained
+        order = np.lexsort((periods, users))
+        users, periods = users[order], periods[order]
+        same_donor = np.r_[False, users[1:] == users[:-1]]
+        retained = same_donor & np.r_[False, periods[1:] - periods[:-1] == 1]
+
+        keys, inverse = np.unique(periods, return_inverse=True)
+        active = np.bincount(inverse, minlength=len(keys))
+        new = np.bincount(inverse, weights=~same_donor, minlength=len(keys))
+        kept = np.bincount(inverse, weights=retained, minlength=len(keys))
+        active_by_period = dict(zip(keys.tolist(), active.tolist()))
+        rows = []
+        for key, active_count, new_count, kept_count in zip(keys.tolist(), active, new, kept):
+            previous = active_by_period.get(key - 1, 0)
+            rate = kept_count / previous if previous else None
+            rows.append((_period_start(key, period), int(active_count), int(new_count), int(kept_count), rate))
+        return rows
+
+    def goal_progress(self, organization_id):
+        """Return ``(campaign_id, title, goal, raised, progress, donors)`` for each of the organization's campaigns.
+
+        ``raised`` is summed from the cached ledger, ``progress`` is raised / goal.
+        """
+        campaigns = self.__db.fetch(
+            "SELECT campaign_id, title, goal_amount FROM campaigns WHERE user_id = %s ORDER BY campaign_id",
+            (organization_id,))
+        if not campaigns:
+            return []
+        ids = np.array([row[0] for row in campaigns], dtype=np.int64)
+        data = self.__select(campaign_ids=ids)
+        positions = np.searchsorted(ids, data["campaign_id"])
+        raised = np.bincount(positions, weights=data["amount_cents"], minlength=len(ids))
+        donor_pairs = np.unique((positions.astype(np.int64) << 32) | data["user_id"])
+        donors = np.bincount(donor_pairs >> 32, minlength=len(ids))
+        rows = []
+        for (campaign_id, title, goal), cents, donor_count in zip(campaigns, raised, donors):
+            goal = Decimal(str(goal)).quantize(Decimal("0.01"))
+            amount = _dollars(cents)
+            progress = float(amount / goal) if goal else None
+            rows.append((campaign_id, title, goal, amount, progress, int(donor_count)))
+        return rows
+
+    def report(self, organization_id, period="week", last=12):
+        """Refresh the cache and print an organization's trend, gift-size, retention and goal report."""
+        try:
+            added = self.refresh()
+            print(f"ℹ️ Analytics cache: {len(self.columns):,} donations ({added:,} new).")
+
+            totals = self.totals_by_period(period, organization_id=organization_id)[-last:]
+            if not totals:
+                print("ℹ️ No donations to your campaigns yet.")
+                return
+            print(f"\n📈 Donations by {period}:")
+            for start, total, count in totals:
+                print(f"   {start}: ${total:,.2f} from {count:,} donations")
+
+            print("\n🎁 Gift sizes:")
+            for low, high, count, total in self.gift_histogram(organization_id=organization_id):
+                label = f"${low:,.0f}+" if high is None else f"${low:,.0f}-{high:,.0f}"
+                print(f"   {label:>14}: {count:,} gifts, ${total:,.2f}")
+
+            print("\n🔁 Monthly donor retention:")
+            for start, active, new, retained, rate in self.donor_retention(organization_id=organization_id)[-last:]:
+                rate_text = "n/a" if rate is None else f"{rate:.0%}"
+                print(f"   {start:%Y-%m}: {active:,} donors, {new:,} new, {retained:,} returning ({rate_text})")
+
+            print("\n🎯 Goal progress:")
+            for campaign_id, title, goal, raised, progress, donors in self.goal_progress(organization_id):
+                progress_text = "n/a" if progress is None else f"{progress:.0%}"
+                print(f"   {campaign_id} {title}: ${raised:,.2f} of ${goal:,.2f} ({progress_text}) from {donors:,} donors")
+        except Exception as e:
+            print(f"❌ Error building the analytics report: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report", "rebuild"])
+    parser.add_argument("--organization-id", type=int)
+    parser.add_argument("--cache-dir", default=".analytics")
+    parser.add_argument("--period", choices=PERIODS, default="week")
+    args = parser.parse_args()
+    if args.command == "report" and args.organization_id is None:
+        parser.error("report needs --organization-id")
+
+    db = Database()
+    try:
+        analytics = DonationAnalytics(db, args.cache_dir)
+        if args.command == "rebuild":
+            print(f"✅ Extracted {analytics.columns.rebuild():,} donations.")
+        else:
+            analytics.report(args.organization_id, args.period)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
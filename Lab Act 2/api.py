@@ -0,0 +1,473 @@
+"""JSON HTTP API over the donation system.
+
+Serves the operations of the interactive dashboards as JSON endpoints. Each
+request is handled on a fixed pool of worker threads and every worker shares
+one ``Database`` connection pool and one campaign cache::
+
+    python api.py [--host 127.0.0.1] [--port 8000] [--workers 16]
+
+``POST /login`` returns a session token. Routes marked * need it in an
+``Authorization: Bearer <token>`` header and act as the token's user: a
+``<user_id>`` in their path must be that user, and none of them take a
+user_id in the body. Creating campaigns and events also needs an
+organization account. Tokens expire after ``SESSION_TTL`` seconds.
+
+Routes::
+
+    POST   /users                          register {name, email, password, role}
+    POST   /login                          {email, password}
+  * POST   /logout
+  * GET    /users/<user_id>/balance
+  * GET    /users/<user_id>/donations      ?page_size=&after_date=&after_id=
+  * GET    /users/<user_id>/volunteering
+    GET    /campaigns                      active campaigns
+  * POST   /campaigns                      {title, description, goal_amount, deadline}
+    GET    /campaigns/<id>
+  * POST   /donations                      {campaign_id, amount}
+    GET    /events                         ?start=&end=&location=&status=&user_id= (status=any; not joined)
+  * POST   /events                         {title, description, date, location}
+    GET    /events/<id>/volunteers         ?page_size=&after_date=&after_id=
+  * POST   /events/<id>/volunteers
+  * DELETE /events/<id>/volunteers/<user_id>
+    GET    /organizations/<id>/campaigns   campaigns with donation stats
+    GET    /organizations/<id>/events      events with their volunteers
+    GET    /stats                          pool, cache and query metrics
+"""
+import argparse
+import datetime
+import json
+import logging
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cache import TTLCache
+from campaign import Campaign
+from database import Database
+from donation import Donation
+from event import Event
+from event_index import EventIndex
+from migrations import MigrationRunner
+from user import User
+
+USER_COLUMNS = ("user_id", "name", "email", "role")
+CAMPAIGN_COLUMNS = ("campaign_id", "title", "description", "goal_amount", "funds_raised", "deadline", "status",
+                    "user_id")
+MY_CAMPAIGN_COLUMNS = ("campaign_id", "title", "funds_raised", "last_donation_at", "donation_count",
+                       "unique_donors", "largest_gift")
+EVENT_COLUMNS = ("event_id", "name", "description", "date", "location")
+FOUND_EVENT_COLUMNS = EVENT_COLUMNS + ("volunteer_count",)
+MY_EVENT_COLUMNS = EVENT_COLUMNS + ("volunteers",)
+DONATION_COLUMNS = ("campaign_id", "amount", "donation_date", "donation_id")
+VOLUNTEER_COLUMNS = ("name", "volunteer_date", "volunteer_id")
+VOLUNTEERING_COLUMNS = ("event_id", "name", "date", "location", "volunteer_name")
+MAX_PAGE_SIZE = 500
+# Largest request body read into memory
+MAX_BODY_BYTES = 1024 * 1024
+CENT = Decimal("0.01")
+# Seconds a login token stays valid
+SESSION_TTL = 8 * 60 * 60
+
+api_logger = logging.getLogger("donations.api")
+
+def session_key(token):
+    return ("api_session", token)
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _rows(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+def _page(columns, rows, page_size, date_index, id_index):
+    """A keyset page plus the cursor to request the next one."""
+    next_page = None
+    if len(rows) == page_size:
+        next_page = {"after_date": rows[-1][date_index], "after_id": rows[-1][id_index]}
+    return {"items": _rows(columns, rows), "next": next_page}
+
+class DonationService:
+    """Maps API routes onto the domain classes."""
+
+    def __init__(self, db, cache=None, event_index=None, sessions=None):
+        self.db = db
+        self.cache = cache
+        # token -> (user_id, role); kept apart from the data cache so invalidations never log anyone out
+        self.sessions = sessions if sessions is not None else TTLCache(ttl=SESSION_TTL, max_entries=100000)
+        self.user = User(db)
+        self.campaign = Campaign(db, cache)
+        self.donation = Donation(db, cache)
+        self.event = Event(db, cache, index=event_index)
+        # The last field marks the routes that act as the logged-in user
+        self.routes = [
+            ("POST", r"/users", self.register, False),
+            ("POST", r"/login", self.login, False),
+            ("POST", r"/logout", self.logout, True),
+            ("GET", r"/users/(\d+)/balance", self.balance, True),
+            ("GET", r"/users/(\d+)/donations", self.donation_history, True),
+            ("GET", r"/users/(\d+)/volunteering", self.volunteering, True),
+            ("GET", r"/campaigns", self.active_campaigns, False),
+            ("POST", r"/campaigns", self.create_campaign, True),
+            ("GET", r"/campaigns/(\d+)", self.get_campaign, False),
+            ("POST", r"/donations", self.donate, True),
+            ("GET", r"/events", self.active_events, False),
+            ("POST", r"/events", self.create_event, True),
+            ("GET", r"/events/(\d+)/volunteers", self.volunteers, False),
+            ("POST", r"/events/(\d+)/volunteers", self.volunteer, True),
+            ("DELETE", r"/events/(\d+)/volunteers/(\d+)", self.opt_out, True),
+            ("GET", r"/organizations/(\d+)/campaigns", self.organization_campaigns, False),
+            ("GET", r"/organizations/(\d+)/events", self.organization_events, False),
+            ("GET", r"/stats", self.stats, False),
+        ]
+        self.routes = [(method, re.compile(pattern + r"/?$"), handler, authenticated)
+                       for method, pattern, handler, authenticated in self.routes]
+
+    def dispatch(self, method, path, query, body, token=None):
+        """Return ``(status, payload)`` for one request; ``token`` is the bearer token, if any."""
+        allowed = False
+        for route_method, pattern, handler, authenticated in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            kwargs = {"query": query, "body": body}
+            if authenticated:
+                kwargs.update(user=self._authenticate(token), token=token)
+            return handler(*(int(group) for group in match.groups()), **kwargs)
+        if allowed:
+            raise ApiError(405, f"{method} is not allowed on {path}")
+        raise ApiError(404, f"No route for {path}")
+
+    def _session(self, token):
+        """``(user_id, role)`` of the user the session token was issued to."""
+        found, session = self.sessions.get(session_key(token)) if token else (False, None)
+        if not found:
+            raise ApiError(401, "Log in and send the session token as 'Authorization: Bearer <token>'")
+        return session
+
+    def _authenticate(self, token):
+        return self._session(token)[0]
+
+    def _require_organization(self, token):
+        if self._session(token)[1] != "organization":
+            raise ApiError(403, "Only organizations can do this")
+
+    @staticmethod
+    def _same_user(user_id, user):
+        if user_id != user:
+            raise ApiError(403, "The session belongs to another user")
+
+    @staticmethod
+    def _require(body, *fields):
+        missing = [field for field in fields if body.get(field) in (None, "")]
+        if missing:
+            raise ApiError(400, f"Missing fields: {', '.join(missing)}")
+        return [body[field] for field in fields]
+
+    @staticmethod
+    def _int(query, name, default=None):
+        values = query.get(name)
+        if not values:
+            return default
+        try:
+            return int(values[0])
+        except ValueError:
+            raise ApiError(400, f"{name} must be an integer")
+
+    def _page_size(self, query, default):
+        """``page_size`` clamped to 1..MAX_PAGE_SIZE."""
+        return max(1, min(self._int(query, "page_size", default), MAX_PAGE_SIZE))
+
+    @staticmethod
+    def _id(body, name):
+        value = body[name]
+        if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+            raise ApiError(400, f"{name} must be a positive integer")
+        return int(value)
+
+    @staticmethod
+    def _amount(value, name="amount"):
+        if isinstance(value, bool):
+            raise ApiError(400, f"{name} must be a number")
+        try:
+            amount = Decimal(str(value))
+        except InvalidOperation:
+            raise ApiError(400, f"{name} must be a number")
+        # NaN and Infinity parse as Decimals but no column can store them
+        if not amount.is_finite():
+            raise ApiError(400, f"{name} must be a number")
+        if amount <= 0:
+            raise ApiError(400, f"{name} must be positive")
+        if amount != amount.quantize(CENT):
+            raise ApiError(400, f"{name} can't have more than two decimal places")
+        return amount
+
+    @staticmethod
+    def _date(query, name):
+        value = query.get(name, [None])[0]
+        if value is None:
+            return None
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise ApiError(400, f"{name} must be an ISO date")
+
+    def _after(self, query):
+        after_id = self._int(query, "after_id")
+        after_date = query.get("after_date", [None])[0]
+        if after_id is None or after_date is None:
+            return None
+        try:
+            return datetime.datetime.fromisoformat(after_date), after_id
+        except ValueError:
+            raise ApiError(400, "after_date must be an ISO timestamp")
+
+    # Users
+    def register(self, query, body):
+        name, email, password, role = self._require(body, "name", "email", "password", "role")
+        if role not in ("donor", "organization"):
+            raise ApiError(400, "role must be 'donor' or 'organization'")
+        user_id = self.user.register(name, email, password, role)
+        if not user_id:
+            raise ApiError(409, "Registration failed")
+        return 201, {"user_id": user_id}
+
+    def login(self, query, body):
+        email, password = self._require(body, "email", "password")
+        result = self.user.login(email, password)
+        if not result:
+            raise ApiError(401, "Invalid email or password")
+        token = secrets.token_urlsafe(32)
+        self.sessions.set(session_key(token), (result[0][0], result[0][3]))
+        return 200, {"user": dict(zip(USER_COLUMNS, result[0])), "token": token}
+
+    def logout(self, query, body, user, token):
+        self.sessions.invalidate(session_key(token))
+        return 200, {"ok": True}
+
+    def balance(self, user_id, query, body, user, token):
+        self._same_user(user_id, user)
+        return 200, {"user_id": user_id, "balance": self.user.get_balance(user_id)}
+
+    def donation_history(self, user_id, query, body, user, token):
+        self._same_user(user_id, user)
+        page_size = self._page_size(query, 50)
+        rows = self.donation.get_donation_history_page(user_id, page_size, self._after(query))
+        return 200, _page(DONATION_COLUMNS, rows, page_size, 2, 3)
+
+    def volunteering(self, user_id, query, body, user, token):
+        self._same_user(user_id, user)
+        return 200, {"items": _rows(VOLUNTEERING_COLUMNS, self.event.get_volunteer_history(user_id))}
+
+    # Campaigns and donations
+    def active_campaigns(self, query, body):
+        return 200, {"items": _rows(CAMPAIGN_COLUMNS, self.campaign.get_active_campaigns())}
+
+    def get_campaign(self, campaign_id, query, body):
+        campaign = self.campaign.get_campaign(campaign_id)
+        if campaign is None:
+            raise ApiError(404, f"Campaign ID {campaign_id} does not exist.")
+        return 200, dict(zip(CAMPAIGN_COLUMNS, campaign))
+
+    def create_campaign(self, query, body, user, token):
+        self._require_organization(token)
+        title, description, goal_amount, deadline = self._require(
+            body, "title", "description", "goal_amount", "deadline")
+        if not self.campaign.create_campaign(user, title, description, self._amount(goal_amount, "goal_amount"), deadline):
+            raise ApiError(400, "Campaign creation failed")
+        return 201, {"ok": True}
+
+    def donate(self, query, body, user, token):
+        _, amount = self._require(body, "campaign_id", "amount")
+        ok, message = self.donation.donate(user, self._id(body, "campaign_id"), self._amount(amount))
+        if not ok:
+            raise ApiError(409, message)
+        return 201, {"ok": True, "message": message}
+
+    # Events
+    def active_events(self, query, body):
+        page_size = self._page_size(query, 50)
+        after = self._after(query)
+        if after is not None:
+            # Events are paged by their DATE column
+            after = (after[0].date(), after[1])
+        status = query.get("status", ["active"])[0]
+        rows = self.event.find_events(
+            self._date(query, "start"), self._date(query, "end"), query.get("location", [None])[0],
+            None if status == "any" else status, self._int(query, "user_id"), page_size, after)
+        return 200, _page(FOUND_EVENT_COLUMNS, rows, page_size, 3, 0)
+
+    def create_event(self, query, body, user, token):
+        self._require_organization(token)
+        title, description, date, location = self._require(body, "title", "description", "date", "location")
+        if not self.event.create_event(user, title, description, date, location):
+            raise ApiError(400, "Event creation failed")
+        return 201, {"ok": True}
+
+    def volunteers(self, event_id, query, body):
+        page_size = self._page_size(query, 100)
+        rows = self.event.get_volunteers_page(event_id, page_size, self._after(query))
+        return 200, _page(VOLUNTEER_COLUMNS, rows, page_size, 1, 2)
+
+    def volunteer(self, event_id, query, body, user, token):
+        ok, message = self.event.volunteer(user, event_id)
+        if not ok:
+            raise ApiError(409, message)
+        return 201, {"ok": True, "message": message}
+
+    def opt_out(self, event_id, user_id, query, body, user, token):
+        self._same_user(user_id, user)
+        ok, message = self.event.opt_out(user_id, event_id)
+        if not ok:
+            raise ApiError(404, message)
+        return 200, {"ok": True, "message": message}
+
+    # Organizations
+    def organization_campaigns(self, user_id, query, body):
+        return 200, {"items": _rows(MY_CAMPAIGN_COLUMNS, self.campaign.get_my_campaign_donations(user_id))}
+
+    def organization_events(self, user_id, query, body):
+        return 200, {"items": _rows(MY_EVENT_COLUMNS, self.event.get_my_events(user_id))}
+
+    def stats(self, query, body):
+        return 200, {
+            "pool": self.db.pool_stats(),
+            "statements": self.db.statement_cache_stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "queries": self.db.query_stats(),
+        }
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Drop idle keep-alive connections so they don't pin a worker forever
+    timeout = 30
+    # Headers and body go out as separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def __send(self, status, payload):
+        data = json.dumps(payload, default=_json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __content_length(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            # The body stays unread, so the connection can't carry another request
+            self.close_connection = True
+            if length < 0:
+                raise ApiError(400, "Content-Length must be a non-negative integer")
+            raise ApiError(413, f"Request body is larger than {MAX_BODY_BYTES} bytes")
+        return length
+
+    def __handle(self, method):
+        url = urlsplit(self.path)
+        try:
+            length = self.__content_length()
+            body = {}
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    raise ApiError(400, "Request body must be JSON")
+                if not isinstance(body, dict):
+                    raise ApiError(400, "Request body must be a JSON object")
+            scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+            token = token.strip() if scheme.lower() == "bearer" else None
+            status, payload = self.service.dispatch(method, url.path, parse_qs(url.query), body, token)
+        except ApiError as e:
+            status, payload = e.status, {"error": e.message}
+        except Exception:
+            # Details stay in the server log; they can include SQL and driver messages
+            api_logger.exception("%s %s failed", method, url.path)
+            status, payload = 500, {"error": "Internal error"}
+        self.__send(status, payload)
+
+    def do_GET(self):
+        self.__handle("GET")
+
+    def do_POST(self):
+        self.__handle("POST")
+
+    def do_DELETE(self):
+        self.__handle("DELETE")
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that handles connections on a fixed pool of worker threads."""
+
+    def __init__(self, address, handler_class, workers=16):
+        super().__init__(address, handler_class)
+        self.workers = workers
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.__executor.submit(self.__process, request, client_address)
+
+    def __process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.__executor.shutdown(wait=True)
+
+def make_server(db, cache=None, host="127.0.0.1", port=8000, workers=16, event_index=None):
+    """Build a server bound to ``host:port`` (port 0 picks a free one)."""
+    handler = type("DonationApiHandler", (ApiRequestHandler,),
+                   {"service": DonationService(db, cache, event_index)})
+    return PooledHTTPServer((host, port), handler, workers)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    # One pooled connection per worker, so requests never wait on each other for one
+    db = Database(pool_size=args.workers)
+    try:
+        MigrationRunner(db).migrate()
+        server = make_server(db, TTLCache(ttl=60), args.host, args.port, args.workers, EventIndex(db))
+        print(f"🌐 Serving on http://{args.host}:{server.server_address[1]} with {args.workers} workers")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""asyncio access to the database.
+
+``AsyncDatabase`` offers the ``Database`` interface (execute, fetch,
+fetch_one, transaction) as coroutines. With aiomysql installed and a MySQL
+backend, statements run on an aiomysql connection pool. Otherwise each call
+runs the synchronous ``Database`` on a thread pool with one worker per
+pooled connection, so backends without an asyncio driver (SQLite, or MySQL
+without aiomysql) still never block the event loop.
+
+A transaction holds its pooled connection across ``await``s, so in the
+thread-pool mode every transaction runs on a thread of its own, taken from
+``pool_size`` single-thread executors. Single statements waiting for a
+connection on the shared workers then can't starve the transaction that
+holds it.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from backends import backend_from_env
+from database import Database
+from instrumentation import QueryInstrumentation
+
+try:
+    import aiomysql
+except ImportError:  # the thread-pool fallback works without it
+    aiomysql = None
+
+class AsyncCursor:
+    """Cursor proxy whose statement and fetch methods are coroutines."""
+
+    def __init__(self, cursor, run, instrumentation=None):
+        self.__cursor = cursor
+        self.__run = run
+        self.__instrumentation = instrumentation
+
+    @property
+    def rowcount(self):
+        return self.__cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.__cursor.lastrowid
+
+    async def __timed(self, query, method, *args):
+        started = time.perf_counter()
+        try:
+            result = await self.__run(method, query, *args)
+        except Exception as e:
+            if self.__instrumentation is not None:
+                self.__instrumentation.record(query, (time.perf_counter() - started) * 1000, 0, error=str(e))
+            raise
+        if self.__instrumentation is not None:
+            self.__instrumentation.record(query, (time.perf_counter() - started) * 1000,
+                                          max(self.__cursor.rowcount or 0, 0))
+        return result
+
+    async def execute(self, query, values=None):
+        return await self.__timed(query, self.__cursor.execute, values or ())
+
+    async def executemany(self, query, seq_values):
+        return await self.__timed(query, self.__cursor.executemany, seq_values)
+
+    async def fetchone(self):
+        return await self.__run(self.__cursor.fetchone)
+
+    async def fetchmany(self, size):
+        return await self.__run(self.__cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await self.__run(self.__cursor.fetchall)
+
+class AsyncDatabase:
+    """Coroutine counterpart of ``Database``; use ``await open()`` or ``async with``.
+
+    Errors are printed and swallowed by execute/fetch/fetch_one exactly like
+    the synchronous class; ``transaction`` re-raises so callers can report.
+    """
+
+    def __init__(self, pool_size=5, backend=None, **connect_args):
+        self.backend = backend or backend_from_env(**connect_args)
+        self.dialect = self.backend.name
+        self.pool_size = pool_size
+        self.instrumentation = None
+        self.__db = None
+        self.__executor = None
+        self.__transaction_threads = None
+        self.__pool = None
+
+    @property
+    def uses_native_driver(self):
+        return self.__pool is not None
+
+    async def open(self):
+        if aiomysql is not None and self.dialect == "mysql":
+            config = self.backend.config
+            self.__pool = await aiomysql.create_pool(
+                minsize=self.pool_size, maxsize=self.pool_size, host=config["host"], user=config["user"],
+                password=config["password"], db=config["database"], autocommit=True,
+            )
+            self.instrumentation = QueryInstrumentation()
+            print("✅ Connected to the database (asyncio driver).")
+        else:
+            # Connecting pre-warms the pool, so keep it off the event loop too
+            self.__db = await asyncio.to_thread(Database, self.pool_size, backend=self.backend)
+            self.pool_size = self.__db.pool_size
+            self.instrumentation = self.__db.instrumentation
+            self.__executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="async-db")
+            self.__transaction_threads = asyncio.Queue()
+            for _ in range(self.pool_size):
+                self.__transaction_threads.put_nowait(
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-db-transaction"))
+        return self
+
+    async def close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+            await self.__pool.wait_closed()
+            self.__pool = None
+            print("🔒 Database connection closed.")
+        if self.__db is not None:
+            await self.__in_thread(self.__db.close)
+            self.__executor.shutdown(wait=True)
+            while not self.__transaction_threads.empty():
+                self.__transaction_threads.get_nowait().shutdown(wait=True)
+            self.__db = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def __in_thread(self, func, *args, executor=None):
+        return await asyncio.get_running_loop().run_in_executor(executor or self.__executor, func, *args)
+
+    @staticmethod
+    async def __awaited(func, *args):
+        return await func(*args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Async version of ``Database.transaction``; yields an ``AsyncCursor``."""
+        if self.__pool is not None:
+            async with self.__pool.acquire() as connection:
+                await connection.begin()
+                async with connection.cursor() as cursor:
+                    try:
+                        yield AsyncCursor(cursor, self.__awaited, self.instrumentation)
+                        await connection.commit()
+                    except BaseException:
+                        await connection.rollback()
+                        raise
+            return
+
+        executor = await self.__transaction_threads.get()
+        try:
+            def run(func, *args):
+                return self.__in_thread(func, *args, executor=executor)
+
+            context = self.__db.transaction()
+            cursor = await run(context.__enter__)
+            try:
+                yield AsyncCursor(cursor, run)
+            except BaseException as e:
+                if not await run(context.__exit__, type(e), e, e.__traceback__):
+                    raise
+            else:
+                await run(context.__exit__, None, None, None)
+        finally:
+            self.__transaction_threads.put_nowait(executor)
+
+    async def __run_statement(self, kind, query, values):
+        # The pool connects with autocommit, so a lone statement needs no BEGIN and COMMIT round trips
+        async with self.__pool.acquire() as connection, connection.cursor() as raw_cursor:
+            cursor = AsyncCursor(raw_cursor, self.__awaited, self.instrumentation)
+            await cursor.execute(query, values)
+            if kind == "execute":
+                return cursor.lastrowid
+            if kind == "fetch_one":
+                return await cursor.fetchone()
+            return await cursor.fetchall()
+
+    async def execute(self, query, values=None):
+        if self.__pool is None:
+            return await self.__in_thread(self.__db.execute, query, values)
+        try:
+            return await self.__run_statement("execute", query, values)
+        except Exception as e:
+            print(f"❌ ERROR: {self.backend.label} execution failed: {e}")
+
+    async def fetch(self, query, values=None):
+        if self.__pool is None:
+            return await self.__in_thread(self.__db.fetch, query, values)
+        try:
+            return list(await self.__run_statement("fetch", query, values))
+        except Exception as e:
+            print(f"❌ ERROR: {self.backend.label} fetch failed: {e}")
+        return []
+
+    async def fetch_one(self, query, values=None):
+        if self.__pool is None:
+            return await self.__in_thread(self.__db.fetch_one, query, values)
+        try:
+            return await self.__run_statement("fetch_one", query, values)
+        except Exception as e:
+            print(f"❌ ERROR: {self.backend.label} fetch_one failed: {e}")
+        return None
+
+    def query_stats(self):
+        return self.instrumentation.snapshot() if self.instrumentation else {}
@@ -0,0 +1,162 @@
+"""asyncio counterparts of the domain classes.
+
+The methods return data instead of printing it and run the same SQL as
+``Campaign``, ``Donation``, ``Event`` and ``User`` on an ``AsyncDatabase``.
+``donor_dashboard`` shows the point of the async layer: the balance, active
+campaigns, open events and recent donations are independent queries, so they
+run concurrently on one event loop.
+"""
+import asyncio
+
+from cache import ACTIVE_CAMPAIGNS, campaign_key, invalidate_campaigns
+from campaign_stats import record_donation_async
+from donation import CREDIT_CAMPAIGN, DEBIT_BALANCE, INSERT_DONATION, INSUFFICIENT_BALANCE
+from leaderboard import record_donor_async
+from passwords import default_hasher
+
+class _DonationRejected(Exception):
+    """Raised inside a donation transaction to roll it back with a user-facing message."""
+
+async def _cached_fetch(db, cache, key, query, values=None):
+    if cache is None:
+        return await db.fetch(query, values)
+    found, rows = cache.get(key)
+    if not found:
+        rows = await db.fetch(query, values)
+        cache.set(key, rows)
+    return rows
+
+class AsyncUser:
+    def __init__(self, db, hasher=None):
+        self.__db = db
+        self.__hasher = hasher
+
+    async def login(self, email, password):
+        """Same lookup and rehash as ``User.login``; the hash checks are awaited, not run on the loop."""
+        hasher = self.__hasher or default_hasher()
+        query = "SELECT user_id, name, email, role, password FROM users WHERE email = %s ORDER BY user_id"
+        result = await self.__db.fetch(query, (email,))
+        if not result:
+            await asyncio.wrap_future(hasher.check_future(password, hasher.decoy))
+            return None
+        for row in result:
+            ok, new_hash = await asyncio.wrap_future(hasher.check_future(password, row[4]))
+            if not ok:
+                continue
+            if new_hash:
+                await self.__db.execute("UPDATE users SET password = %s WHERE user_id = %s AND password = %s",
+                                        (new_hash, row[0], row[4]))
+            return tuple(row[:4]), True
+        return None
+
+    async def get_balance(self, user_id):
+        result = await self.__db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (user_id,))
+        return result[0] if result else 0
+
+class AsyncCampaign:
+    def __init__(self, db, cache=None):
+        self.__db = db
+        self.__cache = cache
+
+    async def get_active_campaigns(self):
+        query = "SELECT * FROM campaigns WHERE status = 'active'"
+        return await _cached_fetch(self.__db, self.__cache, ACTIVE_CAMPAIGNS, query)
+
+    async def get_campaign(self, campaign_id):
+        query = "SELECT * FROM campaigns WHERE campaign_id = %s"
+        rows = await _cached_fetch(self.__db, self.__cache, campaign_key(campaign_id), query, (campaign_id,))
+        return rows[0] if rows else None
+
+    async def get_my_campaigns(self, user_id):
+        query = "SELECT title, description, goal_amount, funds_raised, deadline FROM campaigns WHERE user_id = %s"
+        return await self.__db.fetch(query, (user_id,))
+
+class AsyncDonation:
+    def __init__(self, db, cache=None):
+        self.__db = db
+        self.__cache = cache
+
+    async def donate_with_payment(self, user_id, campaign_id, amount):
+        """Async ``Donation.donate_with_payment``; returns ``(ok, message)``."""
+        try:
+            async with self.__db.transaction() as cursor:
+                await cursor.execute(DEBIT_BALANCE, (amount, user_id, amount))
+                if cursor.rowcount == 0:
+                    raise _DonationRejected(INSUFFICIENT_BALANCE)
+
+                await cursor.execute(CREDIT_CAMPAIGN, (amount, campaign_id))
+                if cursor.rowcount == 0:
+                    raise _DonationRejected(f"❌ Campaign ID {campaign_id} does not exist.")
+
+                await record_donation_async(cursor, user_id, campaign_id, amount)
+                await record_donor_async(cursor, user_id, amount)
+                await cursor.execute(INSERT_DONATION, (user_id, campaign_id, amount))
+            invalidate_campaigns(self.__cache, campaign_id)
+            return True, f"✅ Successfully donated ${amount:.2f} to campaign ID: {campaign_id}"
+        except _DonationRejected as e:
+            return False, str(e)
+        except Exception as e:
+            return False, f"❌ Donation failed due to an error: {e}"
+
+    async def get_total_donations(self, campaign_id):
+        result = await self.__db.fetch_one("SELECT funds_raised FROM campaigns WHERE campaign_id = %s", (campaign_id,))
+        return result[0] if result else 0.00
+
+    async def get_donation_history_page(self, user_id, page_size=50, after=None):
+        """Async ``Donation.get_donation_history_page`` (keyset pagination)."""
+        if after is None:
+            query = """
+            SELECT campaign_id, amount, donation_date, donation_id
+            FROM donations
+            WHERE user_id = %s
+            ORDER BY donation_date DESC, donation_id DESC
+            LIMIT %s
+            """
+            return await self.__db.fetch(query, (user_id, page_size))
+        last_date, last_id = after
+        query = """
+        SELECT campaign_id, amount, donation_date, donation_id
+        FROM donations
+        WHERE user_id = %s
+          AND (donation_date < %s OR (donation_date = %s AND donation_id < %s))
+        ORDER BY donation_date DESC, donation_id DESC
+        LIMIT %s
+        """
+        return await self.__db.fetch(query, (user_id, last_date, last_date, last_id, page_size))
+
+class AsyncEvent:
+    def __init__(self, db):
+        self.__db = db
+
+    async def get_active_events(self, user_id, page_size=50):
+        """First page of upcoming active events the user has NOT volunteered for."""
+        query = """
+            SELECT e.event_id, e.name, e.description, e.date, e.location
+            FROM events e
+            WHERE e.status = 'active' AND e.date >= CURDATE()
+            AND NOT EXISTS (
+                SELECT 1 FROM event_volunteers v WHERE v.user_id = %s AND v.event_id = e.event_id
+            )
+            ORDER BY e.date, e.event_id
+            LIMIT %s
+        """
+        return await self.__db.fetch(query, (user_id, page_size))
+
+    async def get_volunteers_page(self, event_id, page_size=100):
+        query = """
+        SELECT v.name, v.volunteer_date, v.volunteer_id FROM event_volunteers v
+        WHERE v.event_id = %s
+        ORDER BY v.volunteer_date DESC, v.volunteer_id DESC
+        LIMIT %s
+        """
+        return await self.__db.fetch(query, (event_id, page_size))
+
+async def donor_dashboard(db, user_id, cache=None, history_size=10):
+    """Everything the donor dashboard shows, fetched concurrently."""
+    balance, campaigns, events, history = await asyncio.gather(
+        AsyncUser(db).get_balance(user_id),
+        AsyncCampaign(db, cache).get_active_campaigns(),
+        AsyncEvent(db).get_active_events(user_id),
+        AsyncDonation(db, cache).get_donation_history_page(user_id, history_size),
+    )
+    return {"balance": balance, "campaigns": campaigns, "events": events, "recent_donations": history}
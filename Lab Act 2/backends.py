@@ -0,0 +1,308 @@
+"""Storage backends used by ``Database``.
+
+A backend knows how to open a connection, check that it is still alive,
+start a transaction and turn the MySQL-flavoured SQL used throughout the
+domain classes into its own dialect. ``MySQLBackend`` talks to the real
+server; ``SQLiteBackend`` is an embedded engine that builds its schema from
+the ``Database/*.sql`` dumps, so tests and benchmarks run without a server.
+"""
+import datetime
+import glob
+import os
+import re
+import sqlite3
+from decimal import Decimal
+from functools import lru_cache
+
+try:
+    import mysql.connector
+except ImportError:  # the SQLite backend works without the MySQL driver
+    mysql = None
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Database")
+
+class MySQLBackend:
+    name = "mysql"
+    label = "MySQL"
+    max_connections = None
+    explain_prefix = "EXPLAIN "
+
+    def __init__(self, host=None, user=None, password=None, database=None):
+        if mysql is None:
+            raise ImportError("mysql-connector-python is required for the MySQL backend.")
+        self.Error = mysql.connector.Error
+        self.__config = {
+            "host": host or os.environ.get("DB_HOST", "localhost"),
+            "user": user or os.environ.get("DB_USER", "root"),
+            "password": password or os.environ.get("DB_PASSWORD", "admin"),
+            "database": database or os.environ.get("DB_NAME", "nonprofit_donation_db"),
+            "autocommit": True,
+        }
+
+    @property
+    def config(self):
+        """Connection settings, for drivers other than mysql-connector."""
+        return dict(self.__config)
+
+    def connect(self):
+        connection = mysql.connector.connect(**self.__config)
+        if not connection.is_connected():
+            raise Exception("Connection established, but not marked as connected.")
+        return connection
+
+    def is_alive(self, connection):
+        return connection.is_connected()
+
+    def cursor(self, connection, buffered=False):
+        return connection.cursor(buffered=buffered)
+
+    def prepare(self, connection):
+        """A cursor for one statement that is prepared on the server (binary protocol)."""
+        return connection.cursor(prepared=True)
+
+    def begin(self, connection):
+        connection.start_transaction()
+
+    def discard_results(self, connection):
+        if connection.unread_result:
+            connection.consume_results()
+
+    def translate(self, query):
+        return query
+
+# MySQL constructs used by the domain classes and their SQLite equivalents
+_SQLITE_TRANSLATIONS = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "datetime('now', 'localtime')"),
+    (re.compile(r"\bCURDATE\(\)", re.IGNORECASE), "date('now', 'localtime')"),
+    (re.compile(r"\bGROUP_CONCAT\((.+?)\s+SEPARATOR\s+('[^']*')\)", re.IGNORECASE | re.DOTALL),
+     r"GROUP_CONCAT(\1, \2)"),
+    (re.compile(r"\bDROP\s+INDEX\s+(\w+)\s+ON\s+\w+", re.IGNORECASE), r"DROP INDEX \1"),
+    # SQLite write transactions are already exclusive
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE), ""),
+]
+
+@lru_cache(maxsize=512)
+def translate_to_sqlite(query):
+    for pattern, replacement in _SQLITE_TRANSLATIONS:
+        query = pattern.sub(replacement, query)
+    return query
+
+# Decimals go in as exact text; DECIMAL columns' numeric affinity converts them on store
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" ", "seconds"))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_converter("decimal", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("date", lambda value: datetime.date.fromisoformat(value.decode()))
+sqlite3.register_converter("timestamp", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("datetime", lambda value: datetime.datetime.fromisoformat(value.decode()))
+
+def _greatest(*values):
+    """MySQL ``GREATEST``: compares numerically, so Decimal text isn't ordered above numbers like in ``MAX``."""
+    if any(value is None for value in values):
+        return None
+    return max(values, key=lambda value: Decimal(str(value)))
+
+class _SQLiteCursor:
+    """Cursor wrapper that accepts the MySQL-style SQL used by the domain classes."""
+
+    def __init__(self, cursor):
+        self.__cursor = cursor
+
+    def execute(self, query, values=None):
+        self.__cursor.execute(translate_to_sqlite(query), tuple(values or ()))
+        return self
+
+    def executemany(self, query, seq_values):
+        self.__cursor.executemany(translate_to_sqlite(query), [tuple(values) for values in seq_values])
+        return self
+
+    def fetchone(self):
+        return self.__cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self.__cursor.fetchmany(size or self.__cursor.arraysize)
+
+    def fetchall(self):
+        return self.__cursor.fetchall()
+
+    def close(self):
+        self.__cursor.close()
+
+    @property
+    def rowcount(self):
+        return self.__cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.__cursor.lastrowid
+
+    @property
+    def description(self):
+        return self.__cursor.description
+
+class SQLiteBackend:
+    """Embedded backend. ``path=":memory:"`` keeps everything in RAM.
+
+    An in-memory database lives inside a single connection, so the pool is
+    limited to one connection in that mode; file databases use WAL and can
+    be pooled like MySQL.
+    """
+
+    name = "sqlite"
+    label = "SQLite"
+    Error = sqlite3.Error
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, path=":memory:", schema_dir=SCHEMA_DIR, load_data=True, cached_statements=128):
+        self.path = path
+        self.schema_dir = schema_dir
+        self.load_data = load_data
+        self.cached_statements = cached_statements
+        self.max_connections = 1 if path == ":memory:" else None
+
+    def connect(self):
+        connection = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=30,
+            cached_statements=self.cached_statements,
+        )
+        if self.path != ":memory:":
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+        if not self.__has_schema(connection):
+            load_schema(connection, self.schema_dir, self.load_data)
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.create_function("GREATEST", -1, _greatest, deterministic=True)
+        return connection
+
+    def __has_schema(self, connection):
+        row = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone()
+        return row[0] > 0
+
+    def is_alive(self, connection):
+        try:
+            connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def cursor(self, connection, buffered=False):
+        return _SQLiteCursor(connection.cursor())
+
+    def prepare(self, connection):
+        # sqlite3 reuses the compiled statement for repeated SQL text on a connection
+        return _SQLiteCursor(connection.cursor())
+
+    def begin(self, connection):
+        # Take the write lock up front so concurrent writers queue on busy_timeout
+        connection.execute("BEGIN IMMEDIATE")
+
+    def discard_results(self, connection):
+        pass
+
+    def translate(self, query):
+        return translate_to_sqlite(query)
+
+def backend_from_env(**connect_args):
+    """Pick a backend from DB_BACKEND (``mysql`` or ``sqlite``) and DB_PATH."""
+    if os.environ.get("DB_BACKEND", "mysql").lower() == "sqlite":
+        return SQLiteBackend(os.environ.get("DB_PATH", ":memory:"))
+    return MySQLBackend(**connect_args)
+
+_DUMP_STATEMENT = re.compile(r"^(CREATE TABLE|INSERT INTO)\b.*?;\s*$", re.MULTILINE | re.DOTALL)
+_COLUMN = re.compile(r"^`(?P<name>\w+)`\s+(?P<type>\w+(?:\([^)]*\))?)(?P<rest>.*)$")
+_INDEX = re.compile(r"^(?P<unique>UNIQUE\s+)?KEY\s+`(?P<name>\w+)`\s+\((?P<columns>[^)]*)\)$")
+_STRING = re.compile(r"'((?:[^'\\]++|\\.|'')*+)'", re.DOTALL)
+_UNESCAPE = re.compile(r"\\(.)|''", re.DOTALL)
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+def unescape_string(text):
+    """The value of a quoted mysqldump string, given the text between its quotes."""
+    if "\\" not in text and "''" not in text:
+        return text
+    return _UNESCAPE.sub(lambda m: "'" if m.group(1) is None else _ESCAPES.get(m.group(1), m.group(1)), text)
+
+def create_table_columns(statement):
+    """The column names of a mysqldump CREATE TABLE, in order."""
+    body = statement.split("(", 1)[1].rsplit(")", 1)[0]
+    lines = [line.strip().rstrip(",") for line in body.strip().splitlines()]
+    return tuple(match.group("name") for match in map(_COLUMN.match, lines) if match)
+
+def translate_create_table(statement):
+    """Convert a mysqldump CREATE TABLE into SQLite DDL (table plus its indexes)."""
+    header, body = statement.split("(", 1)
+    table = re.search(r"`(\w+)`", header).group(1)
+    body = body.rsplit(")", 1)[0]
+    lines = [line.strip().rstrip(",") for line in body.strip().splitlines()]
+
+    auto_increment = None
+    for line in lines:
+        match = _COLUMN.match(line)
+        if match and "AUTO_INCREMENT" in match.group("rest"):
+            auto_increment = match.group("name")
+
+    definitions = []
+    indexes = []
+    for line in lines:
+        column = _COLUMN.match(line)
+        index = _INDEX.match(line)
+        if column:
+            name, column_type, rest = column.group("name", "type", "rest")
+            if name == auto_increment:
+                definitions.append(f"`{name}` INTEGER PRIMARY KEY AUTOINCREMENT")
+                continue
+            check = ""
+            if column_type.lower().startswith("enum("):
+                check = f" CHECK (`{name}` IN {column_type[4:]})"
+                column_type = "varchar(255)"
+            rest = re.sub(r"(?<!NOT)(?<!DEFAULT) NULL\b", "", rest)
+            definitions.append(f"`{name}` {column_type}{rest}{check}")
+        elif index:
+            kind = "UNIQUE INDEX" if index.group("unique") else "INDEX"
+            indexes.append(
+                f"CREATE {kind} `{table}_{index.group('name')}` ON `{table}` ({index.group('columns')})"
+            )
+        elif line.startswith("PRIMARY KEY"):
+            if auto_increment is None or f"(`{auto_increment}`)" not in line:
+                definitions.append(line)
+        else:
+            definitions.append(line)
+
+    create = f"CREATE TABLE `{table}` (\n  " + ",\n  ".join(definitions) + "\n)"
+    return [create] + indexes
+
+def translate_insert(statement):
+    """Rewrite the MySQL-escaped strings in a dumped INSERT as SQLite literals."""
+    def literal(match):
+        # SQLite strings have no escapes and can't hold a NUL, so splice one in with char(0)
+        value = unescape_string(match.group(1)).replace("'", "''")
+        return "'" + value.replace("\0", "' || char(0) || '") + "'"
+    return _STRING.sub(literal, statement.rstrip().rstrip(";"))
+
+def load_schema(connection, schema_dir=SCHEMA_DIR, load_data=True):
+    """Create every table found in the mysqldump files, optionally with their rows."""
+    creates = []
+    inserts = []
+    for path in sorted(glob.glob(os.path.join(schema_dir, "*.sql"))):
+        with open(path, encoding="utf-8") as dump:
+            for match in _DUMP_STATEMENT.finditer(dump.read()):
+                statement = match.group(0)
+                if statement.startswith("CREATE TABLE"):
+                    creates.extend(translate_create_table(statement))
+                elif load_data:
+                    inserts.append(translate_insert(statement))
+
+    # Dumps are not in dependency order, so skip FK checks while loading
+    connection.execute("PRAGMA foreign_keys = OFF")
+    connection.execute("BEGIN")
+    try:
+        for statement in creates + inserts:
+            connection.execute(statement)
+        connection.execute("COMMIT")
+    except sqlite3.Error:
+        connection.execute("ROLLBACK")
+        raise
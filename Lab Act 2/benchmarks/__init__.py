@@ -0,0 +1,9 @@
+"""Benchmarks for the donation system.
+
+Run them from the ``Lab Act 2`` directory so the domain modules are importable,
+e.g. ``python -m benchmarks.bench_donate_many``.
+
+``datagen`` fills the schema with seeded synthetic data at a chosen scale and
+``harness`` times the public domain-class methods across scales, writing
+throughput and latency percentiles as JSON for release-to-release comparison.
+"""
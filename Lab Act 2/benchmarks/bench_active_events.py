@@ -0,0 +1,105 @@
+"""Active events a user has not joined, at scale: the old NOT IN query vs the paged anti-join.
+
+Generates ``--volunteers`` signups (1M by default) spread over ``--users``
+donors and ``--events`` events, then times for random donors:
+
+* ``NOT IN (all)``: the previous query, every active event in one result
+* ``NOT EXISTS page``: ``Event.get_active_events``, first upcoming page
+* ``cached page``: the same with the joined event IDs read from a TTLCache
+
+::
+
+    python -m benchmarks.bench_active_events --volunteers 1000000 --iterations 2000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import generate
+from cache import TTLCache
+from database import Database
+from event import Event
+from migrations import MigrationRunner
+
+NOT_IN_QUERY = """
+    SELECT e.event_id, e.name, e.description, e.date, e.location
+    FROM events e
+    WHERE e.status = 'active'
+    AND e.event_id NOT IN (
+        SELECT event_id FROM event_volunteers WHERE user_id = %s
+    )
+"""
+
+def time_calls(call, user_ids, iterations, seed):
+    rng = random.Random(seed)
+    latencies = []
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        rows += len(call(rng.choice(user_ids)))
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    result = summarize(latencies, time.perf_counter() - started)
+    result["rows_per_call"] = rows / iterations
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--volunteers", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "events.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, users=args.users, campaigns=10, donations=0, events=args.events,
+                                   volunteers=args.volunteers, seed=args.seed, batch_size=5000, verbose=False)
+            user_ids = list(dataset.donor_ids)
+            cache = TTLCache(ttl=300, max_entries=len(user_ids), max_rows=args.volunteers + len(user_ids))
+            cached_event = Event(db, cache)
+            event = Event(db)
+
+            report["NOT IN (all)"] = time_calls(lambda user_id: db.fetch(NOT_IN_QUERY, (user_id,)),
+                                                user_ids, args.iterations, args.seed)
+            report["NOT EXISTS page"] = time_calls(lambda user_id: event.get_active_events(user_id, args.page_size),
+                                                   user_ids, args.iterations, args.seed)
+            # Warm the joined-event sets first, as a long-running server would have
+            for user_id in user_ids:
+                cached_event.get_joined_event_ids(user_id)
+            report["cached page"] = time_calls(
+                lambda user_id: cached_event.get_active_events(user_id, args.page_size),
+                user_ids, args.iterations, args.seed)
+            report["cached page"]["cache"] = cache.stats()
+        finally:
+            with quiet():
+                db.close()
+
+    print(f"\n{args.volunteers:,} signups, {args.events:,} events, {args.users:,} users")
+    print(f"{'query':18} {'calls/sec':>10} {'p50':>9} {'p99':>9} {'rows/call':>10}")
+    for name, result in report.items():
+        print(f"{name:18} {result['throughput_per_sec']:10,.0f} {result['p50_ms']:7.2f}ms {result['p99_ms']:7.2f}ms "
+              f"{result['rows_per_call']:10,.1f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
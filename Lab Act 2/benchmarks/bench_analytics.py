@@ -0,0 +1,97 @@
+"""Organization reports: SQL aggregates vs the cached NumPy columns.
+
+Generates a dataset, extracts the donation columns once (cold), then times a
+no-op refresh and each metric for random organizations, next to the daily
+totals computed by a GROUP BY over ``donations``::
+
+    python -m benchmarks.bench_analytics --size small --iterations 50
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from analytics import DonationAnalytics
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate
+from database import Database
+from migrations import MigrationRunner
+
+DAILY_TOTALS_SQL = """
+SELECT DATE(d.donation_date), SUM(d.amount), COUNT(*)
+FROM donations d JOIN campaigns c ON c.campaign_id = d.campaign_id
+WHERE c.user_id = %s
+GROUP BY DATE(d.donation_date)
+ORDER BY DATE(d.donation_date)
+"""
+
+def time_calls(call, org_ids, iterations, seed):
+    rng = random.Random(seed)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        call(rng.choice(org_ids))
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "analytics.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+            analytics = DonationAnalytics(db, os.path.join(directory, "columns"))
+            started = time.perf_counter()
+            rows = analytics.refresh()
+            report["extract"] = {"rows": rows, "seconds": time.perf_counter() - started}
+            started = time.perf_counter()
+            analytics.refresh()
+            report["refresh (no new rows)"] = {"seconds": time.perf_counter() - started}
+
+            org_ids = dataset.org_ids
+            # The first filtered call sorts the cached rows by campaign once
+            analytics.goal_progress(org_ids[0])
+            calls = {
+                "SQL daily totals": lambda org_id: db.fetch(DAILY_TOTALS_SQL, (org_id,)),
+                "daily totals": lambda org_id: analytics.totals_by_period("day", organization_id=org_id),
+                "weekly totals": lambda org_id: analytics.totals_by_period("week", organization_id=org_id),
+                "gift histogram": lambda org_id: analytics.gift_histogram(organization_id=org_id),
+                "donor retention": lambda org_id: analytics.donor_retention(organization_id=org_id),
+                "goal progress": analytics.goal_progress,
+            }
+            for name, call in calls.items():
+                report[name] = time_calls(call, org_ids, args.iterations, args.seed)
+        finally:
+            with quiet():
+                db.close()
+
+    print(f"\nExtracted {report['extract']['rows']:,} donations in {report['extract']['seconds']:.2f}s; "
+          f"refresh without new rows took {report['refresh (no new rows)']['seconds'] * 1000:.1f}ms")
+    print(f"{'metric':18} {'calls/sec':>10} {'p50':>10} {'p99':>10}")
+    for name in calls:
+        result = report[name]
+        print(f"{name:18} {result['throughput_per_sec']:10,.1f} {result['p50_ms']:8.2f}ms {result['p99_ms']:8.2f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
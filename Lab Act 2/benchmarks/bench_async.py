@@ -0,0 +1,124 @@
+"""Requests/sec of the donor dashboard: threaded sync path vs asyncio.
+
+A dashboard request needs the balance, the active campaigns, the events the
+donor can still join and the latest donations. The sync path runs those
+queries one after another on a thread pool; the async path runs them
+concurrently with ``asyncio.gather`` on one event loop::
+
+    python -m benchmarks.bench_async --size tiny --requests 2000 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_database import AsyncDatabase
+from async_services import donor_dashboard
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate
+from database import Database
+from donation import Donation
+from migrations import MigrationRunner
+
+def sync_dashboard(db, user_id, history_size=10):
+    """The same four queries as ``donor_dashboard``, run sequentially."""
+    balance = db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (user_id,))
+    campaigns = db.fetch("SELECT * FROM campaigns WHERE status = 'active'")
+    events = db.fetch(
+        """
+        SELECT e.event_id, e.name, e.description, e.date, e.location
+        FROM events e
+        WHERE e.status = 'active'
+        AND e.event_id NOT IN (SELECT event_id FROM event_volunteers WHERE user_id = %s)
+        """,
+        (user_id,),
+    )
+    history = Donation(db).get_donation_history_page(user_id, history_size)
+    return {"balance": balance[0] if balance else 0, "campaigns": campaigns, "events": events,
+            "recent_donations": history}
+
+def run_threaded(make_backend, user_ids, concurrency):
+    db = Database(pool_size=concurrency, backend=make_backend())
+    latencies = []
+
+    def request(user_id):
+        started = time.perf_counter()
+        sync_dashboard(db, user_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(request, user_ids))
+        return summarize(latencies, time.perf_counter() - started)
+    finally:
+        db.close()
+
+async def run_async(make_backend, user_ids, concurrency):
+    latencies = []
+    async with AsyncDatabase(pool_size=concurrency, backend=make_backend()) as db:
+        limit = asyncio.Semaphore(concurrency)
+
+        async def request(user_id):
+            async with limit:
+                started = time.perf_counter()
+                await donor_dashboard(db, user_id)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request(user_id) for user_id in user_ids))
+        return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="tiny")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database (already filled by datagen) instead of a fresh SQLite file")
+    parser.add_argument("--donor-ids", type=int, nargs="*", help="donors to request with --use-configured-db")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            make_backend = backend_from_env
+            donor_ids = args.donor_ids or [6, 9]
+        else:
+            path = os.path.join(directory, "async.db")
+            make_backend = lambda: SQLiteBackend(path)
+            db = Database(backend=make_backend())
+            try:
+                with quiet():
+                    MigrationRunner(db).migrate()
+                donor_ids = generate(db, seed=args.seed, **SCALES[args.size]).donor_ids
+            finally:
+                db.close()
+
+        rng = random.Random(args.seed)
+        user_ids = [rng.choice(donor_ids) for _ in range(args.requests)]
+        report = {}
+        with quiet():
+            for concurrency in args.concurrency:
+                report[concurrency] = {
+                    "threaded": run_threaded(make_backend, user_ids, concurrency),
+                    "asyncio": asyncio.run(run_async(make_backend, user_ids, concurrency)),
+                }
+
+    print(f"\n{'concurrency':>11} {'threaded req/s':>15} {'asyncio req/s':>14} {'threaded p99':>13} {'asyncio p99':>12}")
+    for concurrency, result in report.items():
+        print(f"{concurrency:>11} {result['threaded']['throughput_per_sec']:15,.1f} "
+              f"{result['asyncio']['throughput_per_sec']:14,.1f} {result['threaded']['p99_ms']:11.2f}ms "
+              f"{result['asyncio']['p99_ms']:10.2f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"size": args.size, "requests": args.requests, "results": report}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
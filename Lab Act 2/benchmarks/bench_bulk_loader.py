@@ -0,0 +1,111 @@
+"""Bulk export and load throughput against statement-by-statement restores.
+
+Generates a dataset, exports its tables with ``bulk_loader.export`` as CSV
+and as multi-row INSERT chunks, then loads each export into a fresh
+database: once by executing the INSERT statements one at a time (how the
+dumps were restored so far), then with ``bulk_loader.load`` on one and on
+``--workers`` connections::
+
+    python -m benchmarks.bench_bulk_loader --size small --workers 4
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from backends import SQLiteBackend, backend_from_env, translate_insert
+from benchmarks.common import quiet
+from benchmarks.datagen import SCALES, generate
+from bulk_loader import export, load
+from database import Database
+from migrations import MigrationRunner
+
+TABLES = ["users", "campaigns", "donations", "events", "event_volunteers"]
+
+def fresh_db(directory, name, use_configured_db):
+    with quiet():
+        if use_configured_db:
+            db = Database(pool_size=8, backend=backend_from_env())
+            with db.transaction() as cursor:
+                for table in TABLES:
+                    cursor.execute(f"DELETE FROM `{table}`")
+            return db
+        return Database(pool_size=8, backend=SQLiteBackend(os.path.join(directory, name), load_data=False))
+
+def load_statement_by_statement(db, paths):
+    """The old restore path: every INSERT statement through ``Database.execute``."""
+    started = time.perf_counter()
+    for path in paths:
+        with open(path, encoding="utf-8") as dump:
+            for statement in dump:
+                if statement.startswith("INSERT"):
+                    db.execute(translate_insert(statement) if db.dialect == "sqlite" else statement)
+    return time.perf_counter() - started
+
+def count_rows(db):
+    return sum(db.fetch_one(f"SELECT COUNT(*) FROM `{table}`")[0] for table in TABLES)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--chunk-rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="load into the DB_* database (its tables are emptied first) instead of SQLite files")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with quiet():
+            source = Database(pool_size=8, backend=SQLiteBackend(os.path.join(directory, "source.db")))
+            MigrationRunner(source).migrate()
+            generate(source, seed=args.seed, verbose=False, **SCALES[args.size])
+        try:
+            exports = {}
+            for fmt in ("csv", "sql"):
+                result = export(source, os.path.join(directory, fmt), TABLES, fmt, args.chunk_rows,
+                                workers=args.workers)
+                exports[fmt] = [path for table in result["results"] for path in table["files"]]
+                report[f"export {fmt}"] = {"rows": result["rows"], "seconds": result["seconds"],
+                                           "rows_per_sec": result["rows_per_sec"]}
+            expected = count_rows(source)
+        finally:
+            with quiet():
+                source.close()
+
+        runs = [("statement by statement (sql)", "sql", None)]
+        for fmt in ("sql", "csv"):
+            runs += [(f"bulk load {fmt}, 1 worker", fmt, 1), (f"bulk load {fmt}, {args.workers} workers", fmt, args.workers)]
+        for number, (name, fmt, workers) in enumerate(runs):
+            db = fresh_db(directory, f"target{number}.db", args.use_configured_db)
+            try:
+                if workers is None:
+                    with redirect_stdout(io.StringIO()):
+                        seconds = load_statement_by_statement(db, exports[fmt])
+                    rows = count_rows(db)
+                else:
+                    result = load(db, exports[fmt], workers, args.batch_size, schema=False)
+                    rows, seconds = result["rows"], result["seconds"]
+                if count_rows(db) != expected:
+                    raise RuntimeError(f"{name} loaded {count_rows(db):,} rows, expected {expected:,}")
+                report[name] = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds}
+            finally:
+                with quiet():
+                    db.close()
+
+    print(f"\n{expected:,} rows across {', '.join(TABLES)}")
+    print(f"{'run':32} {'seconds':>8} {'rows/sec':>12}")
+    for name, result in report.items():
+        print(f"{name:32} {result['seconds']:8.2f} {result['rows_per_sec']:12,.0f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare Donation.donate_many against looping over donate_to_campaign."""
+import argparse
+import random
+import time
+
+from benchmarks.common import quiet
+from database import Database
+from donation import Donation
+
+def create_bench_campaign(db, org_id):
+    with db.transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO campaigns (user_id, title, description, goal_amount, deadline, status, funds_raised)
+            VALUES (%s, 'bench campaign', 'benchmark data', 1000000, '2099-12-31', 'active', 0)
+            """,
+            (org_id,),
+        )
+        return cursor.lastrowid
+
+def run(db, rows, donor_id, org_id, batch_size):
+    donation = Donation(db)
+    campaign_id = create_bench_campaign(db, org_id)
+    payload = [(donor_id, campaign_id, round(random.uniform(1, 500), 2)) for _ in range(rows)]
+    try:
+        with quiet():
+            started = time.perf_counter()
+            for user_id, target, amount in payload:
+                donation.donate_to_campaign(user_id, target, amount)
+            looped = time.perf_counter() - started
+
+            started = time.perf_counter()
+            results = donation.donate_many(payload, batch_size=batch_size)
+            batched = time.perf_counter() - started
+    finally:
+        # Donations are removed through the ON DELETE CASCADE foreign key
+        db.execute("DELETE FROM campaigns WHERE campaign_id = %s", (campaign_id,))
+
+    ok = sum(1 for row in results if row["status"] == "ok")
+    print(f"Rows: {rows} (batch size {batch_size})")
+    print(f"donate_to_campaign loop: {looped:.3f}s ({rows / looped:,.0f} rows/sec)")
+    print(f"donate_many:             {batched:.3f}s ({rows / batched:,.0f} rows/sec, {ok} accepted)")
+    print(f"Speed-up: {looped / batched:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--donor-id", type=int, default=6)
+    parser.add_argument("--org-id", type=int, default=8)
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        run(db, args.rows, args.donor_id, args.org_id, args.batch_size)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the old process_payment + donate_to_campaign flow with donate_with_payment.
+
+Reports server round trips, commits and p50/p99 latency per donation.
+"""
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+from benchmarks.common import percentile, quiet
+from database import Database
+from donation import Donation
+
+def process_payment(user_id, amount, db):
+    """The payment step main.py ran before ``donate_with_payment``: read, compare, then debit."""
+    result = db.fetch("SELECT balance FROM users WHERE user_id = %s", (user_id,))
+    if result and result[0][0] >= amount:
+        db.execute("UPDATE users SET balance = balance - %s WHERE user_id = %s", (amount, user_id))
+        return True
+    print("Insufficient balance! Please add funds.")
+    return False
+
+class CountingCursor:
+    """Cursor proxy that counts statements sent to the server."""
+
+    def __init__(self, cursor, counter):
+        self.__cursor = cursor
+        self.__counter = counter
+
+    def execute(self, query, values=None):
+        self.__counter.statements += 1
+        return self.__cursor.execute(query, values)
+
+    def __getattr__(self, name):
+        return getattr(self.__cursor, name)
+
+class CountingDatabase:
+    """Database proxy that counts statements and commits per operation."""
+
+    def __init__(self, db):
+        self.__db = db
+        self.statements = 0
+        self.commits = 0
+
+    def execute(self, query, values=None):
+        self.statements += 1
+        self.commits += 1
+        return self.__db.execute(query, values)
+
+    def fetch(self, query, values=None):
+        self.statements += 1
+        return self.__db.fetch(query, values)
+
+    def fetch_one(self, query, values=None):
+        self.statements += 1
+        return self.__db.fetch_one(query, values)
+
+    @contextmanager
+    def transaction(self):
+        with self.__db.transaction() as cursor:
+            # BEGIN is one extra round trip
+            self.statements += 1
+            yield CountingCursor(cursor, self)
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+def measure(label, counting_db, donate, iterations):
+    latencies = []
+    counting_db.reset()
+    with quiet():
+        for _ in range(iterations):
+            started = time.perf_counter()
+            donate()
+            latencies.append((time.perf_counter() - started) * 1000)
+    print(f"{label}")
+    print(f"  round trips/donation: {counting_db.statements / iterations:.1f}")
+    print(f"  commits/donation:     {counting_db.commits / iterations:.1f}")
+    print(f"  p50: {statistics.median(latencies):.2f} ms  p99: {percentile(latencies, 99):.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--donor-id", type=int, default=6)
+    parser.add_argument("--campaign-id", type=int, default=2)
+    parser.add_argument("--amount", type=float, default=1.00)
+    args = parser.parse_args()
+
+    db = Database()
+    counting_db = CountingDatabase(db)
+    donation = Donation(counting_db)
+    # Make sure the donor can afford both runs
+    db.execute("UPDATE users SET balance = balance + %s WHERE user_id = %s",
+               (args.amount * args.iterations * 2, args.donor_id))
+    try:
+        def old_flow():
+            if process_payment(args.donor_id, args.amount, counting_db):
+                donation.donate_to_campaign(args.donor_id, args.campaign_id, args.amount)
+
+        def new_flow():
+            donation.donate_with_payment(args.donor_id, args.campaign_id, args.amount)
+
+        measure("process_payment + donate_to_campaign", counting_db, old_flow, args.iterations)
+        measure("donate_with_payment", counting_db, new_flow, args.iterations)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Event discovery: SQL without and with the migration 7 indexes vs ``EventIndex``.
+
+Generates a dataset with a million events, then times ``Event.find_events``
+for random "this weekend" windows, half of them near a random city and a
+third of them leaving out what a random donor already joined: first as SQL
+on the schema without migration 7, then with it, then through the index::
+
+    python -m benchmarks.bench_event_discovery --events 1000000 --iterations 200
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import LOCATIONS, SCALES, generate
+from database import Database
+from event import Event
+from event_index import EventIndex
+from migrations import MIGRATIONS, MigrationRunner
+
+def random_filters(count, dataset, seed):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    filters = []
+    for _ in range(count):
+        start = today + datetime.timedelta(days=rng.randint(0, 175))
+        filters.append({
+            "start": start,
+            "end": start + datetime.timedelta(days=rng.choice((1, 2))),
+            "location": rng.choice(LOCATIONS).split()[0] if rng.random() < 0.5 else None,
+            "user_id": rng.choice(dataset.donor_ids) if rng.random() < 1 / 3 else None,
+        })
+    return filters
+
+def time_calls(call, filters):
+    latencies = []
+    started = time.perf_counter()
+    for kwargs in filters:
+        call_started = time.perf_counter()
+        call(**kwargs)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="tiny")
+    parser.add_argument("--events", type=int, default=1000000, help="override the scale's event count")
+    parser.add_argument("--volunteers", type=int, default=100000, help="override the scale's signup count")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    volumes = dict(SCALES[args.size], events=args.events, volunteers=args.volunteers)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "events.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db, [m for m in MIGRATIONS if m.version != 7]).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **volumes)
+            filters = random_filters(args.iterations, dataset, args.seed)
+            for kwargs in filters:
+                kwargs["page_size"] = args.page_size
+
+            report["SQL without migration 7"] = time_calls(Event(db).find_events, filters)
+            with quiet():
+                MigrationRunner(db).migrate()
+            report["SQL with migration 7"] = time_calls(Event(db).find_events, filters)
+
+            started = time.perf_counter()
+            index = EventIndex(db)
+            report["index build"] = {"events": len(index), "seconds": time.perf_counter() - started}
+            report["index"] = time_calls(Event(db, index=index).find_events, filters)
+
+            rng = random.Random(args.seed)
+            today = datetime.date.today()
+            started = time.perf_counter()
+            for event_id in range(args.iterations):
+                index.add(-event_id - 1, today + datetime.timedelta(days=rng.randint(0, 180)), rng.choice(LOCATIONS))
+            report["index add"] = {"per_sec": args.iterations / (time.perf_counter() - started)}
+        finally:
+            with quiet():
+                db.close()
+
+    build = report["index build"]
+    print(f"\nIndexed {build['events']:,} upcoming events in {build['seconds']:.2f}s; "
+          f"adds run at {report['index add']['per_sec']:,.0f}/sec")
+    print(f"{'query':24} {'calls/sec':>10} {'p50':>10} {'p99':>10}")
+    for name in ("SQL without migration 7", "SQL with migration 7", "index"):
+        result = report[name]
+        print(f"{name:24} {result['throughput_per_sec']:10,.1f} {result['p50_ms']:8.2f}ms {result['p99_ms']:8.2f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
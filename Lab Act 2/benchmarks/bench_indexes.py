@@ -0,0 +1,72 @@
+"""Before/after benchmark for the index migrations.
+
+Generates a dataset in a fresh SQLite file with every migration except the
+index ones applied, times the methods whose queries the indexes target,
+applies the index migrations and times them again::
+
+    python -m benchmarks.bench_indexes --size small
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from backends import SQLiteBackend
+from benchmarks.common import quiet
+from benchmarks.datagen import SCALES, generate
+from benchmarks.harness import build_operations, time_operation
+from database import Database
+from event import Event
+from migrations import MIGRATIONS, MigrationRunner
+
+AFFECTED = (
+    "donation.view_donation_history",
+    "campaign.view_my_campaign_donations",
+    "campaign.view_active_campaigns",
+    "event.view_active_events",
+    "user.login",
+)
+INDEX_MIGRATIONS = (1, 2, 5)
+
+def measure(db, dataset, iterations, seed):
+    operations = build_operations(db, dataset, random.Random(seed))
+    event = Event(db)
+    rng = random.Random(seed)
+    operations["event.opt_out_of_event"] = lambda: event.opt_out_of_event(
+        rng.choice(dataset.donor_ids), rng.choice(dataset.event_ids))
+    return {name: time_operation(operations[name], iterations)
+            for name in AFFECTED + ("event.opt_out_of_event",)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(backend=SQLiteBackend(os.path.join(directory, "indexes.db")))
+        try:
+            with quiet():
+                MigrationRunner(db, [m for m in MIGRATIONS if m.version not in INDEX_MIGRATIONS]).migrate()
+            dataset = generate(db, seed=args.seed, **SCALES[args.size])
+            before = measure(db, dataset, args.iterations, args.seed)
+            with quiet():
+                MigrationRunner(db).migrate()
+            after = measure(db, dataset, args.iterations, args.seed)
+        finally:
+            db.close()
+
+    print(f"\n{'operation':40} {'p50 before':>11} {'p50 after':>10} {'p99 before':>11} {'p99 after':>10} {'speed-up':>9}")
+    for name in before:
+        speed_up = before[name]["p50_ms"] / after[name]["p50_ms"] if after[name]["p50_ms"] else float("inf")
+        print(f"{name:40} {before[name]['p50_ms']:10.2f}ms {after[name]['p50_ms']:9.2f}ms "
+              f"{before[name]['p99_ms']:10.2f}ms {after[name]['p99_ms']:9.2f}ms {speed_up:8.1f}x")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"size": args.size, "before": before, "after": after}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Donation throughput during a spike: direct commits vs the write-behind journal.
+
+``--threads`` donors call ``Donation.donate_to_campaign`` ``--donations``
+times in total, first committing every donation directly and then through a
+``DonationJournal``. Reports acknowledged donations/sec, acknowledgement
+latency and how long the journal needed to apply everything::
+
+    python -m benchmarks.bench_journal --donations 5000 --threads 8
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from database import Database
+from donation import Donation
+from donation_journal import DonationJournal
+from migrations import MigrationRunner
+
+def run_spike(donation, donations, threads, campaign_ids, seed):
+    rng = random.Random(seed)
+    payload = [(rng.choice((6, 9)), rng.choice(campaign_ids), round(rng.uniform(1, 100), 2)) for _ in range(donations)]
+    latencies = []
+
+    def donate(row):
+        started = time.perf_counter()
+        donation.donate_to_campaign(*row)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(donate, payload))
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--donations", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-latency-ms", type=float, default=50)
+    parser.add_argument("--campaign-ids", type=int, nargs="+", default=[2])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=args.threads, backend=backend_from_env())
+        else:
+            db = Database(pool_size=args.threads, backend=SQLiteBackend(os.path.join(directory, "journal.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                report["direct"] = run_spike(Donation(db), args.donations, args.threads, args.campaign_ids, args.seed)
+
+                journal = DonationJournal(db, os.path.join(directory, "bench.journal"), batch_size=args.batch_size,
+                                          max_latency_ms=args.max_latency_ms)
+                started = time.perf_counter()
+                report["journal"] = run_spike(Donation(db, journal=journal), args.donations, args.threads,
+                                              args.campaign_ids, args.seed)
+                journal.flush()
+                report["journal"]["applied_after_s"] = time.perf_counter() - started
+                report["journal"]["stats"] = journal.stats()
+                journal.close()
+        finally:
+            db.close()
+
+    print(f"\n{'mode':8} {'acks/sec':>10} {'p50 ack':>9} {'p99 ack':>9}")
+    for mode in ("direct", "journal"):
+        result = report[mode]
+        print(f"{mode:8} {result['throughput_per_sec']:10,.0f} {result['p50_ms']:7.2f}ms {result['p99_ms']:7.2f}ms")
+    stats = report["journal"]["stats"]
+    print(f"\nJournal: {stats['applied']:,} applied in {stats['batches']:,} batches with {stats['fsyncs']:,} fsyncs; "
+          f"all applied {report['journal']['applied_after_s']:.2f}s after the spike started")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Leaderboard reads and donation cost with and without the in-process boards.
+
+Generates a dataset, then times the SQL queries a leaderboard page would run
+(sort campaigns, aggregate donations per donor) against ``Leaderboards``
+reads, and ``Donation.donate_to_campaign`` with and without a leaderboard
+attached::
+
+    python -m benchmarks.bench_leaderboard --size small --iterations 500
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate
+from database import Database
+from donation import Donation
+from leaderboard import Leaderboards
+from migrations import MigrationRunner
+
+TOP_CAMPAIGNS_SQL = "SELECT campaign_id, title, funds_raised FROM campaigns ORDER BY funds_raised DESC LIMIT %s"
+TOP_DONORS_SQL = """
+SELECT user_id, SUM(amount) AS total FROM donations GROUP BY user_id ORDER BY total DESC LIMIT %s
+"""
+
+def time_calls(call, iterations):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "leaderboard.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+            started = time.perf_counter()
+            boards = Leaderboards(db, size=args.top)
+            report["startup rebuild"] = {"seconds": time.perf_counter() - started}
+
+            sql_iterations = max(args.iterations // 10, 5)
+            report["SQL top campaigns"] = time_calls(lambda: db.fetch(TOP_CAMPAIGNS_SQL, (args.top,)), sql_iterations)
+            report["SQL top donors"] = time_calls(lambda: db.fetch(TOP_DONORS_SQL, (args.top,)), sql_iterations)
+            report["board top campaigns"] = time_calls(boards.top_campaigns, args.iterations)
+            report["board top donors"] = time_calls(boards.top_donors, args.iterations)
+            report["board nearest to goal"] = time_calls(boards.nearest_to_goal, args.iterations)
+
+            rng = random.Random(args.seed)
+            donate = lambda donation: donation.donate_to_campaign(
+                rng.choice(dataset.donor_ids), rng.choice(dataset.campaign_ids), 5.00)
+            with quiet():
+                plain, ranked = Donation(db), Donation(db, leaderboard=boards)
+                report["donate"] = time_calls(lambda: donate(plain), args.iterations)
+                report["donate + leaderboard"] = time_calls(lambda: donate(ranked), args.iterations)
+        finally:
+            with quiet():
+                db.close()
+
+    print(f"\nLoaded the boards in {report['startup rebuild']['seconds'] * 1000:.1f}ms")
+    print(f"{'operation':24} {'calls/sec':>12} {'p50':>10} {'p99':>10}")
+    for name, result in report.items():
+        if name == "startup rebuild":
+            continue
+        print(f"{name:24} {result['throughput_per_sec']:12,.1f} {result['p50_ms']:8.3f}ms {result['p99_ms']:8.3f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Login throughput against the number of hashing processes.
+
+Generates a few users with passwords hashed at ``--cost``, then has
+``--threads`` threads log them in through ``User.login`` (the way the API's
+worker threads do) with the hashing done inline on those threads, then on a
+``PasswordHasher`` process pool of 1, 2, 4 ... up to the core count::
+
+    python -m benchmarks.bench_passwords --cost 14 --logins 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import generate, user_email, user_password
+from database import Database
+from migrations import MigrationRunner
+from passwords import PasswordHasher
+from user import User
+
+def run_logins(db, hasher, user_ids, logins, threads, seed):
+    user = User(db, hasher)
+    rng = random.Random(seed)
+    picks = [rng.choice(user_ids) for _ in range(logins)]
+
+    def login(user_id):
+        started = time.perf_counter()
+        if not user.login(user_email(user_id), user_password(user_id)):
+            raise RuntimeError(f"login failed for user {user_id}")
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(login, picks))
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cost", type=int, default=14, help="log2 of the scrypt work factor")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    worker_counts = [0]
+    workers = 1
+    while workers < args.max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=args.threads, backend=backend_from_env())
+        else:
+            db = Database(pool_size=args.threads, backend=SQLiteBackend(os.path.join(directory, "passwords.db")))
+        report = {"cores": os.cpu_count()}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, users=args.users, campaigns=1, donations=0, events=0, volunteers=0,
+                                   seed=args.seed, verbose=False, password_cost=args.cost)
+            user_ids = list(dataset.user_ids)
+            for workers in worker_counts:
+                hasher = PasswordHasher(args.cost, workers)
+                try:
+                    # Start the worker processes before timing
+                    hasher.hash("warm up")
+                    name = "inline on threads" if workers == 0 else f"{workers} process(es)"
+                    report[name] = run_logins(db, hasher, user_ids, args.logins, args.threads, args.seed)
+                finally:
+                    hasher.close()
+        finally:
+            with quiet():
+                db.close()
+
+    print(f"\nscrypt cost 2^{args.cost}, {args.threads} threads, {report['cores']} core(s)")
+    print(f"{'hashing':20} {'logins/sec':>11} {'p50':>10} {'p99':>10}")
+    for name, result in report.items():
+        if name == "cores":
+            continue
+        print(f"{name:20} {result['throughput_per_sec']:11,.1f} {result['p50_ms']:8.1f}ms {result['p99_ms']:8.1f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""funds_raised reconciliation: full checks on 0..N worker processes, then incremental.
+
+Generates a dataset, knocks ``--drifted`` random campaigns' counters off,
+then times ``FundsReconciler.run`` over every campaign inline and on 1, 2,
+4 ... worker processes, a repair, and an incremental check after
+``--new-donations`` more donations::
+
+    python -m benchmarks.bench_reconcile --size medium --max-workers 4
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet
+from benchmarks.datagen import SCALES, generate
+from database import Database
+from migrations import MigrationRunner
+from reconcile import FundsReconciler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--drifted", type=int, default=20)
+    parser.add_argument("--new-donations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    worker_counts = [0]
+    workers = 1
+    while workers < args.max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(args.max_workers)
+
+    rng = random.Random(args.seed)
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=2, backend=backend_from_env())
+        else:
+            db = Database(pool_size=2, backend=SQLiteBackend(os.path.join(directory, "reconcile.db")))
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+            # Line every counter up with the ledger first (the sample campaign starts off), then break some
+            FundsReconciler(db, workers=0, chunk_size=args.chunk_size).run(repair=True)
+            for campaign_id in rng.sample(dataset.campaign_ids, args.drifted):
+                db.execute("UPDATE campaigns SET funds_raised = funds_raised + 1 WHERE campaign_id = %s", (campaign_id,))
+
+            for workers in worker_counts:
+                result = FundsReconciler(db, workers, args.chunk_size).run()
+                name = "inline" if workers == 0 else f"{workers} process(es)"
+                report[f"full, {name}"] = {"campaigns": result["checked"], "drift": len(result["drift"]),
+                                           "seconds": result["seconds"]}
+            result = FundsReconciler(db, workers=0, chunk_size=args.chunk_size).run(repair=True)
+            report["full repair, inline"] = {"campaigns": result["checked"], "drift": result["repaired"],
+                                             "seconds": result["seconds"]}
+
+            with db.transaction() as cursor:
+                cursor.executemany(
+                    "INSERT INTO donations (user_id, campaign_id, amount, donation_date) VALUES (%s, %s, %s, NOW())",
+                    [(rng.choice(dataset.donor_ids), rng.choice(dataset.campaign_ids), 10)
+                     for _ in range(args.new_donations)])
+            result = FundsReconciler(db, workers=0, chunk_size=args.chunk_size).run(incremental=True)
+            report["incremental, inline"] = {"campaigns": result["checked"], "drift": len(result["drift"]),
+                                             "seconds": result["seconds"]}
+        finally:
+            with quiet():
+                db.close()
+
+    print(f"\n{args.drifted} drifted campaigns; {args.new_donations:,} new donations (counters not bumped) "
+          f"before the incremental run; {os.cpu_count()} core(s)")
+    print(f"{'run':24} {'campaigns':>10} {'drift':>7} {'seconds':>9}")
+    for name, result in report.items():
+        print(f"{name:24} {result['campaigns']:10,} {result['drift']:7,} {result['seconds']:9.3f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Time-range donation totals: raw SUM over ``donations`` vs the rollup tables.
+
+Generates a dataset, builds the rollups (reporting donations/sec), then times
+random ranges of a few hours to a few months, over everything and per
+organization, both ways::
+
+    python -m benchmarks.bench_rollups --size small --iterations 200
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate
+from database import Database
+from migrations import MigrationRunner
+from rollups import DonationRollups
+
+RAW_TOTAL = """
+SELECT SUM(amount), COUNT(*) FROM donations
+WHERE donation_date >= %s AND donation_date < %s
+"""
+RAW_ORGANIZATION_TOTAL = """
+SELECT SUM(d.amount), COUNT(*) FROM donations d JOIN campaigns c ON c.campaign_id = d.campaign_id
+WHERE c.user_id = %s AND d.donation_date >= %s AND d.donation_date < %s
+"""
+
+def random_ranges(count, seed):
+    rng = random.Random(seed)
+    now = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    ranges = []
+    for _ in range(count):
+        hours = rng.choice((3, 30, 24 * 10, 24 * 75))
+        start = now - datetime.timedelta(hours=rng.randint(hours, 24 * 400))
+        ranges.append((start, start + datetime.timedelta(hours=hours)))
+    return ranges
+
+def time_calls(call, arguments):
+    latencies = []
+    started = time.perf_counter()
+    for args in arguments:
+        call_started = time.perf_counter()
+        call(*args)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "rollups.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+            rollups = DonationRollups(db)
+            started = time.perf_counter()
+            rows = rollups.refresh()
+            elapsed = time.perf_counter() - started
+            report["build"] = {"donations": rows, "seconds": elapsed, "donations_per_sec": rows / elapsed}
+
+            rng = random.Random(args.seed)
+            ranges = random_ranges(args.iterations, args.seed)
+            org_ranges = [(rng.choice(dataset.org_ids), start, end) for start, end in ranges]
+            report["raw total"] = time_calls(lambda start, end: db.fetch_one(RAW_TOTAL, (start, end)), ranges)
+            report["rollup total"] = time_calls(rollups.totals, ranges)
+            report["raw organization total"] = time_calls(
+                lambda org_id, start, end: db.fetch_one(RAW_ORGANIZATION_TOTAL, (org_id, start, end)), org_ranges)
+            report["rollup organization total"] = time_calls(
+                lambda org_id, start, end: rollups.totals(start, end, organization_id=org_id), org_ranges)
+        finally:
+            with quiet():
+                db.close()
+
+    build = report["build"]
+    print(f"\nRolled up {build['donations']:,} donations in {build['seconds']:.2f}s "
+          f"({build['donations_per_sec']:,.0f}/sec)")
+    print(f"{'query':26} {'calls/sec':>10} {'p50':>10} {'p99':>10}")
+    for name, result in report.items():
+        if name == "build":
+            continue
+        print(f"{name:26} {result['throughput_per_sec']:10,.1f} {result['p50_ms']:8.2f}ms {result['p99_ms']:8.2f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Keyword search: ``LIKE '%term%'`` scans vs the inverted index.
+
+Generates a dataset with tens of thousands of campaigns and events, builds the
+index from scratch, times a restart from the saved file, then times random one
+and two word queries both ways (first page of 20). The generated titles share
+a vocabulary of 18 words, so every query word is in about a sixth of the rows
+and ``LIKE`` finds its 20 rows almost at once; the "rare" rows use words no
+row contains, which is what ``LIKE`` pays for a rare word: a full scan::
+
+    python -m benchmarks.bench_search --campaigns 20000 --events 20000 --iterations 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import LOCATIONS, SCALES, WORDS, generate
+from database import Database
+from migrations import MigrationRunner
+from search import SearchIndex
+
+RARE_WORDS = ("volcano", "typhoon", "orphanage", "bakery", "wetland")
+LIKE_SQL = {
+    "campaign": ("SELECT campaign_id, title, description, goal_amount, funds_raised, deadline FROM campaigns "
+                 "WHERE status = 'active' AND ({}) ORDER BY campaign_id LIMIT %s", ("title", "description")),
+    "event": ("SELECT event_id, name, description, date, location FROM events "
+              "WHERE status = 'active' AND date >= CURDATE() AND ({}) ORDER BY event_id LIMIT %s",
+              ("name", "description", "location")),
+}
+
+def like_search(db, query, kind, page_size):
+    sql, columns = LIKE_SQL[kind]
+    terms = query.split()
+    conditions = " OR ".join(f"{column} LIKE %s" for _ in terms for column in columns)
+    values = [f"%{term}%" for term in terms for _ in columns]
+    return db.fetch(sql.format(conditions), values + [page_size])
+
+def random_queries(count, kind, seed, rare=False):
+    rng = random.Random(seed)
+    if rare:
+        words = list(RARE_WORDS)
+    else:
+        words = list(WORDS) + ([location.split()[0].lower() for location in LOCATIONS] if kind == "event" else [])
+    return [" ".join(rng.sample(words, rng.choice((1, 2)))) for _ in range(count)]
+
+def time_calls(call, queries):
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        call_started = time.perf_counter()
+        call(query)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--campaigns", type=int, default=20000, help="override the scale's campaign count")
+    parser.add_argument("--events", type=int, default=20000, help="override the scale's event count")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    volumes = dict(SCALES[args.size], campaigns=args.campaigns, events=args.events)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "search.db")))
+        path = os.path.join(directory, "index.json")
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                generate(db, seed=args.seed, verbose=False, **volumes)
+            started = time.perf_counter()
+            search = SearchIndex(db, path)
+            report["full index"] = {"seconds": time.perf_counter() - started,
+                                    "documents": search.size("campaign") + search.size("event"),
+                                    "file_bytes": os.path.getsize(path)}
+            started = time.perf_counter()
+            search = SearchIndex(db, path)
+            report["restart from file"] = {"seconds": time.perf_counter() - started}
+
+            for kind in ("campaign", "event"):
+                for rare in (False, True):
+                    queries = random_queries(args.iterations, kind, args.seed, rare)
+                    suffix = " (rare)" if rare else ""
+                    report[f"LIKE {kind}s{suffix}"] = time_calls(
+                        lambda query: like_search(db, query, kind, args.page_size), queries)
+                    report[f"index {kind}s{suffix}"] = time_calls(
+                        lambda query: search.search(query, kind, page_size=args.page_size), queries)
+        finally:
+            with quiet():
+                db.close()
+
+    build = report["full index"]
+    print(f"\nIndexed {build['documents']:,} documents in {build['seconds']:.2f}s "
+          f"({build['file_bytes'] / 1e6:.1f} MB saved); restart took {report['restart from file']['seconds']:.2f}s")
+    print(f"{'query':23} {'calls/sec':>10} {'p50':>10} {'p99':>10}")
+    for name, result in report.items():
+        if name in ("full index", "restart from file"):
+            continue
+        print(f"{name:23} {result['throughput_per_sec']:10,.1f} {result['p50_ms']:8.2f}ms {result['p99_ms']:8.2f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
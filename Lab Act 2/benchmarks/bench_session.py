@@ -0,0 +1,120 @@
+"""Dashboard balance reads with and without the shared user cache.
+
+Generates donors, then replays ``--sessions`` logins that each run the donor
+dashboard loop ``--loops`` times: read the balance, and every few loops add
+funds or donate. Runs once reading the balance from the database each loop
+(the dashboard's read before ``Session``) and once through ``Session`` with a shared
+``TTLCache``, then reports loop latency, round trips and the cache hit rate::
+
+    python -m benchmarks.bench_session --sessions 500 --loops 20
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import generate
+from cache import TTLCache
+from database import Database
+from donation import Donation
+from migrations import MigrationRunner
+from session import Session
+
+def plan(dataset, sessions, loops, write_every, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(dataset.donor_ids),
+             [(rng.choice(("add_funds", "donate")) if (loop + 1) % write_every == 0 else None,
+               rng.choice(dataset.campaign_ids)) for loop in range(loops)])
+            for _ in range(sessions)]
+
+def run_direct(db, donation, sessions):
+    latencies, round_trips = [], 0
+    started = time.perf_counter()
+    for user_id, loops in sessions:
+        for action, campaign_id in loops:
+            loop_started = time.perf_counter()
+            db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (user_id,))
+            round_trips += 1
+            if action == "add_funds":
+                db.execute("UPDATE users SET balance = balance + %s WHERE user_id = %s", (10, user_id))
+            elif action == "donate":
+                donation.donate_with_payment(user_id, campaign_id, 1)
+            latencies.append((time.perf_counter() - loop_started) * 1000)
+    result = summarize(latencies, time.perf_counter() - started)
+    result["balance_round_trips"] = round_trips
+    return result
+
+def run_sessions(db, donation, sessions, cache):
+    latencies, totals = [], {"lookups": 0, "round_trips": 0, "round_trips_saved": 0}
+    started = time.perf_counter()
+    for user_id, loops in sessions:
+        session = Session(db, (user_id, None, None, "donor"), cache)
+        for action, campaign_id in loops:
+            loop_started = time.perf_counter()
+            session.balance
+            if action == "add_funds":
+                session.add_funds(10)
+            elif action == "donate":
+                session.donate(donation, campaign_id, 1)
+            latencies.append((time.perf_counter() - loop_started) * 1000)
+        for name in totals:
+            totals[name] += session.stats()[name]
+    result = summarize(latencies, time.perf_counter() - started)
+    result["balance_round_trips"] = totals["round_trips"]
+    result["round_trips_saved"] = totals["round_trips_saved"]
+    result["hit_rate"] = totals["round_trips_saved"] / totals["lookups"] if totals["lookups"] else 0.0
+    result["cache"] = cache.stats()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--loops", type=int, default=20, help="dashboard loops per session")
+    parser.add_argument("--write-every", type=int, default=5, help="add funds or donate every N loops")
+    parser.add_argument("--ttl", type=float, default=300)
+    parser.add_argument("--max-entries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "session.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, users=args.users, campaigns=20, donations=0, events=0, volunteers=0,
+                                   seed=args.seed, verbose=False)
+                db.execute("UPDATE users SET balance = %s", (10 ** 6,))
+                sessions = plan(dataset, args.sessions, args.loops, args.write_every, args.seed)
+                donation = Donation(db)
+                report["database each loop"] = run_direct(db, donation, sessions)
+                report["session cache"] = run_sessions(db, donation, sessions,
+                                                       TTLCache(ttl=args.ttl, max_entries=args.max_entries))
+        finally:
+            with quiet():
+                db.close()
+
+    cached = report["session cache"]
+    print(f"\n{args.sessions:,} sessions x {args.loops} loops; balance round trips "
+          f"{report['database each loop']['balance_round_trips']:,} -> {cached['balance_round_trips']:,} "
+          f"({cached['round_trips_saved']:,} saved, hit rate {cached['hit_rate']:.1%})")
+    print(f"{'balance read':20} {'loops/sec':>10} {'p50':>10} {'p99':>10}")
+    for name, result in report.items():
+        print(f"{name:20} {result['throughput_per_sec']:10,.1f} {result['p50_ms']:8.3f}ms {result['p99_ms']:8.3f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Per-call cost of the hot queries with and without the statement cache.
+
+Runs login, the dashboard balance lookup, the campaign/user/event existence
+checks and the donation insert ``--iterations`` times against a Database
+without statement caching (SQLite's own compiled-statement cache disabled too)
+and against one with the default cache::
+
+    python -m benchmarks.bench_statement_cache --iterations 20000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet
+from benchmarks.datagen import SCALES, generate, user_email, user_password
+from database import Database
+from migrations import MigrationRunner
+from user import User
+
+def hot_queries(db, dataset, rng):
+    user = User(db)
+    donor_ids = dataset.donor_ids
+    campaign_ids = dataset.campaign_ids
+    event_ids = dataset.event_ids
+
+    def login():
+        user_id = rng.choice(donor_ids)
+        user.login(user_email(user_id), user_password(user_id))
+
+    return {
+        "User.login": login,
+        "get_user_balance": lambda: user.get_balance(rng.choice(donor_ids)),
+        "campaign exists": lambda: db.fetch_one("SELECT COUNT(*) FROM campaigns WHERE campaign_id = %s",
+                                                (rng.choice(campaign_ids),)),
+        "volunteer user lookup": lambda: db.fetch("SELECT name FROM users WHERE user_id = %s",
+                                                  (rng.choice(donor_ids),)),
+        "volunteer event lookup": lambda: db.fetch("SELECT event_id FROM events WHERE event_id = %s",
+                                                   (rng.choice(event_ids),)),
+        "donation insert": lambda: db.execute(
+            "INSERT INTO donations (user_id, campaign_id, amount, donation_date) VALUES (%s, %s, %s, NOW())",
+            (rng.choice(donor_ids), rng.choice(campaign_ids), 1.00)),
+    }
+
+def measure(db, dataset, iterations, seed):
+    results = {}
+    for name, query in hot_queries(db, dataset, random.Random(seed)).items():
+        for _ in range(min(iterations // 10, 1000)):
+            query()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            query()
+        results[name] = (time.perf_counter() - started) / iterations * 1e6
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="tiny")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "statements.db")
+        if args.use_configured_db:
+            make_db = lambda cached: Database(pool_size=1, backend=backend_from_env(),
+                                              statement_cache_size=64 if cached else 0)
+        else:
+            make_db = lambda cached: Database(pool_size=1, backend=SQLiteBackend(path, cached_statements=128 if cached else 0),
+                                              statement_cache_size=64 if cached else 0)
+
+        report = {}
+        with quiet():
+            db = make_db(True)
+            try:
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+            finally:
+                db.close()
+            for mode, cached in (("uncached", False), ("cached", True)):
+                db = make_db(cached)
+                try:
+                    report[mode] = measure(db, dataset, args.iterations, args.seed)
+                    if cached:
+                        report["statement_cache"] = db.statement_cache_stats()
+                finally:
+                    db.close()
+
+    print(f"\n{'query':26} {'uncached':>11} {'cached':>11} {'saved/call':>11}")
+    for name in report["uncached"]:
+        uncached, cached = report["uncached"][name], report["cached"][name]
+        print(f"{name:26} {uncached:9.1f}µs {cached:9.1f}µs {uncached - cached:9.1f}µs")
+    stats = report["statement_cache"]
+    print(f"\nStatement cache: {stats['hits']:,} hits, {stats['misses']:,} misses, "
+          f"{stats['evictions']:,} evictions ({stats['hit_rate']:.1%} hit rate)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
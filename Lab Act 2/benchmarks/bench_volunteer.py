@@ -0,0 +1,98 @@
+"""Registering a roster of volunteers: per-user loops vs one set-based call.
+
+Signs ``--roster`` generated donors up for one event three ways, clearing the
+event's signups in between:
+
+* ``three-trip loop``: the old user lookup, event lookup and INSERT per user
+* ``single-statement loop``: ``Event.volunteer`` (one INSERT ... SELECT per user)
+* ``volunteer_many``: the whole roster in one transaction
+
+::
+
+    python -m benchmarks.bench_volunteer --size small --roster 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from backends import SQLiteBackend, backend_from_env
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate
+from database import Database
+from event import Event
+from migrations import MigrationRunner
+
+def three_trip_signup(db, user_id, event_id):
+    """The signup path before it became a single statement."""
+    user_result = db.fetch("SELECT name FROM users WHERE user_id = %s", (user_id,))
+    if not user_result:
+        return False
+    if not db.fetch("SELECT event_id FROM events WHERE event_id = %s", (event_id,)):
+        return False
+    db.execute("INSERT INTO event_volunteers (user_id, event_id, name, volunteer_date) VALUES (%s, %s, %s, NOW())",
+               (user_id, event_id, user_result[0][0]))
+    return True
+
+def run_loop(signup, roster, event_id):
+    latencies = []
+    started = time.perf_counter()
+    for user_id in roster:
+        call_started = time.perf_counter()
+        signup(user_id, event_id)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="small")
+    parser.add_argument("--roster", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.use_configured_db:
+            db = Database(pool_size=1, backend=backend_from_env())
+        else:
+            db = Database(pool_size=1, backend=SQLiteBackend(os.path.join(directory, "volunteers.db")))
+        report = {}
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+                roster = list(dataset.donor_ids)[:args.roster]
+                event_id = dataset.event_ids[0]
+                event = Event(db)
+                reset = lambda: db.execute("DELETE FROM event_volunteers WHERE event_id = %s", (event_id,))
+
+                reset()
+                report["three-trip loop"] = run_loop(lambda user_id, event_id: three_trip_signup(db, user_id, event_id),
+                                                     roster, event_id)
+                reset()
+                report["single-statement loop"] = run_loop(event.volunteer, roster, event_id)
+                reset()
+                started = time.perf_counter()
+                event.volunteer_many(event_id, roster, batch_size=args.batch_size)
+                elapsed = time.perf_counter() - started
+                report["volunteer_many"] = summarize([elapsed * 1000], elapsed)
+                report["volunteer_many"]["throughput_per_sec"] = len(roster) / elapsed
+                signups = db.fetch_one("SELECT COUNT(*) FROM event_volunteers WHERE event_id = %s", (event_id,))[0]
+        finally:
+            db.close()
+
+    print(f"\nRegistering {len(roster):,} volunteers for event {event_id} ({signups:,} signups stored)")
+    print(f"{'mode':22} {'signups/sec':>12} {'total':>10}")
+    for mode, result in report.items():
+        total = len(roster) / result["throughput_per_sec"] if result["throughput_per_sec"] else 0.0
+        print(f"{mode:22} {result['throughput_per_sec']:12,.0f} {total:9.2f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
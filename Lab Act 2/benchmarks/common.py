@@ -0,0 +1,25 @@
+"""Helpers shared by the benchmark scripts."""
+import io
+import statistics
+from contextlib import redirect_stdout
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies_ms, elapsed_s):
+    """Throughput and latency percentiles for one benchmarked operation."""
+    return {
+        "calls": len(latencies_ms),
+        "throughput_per_sec": len(latencies_ms) / elapsed_s if elapsed_s else 0.0,
+        "mean_ms": statistics.fmean(latencies_ms),
+        "p50_ms": percentile(latencies_ms, 50),
+        "p90_ms": percentile(latencies_ms, 90),
+        "p99_ms": percentile(latencies_ms, 99),
+        "max_ms": max(latencies_ms),
+    }
+
+def quiet():
+    """Silence the domain classes' print output while timing them."""
+    return redirect_stdout(io.StringIO())
@@ -0,0 +1,218 @@
+"""Seeded synthetic data generator for the donation schema.
+
+Fills users, campaigns, donations, events and event_volunteers with
+reproducible data at a chosen scale, e.g.::
+
+    DB_BACKEND=sqlite DB_PATH=bench.db python -m benchmarks.datagen --scale large
+
+Generated users get the e-mail ``user<id>@example.com`` and the password
+``PASSWORD``, stored as one scrypt hash shared by every user (hashing each
+user's own would take hours at scale), so the harness's logins take the
+normal hashed path. Every 20th user is an
+organization; the rest are donors. Campaign stats are rebuilt for the new
+campaigns when the ``campaign_stats`` table exists.
+"""
+import argparse
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from campaign_stats import CampaignStats
+from database import Database
+from passwords import DEFAULT_COST, hash_password
+
+SCALES = {
+    "tiny": {"users": 200, "campaigns": 20, "donations": 2000, "events": 20, "volunteers": 500},
+    "small": {"users": 10000, "campaigns": 500, "donations": 200000, "events": 500, "volunteers": 5000},
+    "medium": {"users": 100000, "campaigns": 5000, "donations": 2000000, "events": 5000, "volunteers": 50000},
+    "large": {"users": 1000000, "campaigns": 50000, "donations": 20000000, "events": 50000, "volunteers": 500000},
+}
+
+ORGANIZATION_EVERY = 20
+WORDS = ("relief", "school", "water", "shelter", "food", "clinic", "books", "flood", "animal", "youth",
+         "garden", "medical", "housing", "coastal", "library", "scholarship", "rescue", "community")
+LOCATIONS = ("Batangas City", "Lipa City", "Tanauan", "Manila", "Quezon City", "Makati", "Cebu City",
+             "Davao City", "Iloilo City", "Baguio")
+
+def user_role(user_id):
+    return "organization" if user_id % ORGANIZATION_EVERY == 0 else "donor"
+
+def user_email(user_id):
+    return f"user{user_id}@example.com"
+
+PASSWORD = "password"
+
+def user_password(user_id):
+    return PASSWORD
+
+class Dataset:
+    """ID ranges of the rows written by one generator run."""
+
+    def __init__(self, first_user, users, first_campaign, campaigns, first_event, events):
+        self.user_ids = range(first_user, first_user + users)
+        self.campaign_ids = range(first_campaign, first_campaign + campaigns)
+        self.event_ids = range(first_event, first_event + events)
+        self.org_ids = [user_id for user_id in self.user_ids if user_role(user_id) == "organization"]
+        self.donor_ids = [user_id for user_id in self.user_ids if user_role(user_id) == "donor"]
+
+def _next_id(db, table, column):
+    row = db.fetch_one(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return int(row[0]) + 1
+
+def _insert_rows(db, table, columns, rows, batch_size):
+    """Write ``rows`` with multi-row INSERTs, one transaction per batch."""
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    column_list = ", ".join(columns)
+    written = 0
+    batch = []
+
+    def flush():
+        values = [value for row in batch for value in row]
+        with db.transaction() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) VALUES {', '.join([row_placeholder] * len(batch))}",
+                values,
+            )
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            flush()
+            written += len(batch)
+            batch = []
+    if batch:
+        flush()
+        written += len(batch)
+    return written
+
+def _has_table(db, table):
+    try:
+        with db.transaction() as cursor:
+            cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+            cursor.fetchall()
+        return True
+    except Exception:
+        return False
+
+def generate(db, users, campaigns, donations, events, volunteers, seed=42, batch_size=1000, verbose=True,
+             password_cost=DEFAULT_COST):
+    """Populate the schema and return a Dataset describing the new rows; passwords are hashed at ``password_cost``."""
+    rng = random.Random(seed)
+    first_user = _next_id(db, "users", "user_id")
+    first_campaign = _next_id(db, "campaigns", "campaign_id")
+    first_event = _next_id(db, "events", "event_id")
+    dataset = Dataset(first_user, users, first_campaign, campaigns, first_event, events)
+    if not dataset.org_ids or not dataset.donor_ids:
+        raise ValueError(f"Need at least {ORGANIZATION_EVERY} users to get both donors and organizations.")
+    today = datetime.date.today()
+    now = datetime.datetime.now().replace(microsecond=0)
+
+    def log(table, count, started):
+        if verbose:
+            elapsed = time.perf_counter() - started
+            print(f"  {table}: {count:,} rows in {elapsed:.1f}s ({count / elapsed if elapsed else 0:,.0f} rows/sec)")
+
+    started = time.perf_counter()
+    password_hash = hash_password(PASSWORD, password_cost)
+    user_rows = (
+        (user_id, f"User {user_id}", user_email(user_id), password_hash, user_role(user_id),
+         round(rng.uniform(0, 5000), 2))
+        for user_id in dataset.user_ids
+    )
+    log("users", _insert_rows(db, "users", ("user_id", "name", "email", "password", "role", "balance"),
+                              user_rows, batch_size), started)
+
+    started = time.perf_counter()
+    campaign_rows = []
+    for campaign_id in dataset.campaign_ids:
+        title = " ".join(rng.sample(WORDS, 3)).title()
+        campaign_rows.append((
+            campaign_id, title, f"Help fund {title.lower()} projects.", round(rng.uniform(1000, 500000), 2),
+            0, today + datetime.timedelta(days=rng.randint(-60, 365)),
+            "active" if rng.random() < 0.8 else "closed", rng.choice(dataset.org_ids),
+        ))
+    log("campaigns", _insert_rows(
+        db, "campaigns",
+        ("campaign_id", "title", "description", "goal_amount", "funds_raised", "deadline", "status", "user_id"),
+        campaign_rows, batch_size), started)
+
+    started = time.perf_counter()
+    totals = {}
+
+    def donation_rows():
+        for _ in range(donations):
+            campaign_id = rng.choice(dataset.campaign_ids)
+            amount = Decimal(str(round(min(rng.lognormvariate(3.5, 1.2), 99999), 2)))
+            totals[campaign_id] = totals.get(campaign_id, Decimal("0")) + amount
+            donated_at = now - datetime.timedelta(seconds=rng.randint(0, 2 * 365 * 24 * 3600))
+            yield (rng.choice(dataset.donor_ids), campaign_id, amount, donated_at)
+
+    log("donations", _insert_rows(db, "donations", ("user_id", "campaign_id", "amount", "donation_date"),
+                                  donation_rows(), batch_size), started)
+    # Keep the denormalized counter consistent with the generated ledger
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "UPDATE campaigns SET funds_raised = %s WHERE campaign_id = %s",
+            [(total, campaign_id) for campaign_id, total in totals.items()],
+        )
+
+    started = time.perf_counter()
+    event_rows = []
+    for event_id in dataset.event_ids:
+        event_rows.append((
+            event_id, f"{rng.choice(WORDS).title()} Drive {event_id}",
+            today + datetime.timedelta(days=rng.randint(-90, 180)), rng.choice(LOCATIONS),
+            f"Volunteer for our {rng.choice(WORDS)} drive.", "active" if rng.random() < 0.85 else "inactive",
+            rng.choice(dataset.org_ids),
+        ))
+    log("events", _insert_rows(
+        db, "events", ("event_id", "name", "date", "location", "description", "status", "user_id"),
+        event_rows, batch_size), started)
+
+    started = time.perf_counter()
+    max_pairs = len(dataset.donor_ids) * events
+    volunteers = min(volunteers, max_pairs)
+    pairs = set()
+
+    def volunteer_rows():
+        while len(pairs) < volunteers:
+            pair = (rng.choice(dataset.donor_ids), rng.choice(dataset.event_ids))
+            if pair in pairs:
+                continue
+            pairs.add(pair)
+            joined_at = now - datetime.timedelta(seconds=rng.randint(0, 180 * 24 * 3600))
+            yield (pair[0], pair[1], f"User {pair[0]}", joined_at)
+
+    log("event_volunteers", _insert_rows(db, "event_volunteers", ("user_id", "event_id", "name", "volunteer_date"),
+                                         volunteer_rows(), batch_size), started)
+
+    if _has_table(db, "campaign_stats"):
+        started = time.perf_counter()
+        CampaignStats(db).rebuild(dataset.campaign_ids, chunk_size=batch_size)
+        log("campaign_stats", len(dataset.campaign_ids), started)
+    return dataset
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for table in ("users", "campaigns", "donations", "events", "volunteers"):
+        parser.add_argument(f"--{table}", type=int, help=f"override the number of {table} for the scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    volumes = dict(SCALES[args.scale])
+    for table in volumes:
+        if getattr(args, table) is not None:
+            volumes[table] = getattr(args, table)
+
+    db = Database()
+    try:
+        print(f"Generating {args.scale} dataset (seed {args.seed}): {volumes}")
+        generate(db, seed=args.seed, batch_size=args.batch_size, **volumes)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
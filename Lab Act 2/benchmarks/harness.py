@@ -0,0 +1,118 @@
+"""Time the public domain-class methods across data sizes and report JSON.
+
+Each size gets a fresh embedded SQLite database filled by ``datagen`` (or,
+with ``--use-configured-db``, the database selected by the DB_* environment
+variables), then every operation is called ``--iterations`` times with
+randomly chosen users, campaigns and events::
+
+    python -m benchmarks.harness --sizes tiny small --output bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+from backends import SQLiteBackend
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate, user_email, user_password
+from campaign import Campaign
+from database import Database
+from donation import Donation
+from event import Event
+from migrations import MigrationRunner
+from user import User
+
+def build_operations(db, dataset, rng):
+    """Map operation names to zero-argument callables with random arguments."""
+    campaign = Campaign(db)
+    donation = Donation(db)
+    event = Event(db)
+    user = User(db)
+    donor_ids = dataset.donor_ids
+    org_ids = dataset.org_ids
+    campaign_ids = dataset.campaign_ids
+
+    def login():
+        user_id = rng.choice(donor_ids)
+        user.login(user_email(user_id), user_password(user_id))
+
+    return {
+        "campaign.view_active_campaigns": lambda: campaign.view_active_campaigns(),
+        "campaign.view_my_campaign_donations": lambda: campaign.view_my_campaign_donations(rng.choice(org_ids)),
+        "event.view_active_events": lambda: event.view_active_events(rng.choice(donor_ids)),
+        "event.view_my_events": lambda: event.view_my_events(rng.choice(org_ids)),
+        "donation.view_donation_history": lambda: donation.view_donation_history(rng.choice(donor_ids)),
+        "user.login": login,
+        "donation.donate": lambda: donation.donate_with_payment(
+            rng.choice(donor_ids), rng.choice(campaign_ids), 1.00),
+    }
+
+def time_operation(operation, iterations):
+    latencies = []
+    started = time.perf_counter()
+    with quiet():
+        for _ in range(iterations):
+            call_started = time.perf_counter()
+            operation()
+            latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+def run_size(size, db, iterations, only, seed):
+    print(f"▶ {size}: generating {SCALES[size]}")
+    with quiet():
+        MigrationRunner(db).migrate()
+    dataset = generate(db, seed=seed, **SCALES[size])
+    operations = build_operations(db, dataset, random.Random(seed))
+    results = {}
+    for name, operation in operations.items():
+        if only and name not in only:
+            continue
+        results[name] = time_operation(operation, iterations)
+        print(f"  {name}: {results[name]['throughput_per_sec']:,.1f} ops/sec, "
+              f"p99 {results[name]['p99_ms']:.2f} ms")
+    return {"volumes": SCALES[size], "operations": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SCALES), default=["tiny", "small"])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", nargs="*", help="operation names to run (default: all)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="benchmark the DB_* database instead of a fresh SQLite file per size")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            if args.use_configured_db:
+                db = Database()
+            else:
+                db = Database(backend=SQLiteBackend(os.path.join(directory, f"{size}.db")))
+            report["backend"] = db.dialect
+            try:
+                report["sizes"][size] = run_size(size, db, args.iterations, args.only, args.seed)
+            finally:
+                db.close()
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(payload)
+        print(f"📄 Report written to {args.output}")
+    else:
+        print(payload)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Load test for the JSON API.
+
+Starts ``api.py`` in-process on a fresh SQLite file filled by ``datagen`` (or
+targets a running server with ``--url``), then keeps ``--clients`` keep-alive
+connections busy with a weighted mix of endpoints for ``--duration`` seconds
+and reports sustained requests/sec and latency percentiles per endpoint. Each
+client logs in as one donor first and sends that session token, so the user
+routes act as that donor::
+
+    python -m benchmarks.loadtest --size tiny --clients 16 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from api import make_server
+from backends import SQLiteBackend
+from benchmarks.common import quiet, summarize
+from benchmarks.datagen import SCALES, generate, user_email, user_password
+from cache import TTLCache
+from database import Database
+from migrations import MigrationRunner
+
+def login_request(user_id):
+    return "POST", "/login", {"email": user_email(user_id), "password": user_password(user_id)}
+
+def build_mix(dataset):
+    """(name, weight, request factory) for every endpoint in the mix; factories take the rng and the client's user."""
+    donor_ids = dataset.donor_ids
+    org_ids = dataset.org_ids
+    campaign_ids = dataset.campaign_ids
+    event_ids = dataset.event_ids
+
+    return [
+        ("GET /campaigns", 20, lambda rng, user_id: ("GET", "/campaigns", None)),
+        ("GET /campaigns/<id>", 15, lambda rng, user_id: ("GET", f"/campaigns/{rng.choice(campaign_ids)}", None)),
+        ("GET /users/<id>/donations", 15, lambda rng, user_id: ("GET", f"/users/{user_id}/donations", None)),
+        ("GET /users/<id>/balance", 10, lambda rng, user_id: ("GET", f"/users/{user_id}/balance", None)),
+        ("GET /events", 10, lambda rng, user_id: ("GET", f"/events?user_id={user_id}", None)),
+        ("GET /events/<id>/volunteers", 5,
+         lambda rng, user_id: ("GET", f"/events/{rng.choice(event_ids)}/volunteers", None)),
+        ("GET /organizations/<id>/campaigns", 5,
+         lambda rng, user_id: ("GET", f"/organizations/{rng.choice(org_ids)}/campaigns", None)),
+        ("POST /login", 10, lambda rng, user_id: login_request(rng.choice(donor_ids))),
+        ("POST /donations", 10, lambda rng, user_id: ("POST", "/donations", {
+            "campaign_id": rng.choice(campaign_ids), "amount": "1.00"})),
+    ]
+
+def run_clients(host, port, mix, clients, duration, seed, user_ids):
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    factories = {name: factory for name, _, factory in mix}
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        user_id = user_ids[index % len(user_ids)]
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        try:
+            method, path, body = login_request(user_id)
+            connection.request(method, path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+            token = json.loads(connection.getresponse().read())["token"]
+            headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path, body = factories[name](rng, user_id)
+                data = json.dumps(body) if body is not None else None
+                started = time.perf_counter()
+                try:
+                    connection.request(method, path, body=data, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status >= 500:
+                        local_errors[name] += 1
+                except (OSError, http.client.HTTPException):
+                    local_errors[name] += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection(host, port, timeout=30)
+                local[name].append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+            with lock:
+                for name in names:
+                    latencies[name].extend(local[name])
+                    errors[name] += local_errors[name]
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for name in names:
+        if latencies[name]:
+            report[name] = dict(summarize(latencies[name], elapsed), errors=errors[name])
+    total = [latency for name in names for latency in latencies[name]]
+    report["total"] = dict(summarize(total, elapsed), errors=sum(errors.values()))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SCALES), default="tiny")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="load-test a running server whose fresh database was filled by datagen with the same --size/--seed")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(pool_size=args.workers, backend=SQLiteBackend(os.path.join(directory, "loadtest.db")))
+        server = None
+        try:
+            with quiet():
+                MigrationRunner(db).migrate()
+                dataset = generate(db, seed=args.seed, verbose=False, **SCALES[args.size])
+            if args.url:
+                url = urlsplit(args.url)
+                host, port = url.hostname, url.port or 80
+            else:
+                server = make_server(db, TTLCache(ttl=60), port=0, workers=args.workers)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                host, port = server.server_address
+            print(f"▶ {args.clients} clients for {args.duration:.0f}s against http://{host}:{port}")
+            with quiet():
+                report = run_clients(host, port, build_mix(dataset), args.clients, args.duration, args.seed,
+                                     dataset.donor_ids)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            db.close()
+
+    print(f"\n{'endpoint':34} {'req/s':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'errors':>7}")
+    for name, result in report.items():
+        print(f"{name:34} {result['throughput_per_sec']:9,.1f} {result['p50_ms']:6.2f}ms {result['p90_ms']:6.2f}ms "
+              f"{result['p99_ms']:6.2f}ms {result['errors']:7}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"size": args.size, "clients": args.clients, "workers": args.workers, "endpoints": report},
+                      output, indent=2)
+
+if __name__ == "__main__":
+    main()
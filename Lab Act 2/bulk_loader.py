@@ -0,0 +1,531 @@
+"""Stream mysqldump and CSV files into the database, and tables back out.
+
+``load`` reads dumps made of multi-row ``INSERT ... VALUES (...),(...)``
+statements (like ``Database/*.sql``) and CSV files (``<table>.csv`` or
+``<table>-00001.csv``: a header row of column names, ``\\N`` for NULL) a
+buffer at a time, so files larger than memory are fine. Rows are inserted
+with ``executemany`` in batches of ``--batch-size``, one transaction per
+batch, on a connection with foreign key (and on MySQL, unique) checks off.
+The ``CREATE TABLE`` statements in dumps run first and replace the tables
+(use ``--data-only`` to append instead); on SQLite their indexes are built
+after the rows. A database with applied migrations always loads data only,
+since the dumped tables lack the migrations' indexes and columns. Files then
+load in parallel on ``--workers`` connections, each one starting when the
+files holding the tables it references are done. Loading campaigns or
+donations rebuilds ``campaign_stats``, ``donor_totals`` and the rollups
+where those tables exist; running services should rebuild their
+leaderboards afterwards.
+
+``export`` streams tables into CSV files or multi-row INSERT files of at
+most ``--chunk-rows`` rows each, which ``load`` reads back. Both directions
+report rows/sec::
+
+    python bulk_loader.py load "Database/*.sql"
+    python bulk_loader.py load exports/*.csv [--workers 4] [--batch-size 5000] [--data-only]
+    python bulk_loader.py export exports [--format sql] [--tables donations users] [--chunk-rows 100000]
+"""
+import argparse
+import csv
+import glob
+import inspect
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from decimal import Decimal
+
+from backends import create_table_columns, translate_create_table, unescape_string
+from campaign_stats import CampaignStats
+from database import Database
+from leaderboard import rebuild_donor_totals
+from rollups import TABLES as ROLLUP_TABLES, DonationRollups
+
+CHUNK_SIZE = 1 << 20
+NULL = "\\N"
+# Statements that turn the integrity checks off for a bulk load, and back on
+CHECKS = {
+    "mysql": (("SET FOREIGN_KEY_CHECKS = 0", "SET UNIQUE_CHECKS = 0"),
+              ("SET UNIQUE_CHECKS = 1", "SET FOREIGN_KEY_CHECKS = 1")),
+    "sqlite": (("PRAGMA foreign_keys = OFF",), ("PRAGMA foreign_keys = ON",)),
+}
+
+_INSERT = re.compile(r"INSERT\s+INTO\s+`?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.IGNORECASE)
+_CREATE = re.compile(r"CREATE\s+TABLE\s+`?(\w+)`?", re.IGNORECASE)
+# One parenthesized row and the ',' or ';' after it, then the values inside it
+_ROW = re.compile(r"\s*\(((?:'(?:[^'\\]++|\\.|'')*+'|[^'()]++)*+)\)\s*([,;])", re.DOTALL)
+_VALUE = re.compile(r"\s*(?:'((?:[^'\\]++|\\.|'')*+)'|([^\s,']+))\s*(?:,|$)", re.DOTALL)
+_SQL_ESCAPES = str.maketrans({"\\": "\\\\", "'": "\\'", "\n": "\\n", "\r": "\\r", "\0": "\\0", "\x1a": "\\Z"})
+_CSV_NAME = re.compile(r"^(\w+?)(?:-\d+)?\.csv$", re.IGNORECASE)
+
+class _Stream:
+    """Buffered reader over a text file that hands out regex matches and lines."""
+
+    def __init__(self, handle, chunk_size=CHUNK_SIZE):
+        self.__handle = handle
+        self.__chunk_size = chunk_size
+        self.__buffer = ""
+        self.__pos = 0
+        self.__eof = False
+
+    def __fill(self):
+        chunk = self.__handle.read(self.__chunk_size)
+        if not chunk:
+            self.__eof = True
+            return False
+        self.__buffer = self.__buffer[self.__pos:] + chunk
+        self.__pos = 0
+        return True
+
+    def match(self, pattern):
+        """Match ``pattern`` at the read position, reading on while the match could run into unread text.
+
+        A match followed by a quote doesn't count either: ``'a'`` read so far
+        could be the start of ``'a''b'``.
+        """
+        while True:
+            match = pattern.match(self.__buffer, self.__pos)
+            if self.__eof or (match and match.end() < len(self.__buffer) and self.__buffer[match.end()] != "'"):
+                if match:
+                    self.__pos = match.end()
+                return match
+            self.__fill()
+
+    def startswith(self, prefix):
+        while len(self.__buffer) - self.__pos < len(prefix) and not self.__eof:
+            self.__fill()
+        return self.__buffer.startswith(prefix, self.__pos)
+
+    def readline(self):
+        """The next line, or "" at the end of the file."""
+        while True:
+            end = self.__buffer.find("\n", self.__pos)
+            if end >= 0:
+                line = self.__buffer[self.__pos:end + 1]
+                self.__pos = end + 1
+                return line
+            if not self.__fill():
+                line = self.__buffer[self.__pos:]
+                self.__pos = len(self.__buffer)
+                return line
+
+    def skip_line(self):
+        """Move past the end of the current line without keeping it."""
+        while True:
+            end = self.__buffer.find("\n", self.__pos)
+            if end >= 0:
+                self.__pos = end + 1
+                return
+            self.__pos = len(self.__buffer)
+            if not self.__fill():
+                return
+
+def _tuples(stream):
+    """Yield the value tuples of one INSERT, up to and including its semicolon."""
+    while True:
+        match = stream.match(_ROW)
+        if match is None:
+            raise ValueError("Malformed INSERT values in dump.")
+        # A bare value is never empty, so an empty one means the value was quoted
+        yield tuple([(None if bare.upper() == "NULL" else bare) if bare else unescape_string(quoted)
+                     for quoted, bare in _VALUE.findall(match.group(1))])
+        if match.group(2) == ";":
+            return
+
+def _columns(column_list):
+    if not column_list:
+        return None
+    return tuple(column.strip().strip("`") for column in column_list.split(","))
+
+def _dump_items(stream):
+    """Yield ("create", table, statement, None) and ("insert", table, columns, rows).
+
+    ``rows`` reads from the stream, so it has to be used before the next item
+    is asked for; rows left unread are skipped to the end of the line, which
+    is where mysqldump ends every INSERT.
+    """
+    statement = []
+    while True:
+        if not statement and stream.startswith("INSERT"):
+            match = stream.match(_INSERT)
+            if match is None:
+                raise ValueError("Malformed INSERT statement in dump.")
+            rows = _tuples(stream)
+            yield "insert", match.group(1), _columns(match.group(2)), rows
+            if inspect.getgeneratorstate(rows) != inspect.GEN_CLOSED:
+                rows.close()
+                stream.skip_line()
+            continue
+        line = stream.readline()
+        if not line:
+            return
+        stripped = line.strip()
+        if not statement and (not stripped or stripped.startswith(("--", "/*"))):
+            continue
+        statement.append(line)
+        if stripped.endswith(";"):
+            text = "".join(statement).strip()
+            statement = []
+            match = _CREATE.match(text)
+            if match:
+                yield "create", match.group(1), text, None
+
+def _csv_items(handle, table):
+    reader = csv.reader(handle)
+    columns = next(reader, None)
+    if columns:
+        yield "insert", table, tuple(columns), (tuple(None if value == NULL else value for value in row)
+                                                for row in reader)
+
+def _csv_table(path):
+    match = _CSV_NAME.match(os.path.basename(path))
+    if match is None:
+        raise ValueError(f"Can't tell the table from the file name {path!r}; use <table>.csv.")
+    return match.group(1)
+
+@contextmanager
+def _items(path, chunk_size=CHUNK_SIZE):
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as handle:
+            yield _csv_items(handle, _csv_table(path))
+    else:
+        with open(path, encoding="utf-8") as handle:
+            yield _dump_items(_Stream(handle, chunk_size))
+
+def read_rows(path, chunk_size=CHUNK_SIZE):
+    """Yield ``(table, columns, row)`` for every row in a dump or CSV file; values are strings or None."""
+    with _items(path, chunk_size) as items:
+        for kind, table, columns, rows in items:
+            if kind == "insert":
+                for row in rows:
+                    yield table, columns, row
+
+def scan_dump(path):
+    """The ``(table, CREATE TABLE)`` pairs in a dump and the tables it inserts into, skipping the rows."""
+    creates, tables = [], []
+    with _items(path) as items:
+        for kind, table, statement, _ in items:
+            if kind == "create":
+                creates.append((table, statement))
+            elif table not in tables:
+                tables.append(table)
+    return creates, tables
+
+@contextmanager
+def _unchecked(db):
+    """A pooled connection and cursor with the integrity checks off until the block ends."""
+    off, on = CHECKS[db.dialect]
+    with db.connection() as connection:
+        cursor = db.backend.cursor(connection)
+        try:
+            for statement in off:
+                cursor.execute(statement)
+            yield connection, cursor
+        finally:
+            for statement in on:
+                cursor.execute(statement)
+            cursor.close()
+
+def _apply_schema(db, creates):
+    """Recreate the dumped tables; returns the SQLite index statements to run after the rows."""
+    deferred = []
+    with _unchecked(db) as (connection, cursor):
+        for table, _ in creates:
+            cursor.execute(f"DROP TABLE IF EXISTS `{table}`")
+        for _, statement in creates:
+            if db.dialect == "sqlite":
+                create, *indexes = translate_create_table(statement)
+                cursor.execute(create)
+                deferred.extend(indexes)
+            else:
+                cursor.execute(statement)
+    return deferred
+
+def table_dependencies(db, tables):
+    """Map each table to the other tables its foreign keys reference."""
+    dependencies = {}
+    for table in tables:
+        if db.dialect == "sqlite":
+            referenced = {row[2] for row in db.fetch(f"PRAGMA foreign_key_list(`{table}`)")}
+        else:
+            referenced = {row[0] for row in db.fetch(
+                "SELECT DISTINCT REFERENCED_TABLE_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND REFERENCED_TABLE_NAME IS NOT NULL",
+                (table,))}
+        dependencies[table] = referenced - {table}
+    return dependencies
+
+def _insert_sql(table, columns, width):
+    column_list = f" ({', '.join(f'`{column}`' for column in columns)})" if columns else ""
+    return f"INSERT INTO `{table}`{column_list} VALUES ({', '.join(['%s'] * width)})"
+
+def _load_file(db, path, batch_size, dump_columns=None):
+    started = time.perf_counter()
+    counts = Counter()
+    with _unchecked(db) as (connection, cursor), _items(path) as items:
+        batch, target = [], None
+
+        def flush():
+            if not batch:
+                return
+            table, columns = target
+            db.backend.begin(connection)
+            try:
+                cursor.executemany(_insert_sql(table, columns, len(batch[0])), batch)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            counts[table] += len(batch)
+            batch.clear()
+
+        for kind, table, columns, rows in items:
+            if kind != "insert":
+                continue
+            # Name the dumped columns so rows still fit a table that migrations added columns to
+            columns = columns or (dump_columns or {}).get(table)
+            # Consecutive INSERTs into one table share batches
+            if (table, columns) != target:
+                flush()
+                target = (table, columns)
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+    elapsed = time.perf_counter() - started
+    return {"file": path, "tables": dict(counts), "rows": sum(counts.values()), "seconds": elapsed}
+
+def _run_in_order(units, dependencies, workers, work):
+    """Run ``work(path)`` for each ``(path, tables)`` unit once the units holding the tables it references are done."""
+    unfinished = Counter(table for _, tables in units for table in tables)
+    pending = list(units)
+    running = {}
+    results = []
+
+    def ready(unit):
+        path, tables = unit
+        needed = set().union(*(dependencies.get(table, ()) for table in tables)) - set(tables)
+        return not any(unfinished[table] for table in needed)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            startable = [unit for unit in pending if ready(unit)]
+            if not startable and not running:
+                # A reference cycle: the checks are off, so load what is left anyway
+                startable = list(pending)
+            for unit in startable:
+                pending.remove(unit)
+                running[executor.submit(work, unit[0])] = unit
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                _, tables = running.pop(future)
+                results.append(future.result())
+                for table in tables:
+                    unfinished[table] -= 1
+    return results
+
+def _report(results, started):
+    elapsed = time.perf_counter() - started
+    rows = sum(result["rows"] for result in results)
+    return {"results": results, "rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed if elapsed else 0.0}
+
+def migrated_versions(db):
+    """Versions listed in ``schema_migrations``, or an empty list if migrations never ran."""
+    if "schema_migrations" not in list_tables(db):
+        return []
+    return [row[0] for row in db.fetch("SELECT version FROM schema_migrations ORDER BY version")]
+
+def _rebuild_derived(db, loaded_tables, leaderboard=None):
+    """Recompute the summaries kept alongside the donation ledger; the loader bypasses their write paths."""
+    if not loaded_tables & {"campaigns", "donations"}:
+        return
+    tables = set(list_tables(db))
+    if "campaign_stats" in tables:
+        CampaignStats(db).rebuild()
+    if "donor_totals" in tables:
+        rebuild_donor_totals(db)
+    if set(ROLLUP_TABLES.values()) <= tables and "watermarks" in tables:
+        DonationRollups(db).rebuild()
+    if leaderboard is not None:
+        leaderboard.rebuild()
+
+def load(db, paths, workers=4, batch_size=5000, schema=None, leaderboard=None):
+    """Load dump and CSV files; returns per-file results plus total rows, seconds and rows/sec.
+
+    ``schema=None`` replaces the dumped tables unless the database is
+    migrated, in which case only the rows load. ``schema=True`` on a migrated
+    database raises ValueError; ``schema=False`` always appends.
+    """
+    started = time.perf_counter()
+    units, creates = [], []
+    for path in paths:
+        if path.lower().endswith(".csv"):
+            units.append((path, (_csv_table(path),)))
+        else:
+            file_creates, tables = scan_dump(path)
+            creates.extend(file_creates)
+            units.append((path, tuple(tables)))
+    if schema is not False and creates:
+        versions = migrated_versions(db)
+        if versions and schema:
+            raise ValueError(f"The database is migrated to version {versions[-1]}; replacing its tables would drop "
+                             "the migrated indexes. Load with schema=False (--data-only).")
+        if versions:
+            print(f"ℹ️ The database is migrated to version {versions[-1]}; loading data only.")
+            schema = False
+    indexes = _apply_schema(db, creates) if schema is not False and creates else []
+    dependencies = table_dependencies(db, {table for _, tables in units for table in tables})
+    dump_columns = {table: create_table_columns(statement) for table, statement in creates}
+    results = _run_in_order(units, dependencies, workers,
+                            lambda path: _load_file(db, path, batch_size, dump_columns))
+    if indexes:
+        with _unchecked(db) as (_, cursor):
+            for statement in indexes:
+                cursor.execute(statement)
+    _rebuild_derived(db, {table for result in results for table in result["tables"]}, leaderboard)
+    return _report(results, started)
+
+def list_tables(db):
+    if db.dialect == "sqlite":
+        rows = db.fetch("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    else:
+        rows = db.fetch("SELECT TABLE_NAME FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME")
+    return [row[0] for row in rows]
+
+def _sql_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    return "'" + str(value).translate(_SQL_ESCAPES) + "'"
+
+class _ChunkWriter:
+    """Writes one table's rows into numbered CSV or INSERT files of at most ``chunk_rows`` rows."""
+
+    def __init__(self, directory, table, columns, fmt, chunk_rows, rows_per_statement):
+        self.directory = directory
+        self.table = table
+        self.columns = columns
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self.rows_per_statement = rows_per_statement
+        self.files = []
+        self.__handle = None
+        self.__written = 0
+        self.__statement = []
+
+    def open_chunk(self):
+        self.close()
+        path = os.path.join(self.directory, f"{self.table}-{len(self.files) + 1:05d}.{self.fmt}")
+        self.files.append(path)
+        self.__handle = open(path, "w", newline="" if self.fmt == "csv" else None, encoding="utf-8")
+        self.__written = 0
+        if self.fmt == "csv":
+            self.__csv = csv.writer(self.__handle)
+            self.__csv.writerow(self.columns)
+
+    def __flush_statement(self):
+        if self.__statement:
+            column_list = ", ".join(f"`{column}`" for column in self.columns)
+            self.__handle.write(f"INSERT INTO `{self.table}` ({column_list}) VALUES {','.join(self.__statement)};\n")
+            self.__statement = []
+
+    def write(self, rows):
+        for row in rows:
+            if self.__handle is None or self.__written >= self.chunk_rows:
+                self.open_chunk()
+            if self.fmt == "csv":
+                self.__csv.writerow([NULL if value is None else value for value in row])
+            else:
+                self.__statement.append("(" + ",".join(map(_sql_literal, row)) + ")")
+                if len(self.__statement) >= self.rows_per_statement:
+                    self.__flush_statement()
+            self.__written += 1
+
+    def close(self):
+        if self.__handle is not None:
+            self.__flush_statement()
+            self.__handle.close()
+            self.__handle = None
+
+def _export_table(db, table, directory, fmt, chunk_rows, rows_per_statement):
+    started = time.perf_counter()
+    rows = 0
+    with db.connection() as connection:
+        # Unbuffered, so big tables are read from the server as they are written out
+        cursor = db.backend.cursor(connection)
+        try:
+            cursor.execute(f"SELECT * FROM `{table}`")
+            writer = _ChunkWriter(directory, table, [column[0] for column in cursor.description], fmt,
+                                  chunk_rows, rows_per_statement)
+            try:
+                while True:
+                    chunk = cursor.fetchmany(1000)
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    rows += len(chunk)
+                if not writer.files:
+                    # An empty table still gets a file (with its CSV header)
+                    writer.open_chunk()
+            finally:
+                writer.close()
+        finally:
+            db.backend.discard_results(connection)
+            cursor.close()
+    return {"table": table, "files": writer.files, "rows": rows, "seconds": time.perf_counter() - started}
+
+def export(db, directory, tables=None, fmt="csv", chunk_rows=100000, rows_per_statement=1000, workers=4):
+    """Write ``tables`` (default: all) to ``directory``; returns per-table results plus totals and rows/sec."""
+    if fmt not in ("csv", "sql"):
+        raise ValueError("fmt must be 'csv' or 'sql'.")
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    tables = tables or list_tables(db)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(
+            lambda table: _export_table(db, table, directory, fmt, chunk_rows, rows_per_statement), tables))
+    return _report(results, started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    load_parser = subcommands.add_parser("load", help="load dump and CSV files")
+    load_parser.add_argument("paths", nargs="+", help="files or glob patterns")
+    load_parser.add_argument("--batch-size", type=int, default=5000)
+    load_parser.add_argument("--data-only", action="store_true", help="skip the CREATE TABLE statements in dumps")
+    export_parser = subcommands.add_parser("export", help="write tables to CSV or SQL chunks")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--format", choices=["csv", "sql"], default="csv")
+    export_parser.add_argument("--tables", nargs="+")
+    export_parser.add_argument("--chunk-rows", type=int, default=100000)
+    export_parser.add_argument("--rows-per-statement", type=int, default=1000)
+    for subparser in (load_parser, export_parser):
+        subparser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    db = Database(pool_size=args.workers + 1)
+    try:
+        if args.command == "load":
+            paths = [path for pattern in args.paths for path in sorted(glob.glob(pattern)) or [pattern]]
+            report = load(db, paths, args.workers, args.batch_size, schema=False if args.data_only else None)
+            for result in report["results"]:
+                tables = ", ".join(f"{table} {rows:,}" for table, rows in result["tables"].items()) or "no rows"
+                print(f"✅ {result['file']}: {tables} in {result['seconds']:.2f}s")
+        else:
+            report = export(db, args.directory, args.tables, args.format, args.chunk_rows,
+                            args.rows_per_statement, args.workers)
+            for result in report["results"]:
+                print(f"✅ {result['table']}: {result['rows']:,} rows to {len(result['files'])} file(s) "
+                      f"in {result['seconds']:.2f}s")
+        print(f"ℹ️ {report['rows']:,} rows in {report['seconds']:.2f}s ({report['rows_per_sec']:,.0f} rows/sec)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""In-process read-through cache shared by the domain classes."""
+import threading
+import time
+from collections import OrderedDict
+
+# Keys for the cached campaign listings and rows
+ACTIVE_CAMPAIGNS = ("campaigns", "active")
+
+def campaign_key(campaign_id):
+    return ("campaign", str(campaign_id))
+
+def joined_events_key(user_id):
+    return ("joined_events", str(user_id))
+
+def user_key(user_id):
+    return ("user", str(user_id))
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Memory is bounded twice: by number of entries and by total rows, where a
+    list or set value counts as one row per element. The least recently used entries
+    are evicted first when either limit is exceeded.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024, max_rows=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.__entries = OrderedDict()
+        self.__rows = 0
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def __weight(value):
+        return len(value) if isinstance(value, (list, set, frozenset)) else 1
+
+    def get(self, key):
+        """Return ``(True, value)`` on a fresh hit, ``(False, None)`` otherwise."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__stats["misses"] += 1
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self.__remove(key)
+                self.__stats["expirations"] += 1
+                self.__stats["misses"] += 1
+                return False, None
+            self.__entries.move_to_end(key)
+            self.__stats["hits"] += 1
+            return True, value
+
+    def set(self, key, value):
+        weight = self.__weight(value)
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            if weight > self.max_rows:
+                return
+            self.__entries[key] = (value, time.monotonic() + self.ttl)
+            self.__rows += weight
+            while len(self.__entries) > self.max_entries or self.__rows > self.max_rows:
+                oldest = next(iter(self.__entries))
+                self.__remove(oldest)
+                self.__stats["evictions"] += 1
+
+    def get_or_load(self, key, loader):
+        """Read-through helper: return the cached value or store what ``loader()`` returns."""
+        found, value = self.get(key)
+        if found:
+            return value
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        with self.__lock:
+            for key in keys:
+                if key in self.__entries:
+                    self.__remove(key)
+                    self.__stats["invalidations"] += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__rows = 0
+
+    def __remove(self, key):
+        value, _ = self.__entries.pop(key)
+        self.__rows -= self.__weight(value)
+
+    def stats(self):
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["entries"] = len(self.__entries)
+            stats["rows"] = self.__rows
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def invalidate_campaigns(cache, *campaign_ids):
+    """Drop the campaign listings and the given campaign rows after a write."""
+    if cache is None:
+        return
+    cache.invalidate(ACTIVE_CAMPAIGNS, *(campaign_key(campaign_id) for campaign_id in campaign_ids))
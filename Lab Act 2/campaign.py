@@ -1,8 +1,17 @@
 from database import Database
+from cache import ACTIVE_CAMPAIGNS, campaign_key, invalidate_campaigns
 
 class Campaign:
-    def __init__(self, db):
+    def __init__(self, db, cache=None, search=None):
         self.__db = db
+        self.__cache = cache
+        self.__search = search
+
+    def __cached_fetch(self, key, query, values=None):
+        """Serve a listing from the cache when one is configured."""
+        if self.__cache is None:
+            return self.__db.fetch(query, values)
+        return self.__cache.get_or_load(key, lambda: self.__db.fetch(query, values))
 
     def create_campaign(self, user_id, title, description, goal_amount, deadline):
         query = """
@@ -10,21 +19,36 @@ class Campaign:
         VALUES (%s, %s, %s, %s, %s, 'active', 0)
         """
         try:
-            self.__db.execute(query, (user_id, title, description, goal_amount, deadline))
+            campaign_id = self.__db.execute(query, (user_id, title, description, goal_amount, deadline))
+            invalidate_campaigns(self.__cache)
+            if self.__search is not None and campaign_id:
+                self.__search.add_campaign(campaign_id, title, description)
             print("✅ Campaign created successfully!")
             return True
         except Exception as e:
             print(f"❌ ERROR: Campaign creation failed! {e}")
 
-    def list_campaigns(self):
-        query = "SELECT * FROM campaigns"
-        campaigns = self.__db.fetch(query)
-        for campaign in campaigns:
-            print(f"{campaign[0]}: {campaign[2]} (Goal: ${campaign[4]})")
+    def get_campaigns_page(self, after_id=0, page_size=100):
+        """Return the next page of campaigns after ``after_id`` (keyset pagination)."""
+        query = "SELECT * FROM campaigns WHERE campaign_id > %s ORDER BY campaign_id LIMIT %s"
+        return self.__db.fetch(query, (after_id, page_size))
 
-    def view_active_campaigns(self):
+    def list_campaigns(self, page_size=100):
+        after_id = 0
+        while True:
+            campaigns = self.get_campaigns_page(after_id, page_size)
+            for campaign in campaigns:
+                print(f"{campaign[0]}: {campaign[2]} (Goal: ${campaign[4]})")
+            if len(campaigns) < page_size:
+                break
+            after_id = campaigns[-1][0]
+
+    def get_active_campaigns(self):
         query = "SELECT * FROM campaigns WHERE status = 'active'"
-        campaigns = self.__db.fetch(query)
+        return self.__cached_fetch(ACTIVE_CAMPAIGNS, query)
+
+    def view_active_campaigns(self):
+        campaigns = self.get_active_campaigns()
         if campaigns:
             print("\nActive Campaigns:\n")
             for campaign in campaigns:
@@ -32,10 +56,20 @@ class Campaign:
         else:
             print("\nNo active campaigns available.")
 
+    def get_campaign(self, campaign_id):
+        """Return a single campaign row, or None if it does not exist."""
+        query = "SELECT * FROM campaigns WHERE campaign_id = %s"
+        rows = self.__cached_fetch(campaign_key(campaign_id), query, (campaign_id,))
+        return rows[0] if rows else None
+
+    def get_my_campaigns(self, user_id):
+        """Return the campaigns created by this user."""
+        query = "SELECT title, description, goal_amount, funds_raised, deadline FROM campaigns WHERE user_id = %s"
+        return self.__db.fetch(query, (user_id,))
+
     def view_my_campaigns(self, user_id):
         """Fetch and display only the campaigns created by this user."""
-        query = "SELECT title, description, goal_amount, funds_raised, deadline FROM campaigns WHERE user_id = %s"
-        campaigns = self.__db.fetch(query, (user_id,))
+        campaigns = self.get_my_campaigns(user_id)
         
         if campaigns:
             print("\n📢 Your Campaigns:")
@@ -44,21 +78,31 @@ class Campaign:
         else:
             print("\nYou have not created any campaigns.")
 
-    def view_my_campaign_donations(self, user_id):
-        """Fetch and display total donations from the funds_raised column for campaigns created by a specific user."""
+    def get_my_campaign_donations(self, user_id):
+        """Return donation stats for campaigns created by a specific user.
+
+        Reads the incrementally maintained campaign_stats row of each campaign
+        instead of aggregating the donations table.
+        """
         query = """
-        SELECT campaign_id, title, funds_raised, 
-            (SELECT MAX(donation_date) FROM donations WHERE campaign_id = c.campaign_id) AS last_donation_date
+        SELECT c.campaign_id, c.title, c.funds_raised, s.last_donation_at,
+            COALESCE(s.donation_count, 0), COALESCE(s.unique_donors, 0), COALESCE(s.largest_gift, 0)
         FROM campaigns c
-        WHERE user_id = %s;
+        LEFT JOIN campaign_stats s ON s.campaign_id = c.campaign_id
+        WHERE c.user_id = %s;
         """
-        result = self.__db.fetch(query, (user_id,))
+        return self.__db.fetch(query, (user_id,))
+
+    def view_my_campaign_donations(self, user_id):
+        """Fetch and display donation stats for campaigns created by a specific user."""
+        result = self.get_my_campaign_donations(user_id)
         
         if result:
             print("\n💰 Your Campaign Donations:")
             for row in result:
                 last_donation_date = row[3] if row[3] else "No donations yet"
-                print(f"Campaign ID: {row[0]}, Title: {row[1]}, Total Donations: ${row[2]:.2f}, Last Donation Date: {last_donation_date}\n")
+                print(f"Campaign ID: {row[0]}, Title: {row[1]}, Total Donations: ${row[2]:.2f}, Last Donation Date: {last_donation_date}")
+                print(f"   Donations: {row[4]}, Unique Donors: {row[5]}, Largest Gift: ${row[6]:.2f}\n")
         else:
             print("\nNo donations found for your campaigns.")
 
@@ -0,0 +1,177 @@
+"""Incrementally maintained per-campaign donation statistics.
+
+``campaign_stats`` (created by migration 3) holds one row per campaign with
+the ledger total, donation count, unique donors, first/last donation time and
+the largest gift. The donation write paths call ``record_donation`` or
+``record_batch`` inside their transaction, before the new donation rows are
+inserted, so the summary moves in the same commit as the ledger. ``rebuild``
+recomputes rows from ``donations`` for backfills::
+
+    python campaign_stats.py rebuild [--campaign-id ID ...]
+"""
+import argparse
+
+from database import Database
+
+RECORD_DONATION = """
+UPDATE campaign_stats
+SET total_amount = total_amount + %s,
+    donation_count = donation_count + 1,
+    unique_donors = unique_donors + (
+        CASE WHEN EXISTS (SELECT 1 FROM donations WHERE campaign_id = %s AND user_id = %s) THEN 0 ELSE 1 END
+    ),
+    first_donation_at = COALESCE(first_donation_at, NOW()),
+    last_donation_at = NOW(),
+    largest_gift = GREATEST(largest_gift, %s)
+WHERE campaign_id = %s
+"""
+
+RECORD_BATCH = """
+UPDATE campaign_stats
+SET total_amount = total_amount + %s,
+    donation_count = donation_count + %s,
+    unique_donors = unique_donors + %s,
+    first_donation_at = COALESCE(first_donation_at, NOW()),
+    last_donation_at = NOW(),
+    largest_gift = GREATEST(largest_gift, %s)
+WHERE campaign_id = %s
+"""
+
+# Aggregate the ledger for campaigns; used for backfills and to seed missing rows
+AGGREGATE_FROM_LEDGER = """
+SELECT c.campaign_id, COALESCE(SUM(d.amount), 0), COUNT(d.donation_id), COUNT(DISTINCT d.user_id),
+       MIN(d.donation_date), MAX(d.donation_date), COALESCE(MAX(d.amount), 0)
+FROM campaigns c
+LEFT JOIN donations d ON d.campaign_id = c.campaign_id
+WHERE c.campaign_id IN ({placeholders})
+GROUP BY c.campaign_id
+"""
+
+INSERT_STATS = """
+INSERT INTO campaign_stats (campaign_id, total_amount, donation_count, unique_donors,
+                            first_donation_at, last_donation_at, largest_gift)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+def _seed_from_ledger(cursor, campaign_ids):
+    """Create stats rows that are missing, e.g. for campaigns loaded outside the app."""
+    campaign_ids = list(campaign_ids)
+    placeholders = ", ".join(["%s"] * len(campaign_ids))
+    cursor.execute(f"SELECT campaign_id FROM campaign_stats WHERE campaign_id IN ({placeholders})", campaign_ids)
+    present = {str(row[0]) for row in cursor.fetchall()}
+    missing = [campaign_id for campaign_id in campaign_ids if str(campaign_id) not in present]
+    if not missing:
+        return
+    cursor.execute(AGGREGATE_FROM_LEDGER.format(placeholders=", ".join(["%s"] * len(missing))), missing)
+    rows = cursor.fetchall()
+    if rows:
+        cursor.executemany(INSERT_STATS, rows)
+
+def record_donation(cursor, user_id, campaign_id, amount):
+    """Fold one donation into the stats. Call before inserting the donation row."""
+    cursor.execute(RECORD_DONATION, (amount, campaign_id, user_id, amount, campaign_id))
+    if cursor.rowcount == 0:
+        _seed_from_ledger(cursor, [campaign_id])
+        cursor.execute(RECORD_DONATION, (amount, campaign_id, user_id, amount, campaign_id))
+
+async def record_donation_async(cursor, user_id, campaign_id, amount):
+    """``record_donation`` for the ``AsyncCursor`` of ``AsyncDatabase.transaction``."""
+    await cursor.execute(RECORD_DONATION, (amount, campaign_id, user_id, amount, campaign_id))
+    if cursor.rowcount == 0:
+        await cursor.execute("SELECT 1 FROM campaign_stats WHERE campaign_id = %s", (campaign_id,))
+        if not await cursor.fetchall():
+            await cursor.execute(AGGREGATE_FROM_LEDGER.format(placeholders="%s"), (campaign_id,))
+            rows = await cursor.fetchall()
+            if rows:
+                await cursor.executemany(INSERT_STATS, rows)
+        await cursor.execute(RECORD_DONATION, (amount, campaign_id, user_id, amount, campaign_id))
+
+def record_batch(cursor, donations, chunk_size=500):
+    """Fold accepted ``(user_id, campaign_id, amount)`` rows into the stats.
+
+    Call before inserting the rows; donors who already gave to a campaign are
+    looked up once per chunk of campaigns.
+    """
+    per_campaign = {}
+    for user_id, campaign_id, amount in donations:
+        entry = per_campaign.setdefault(campaign_id, {"total": 0, "count": 0, "largest": 0, "donors": set()})
+        entry["total"] += amount
+        entry["count"] += 1
+        entry["largest"] = max(entry["largest"], amount)
+        entry["donors"].add(str(user_id))
+
+    campaign_ids = list(per_campaign)
+    for start in range(0, len(campaign_ids), chunk_size):
+        chunk = campaign_ids[start:start + chunk_size]
+        _seed_from_ledger(cursor, chunk)
+        donors = sorted({donor for campaign_id in chunk for donor in per_campaign[campaign_id]["donors"]})
+        previous = set()
+        for donor_start in range(0, len(donors), chunk_size):
+            donor_chunk = donors[donor_start:donor_start + chunk_size]
+            cursor.execute(
+                f"""
+                SELECT DISTINCT campaign_id, user_id FROM donations
+                WHERE campaign_id IN ({", ".join(["%s"] * len(chunk))})
+                  AND user_id IN ({", ".join(["%s"] * len(donor_chunk))})
+                """,
+                chunk + donor_chunk,
+            )
+            previous.update((str(row[0]), str(row[1])) for row in cursor.fetchall())
+
+        updates = []
+        for campaign_id in chunk:
+            entry = per_campaign[campaign_id]
+            new_donors = sum(1 for donor in entry["donors"] if (str(campaign_id), donor) not in previous)
+            updates.append((entry["total"], entry["count"], new_donors, entry["largest"], campaign_id))
+        cursor.executemany(RECORD_BATCH, updates)
+
+class CampaignStats:
+    def __init__(self, db):
+        self.__db = db
+
+    def for_campaign(self, campaign_id):
+        """Return the stats row of one campaign as a dict, or None."""
+        row = self.__db.fetch_one(
+            """
+            SELECT total_amount, donation_count, unique_donors, first_donation_at, last_donation_at, largest_gift
+            FROM campaign_stats WHERE campaign_id = %s
+            """,
+            (campaign_id,),
+        )
+        if row is None:
+            return None
+        keys = ("total_amount", "donation_count", "unique_donors", "first_donation_at", "last_donation_at",
+                "largest_gift")
+        return dict(zip(keys, row))
+
+    def rebuild(self, campaign_ids=None, chunk_size=1000):
+        """Recompute stats from the ledger, for all campaigns or only the given ones."""
+        if campaign_ids is None:
+            campaign_ids = [row[0] for row in self.__db.stream("SELECT campaign_id FROM campaigns ORDER BY campaign_id")]
+        campaign_ids = list(campaign_ids)
+        for start in range(0, len(campaign_ids), chunk_size):
+            chunk = campaign_ids[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            with self.__db.transaction() as cursor:
+                cursor.execute(f"DELETE FROM campaign_stats WHERE campaign_id IN ({placeholders})", chunk)
+                cursor.execute(AGGREGATE_FROM_LEDGER.format(placeholders=placeholders), chunk)
+                rows = cursor.fetchall()
+                if rows:
+                    cursor.executemany(INSERT_STATS, rows)
+        print(f"✅ Rebuilt campaign stats for {len(campaign_ids)} campaigns.")
+        return len(campaign_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--campaign-id", type=int, nargs="*", help="only rebuild these campaigns")
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        CampaignStats(db).rebuild(args.campaign_id or None)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
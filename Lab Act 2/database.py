@@ -1,67 +1,286 @@
-import mysql.connector
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from backends import backend_from_env
+from instrumentation import InstrumentedCursor, QueryInstrumentation
+from statement_cache import CachedStatementCursor, StatementCache, StatementCacheStats
 
 class Database:
-    def __init__(self):
+    """Thread-safe database access backed by a small pool of pre-warmed connections.
+
+    Every execute/fetch/fetch_one call checks a connection out of the pool,
+    runs on its own cursor and returns the connection afterwards, so one
+    Database instance can be shared by the domain classes and worker threads.
+    The storage engine comes from ``backend`` (MySQL unless DB_BACKEND says
+    otherwise); queries are always written in MySQL syntax.
+
+    Every statement is timed and aggregated by normalized SQL (see
+    ``query_stats``). Statements slower than ``slow_query_ms`` are logged to
+    the ``donations.slow_query`` logger, with their EXPLAIN plan when
+    ``explain_slow_queries`` is set.
+
+    Each pooled connection keeps up to ``statement_cache_size`` prepared
+    statements keyed by SQL text (see ``statement_cache``); 0 disables it.
+    """
+
+    def __init__(self, pool_size=5, pool_timeout=30, health_check_interval=30, backend=None,
+                 slow_query_ms=None, explain_slow_queries=False, statement_cache_size=64, **connect_args):
+        self.backend = backend or backend_from_env(**connect_args)
+        self.instrumentation = QueryInstrumentation(slow_query_ms, explain_slow_queries)
+        self.dialect = self.backend.name
+        if self.backend.max_connections:
+            pool_size = min(pool_size, self.backend.max_connections)
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.health_check_interval = health_check_interval
+        self.statement_cache_size = statement_cache_size
+        self.__statement_caches = {}
+        self.__statement_stats = StatementCacheStats()
+        self.__pool = queue.LifoQueue(maxsize=pool_size)
+        self.__lock = threading.Lock()
+        self.__stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "max_wait": 0.0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "reconnects": 0,
+        }
+        self.__ready = False
         try:
-            self.connection = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="admin",
-                database="nonprofit_donation_db"
-            )
-            if self.connection.is_connected():
-                self.cursor = self.connection.cursor()
-                print("✅ Connected to the database.")
-            else:
-                raise Exception("Connection established, but not marked as connected.")
-        except mysql.connector.Error as e:
+            # Pre-warm the pool so the first requests don't pay for the handshake
+            for _ in range(pool_size):
+                self.__pool.put((self.__connect(), time.monotonic()))
+            self.__ready = True
+            print("✅ Connected to the database.")
+        except self.backend.Error as e:
             print(f"❌ Database connection failed! Error: {e}")
-            self.connection = None
-            self.cursor = None
+            self.__drain()
+
+    def __connect(self):
+        return self.backend.connect()
+
+    def __is_healthy(self, connection, last_used):
+        """Ping connections that sat idle long enough for the server to drop them."""
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        with self.__lock:
+            self.__stats["health_checks"] += 1
+        try:
+            return self.backend.is_alive(connection)
+        except self.backend.Error:
+            return False
+
+    def __checkout(self):
+        if not self.__ready:
+            raise Exception("Connection pool is not initialized.")
+        started = time.monotonic()
+        waited = False
+        try:
+            connection, last_used = self.__pool.get_nowait()
+        except queue.Empty:
+            waited = True
+            try:
+                connection, last_used = self.__pool.get(timeout=self.pool_timeout)
+            except queue.Empty:
+                with self.__lock:
+                    self.__stats["timeouts"] += 1
+                raise Exception(f"Timed out after {self.pool_timeout}s waiting for a database connection.")
+        wait_time = time.monotonic() - started
+
+        with self.__lock:
+            self.__stats["checkouts"] += 1
+            if waited:
+                self.__stats["waits"] += 1
+                self.__stats["wait_time"] += wait_time
+                self.__stats["max_wait"] = max(self.__stats["max_wait"], wait_time)
+
+        if not self.__is_healthy(connection, last_used):
+            self.__forget_statements(connection)
+            try:
+                connection.close()
+            except self.backend.Error:
+                pass
+            try:
+                connection = self.__connect()
+            except Exception:
+                # Keep the pool at full size even if the server is still away
+                self.__pool.put((connection, 0.0))
+                raise
+            with self.__lock:
+                self.__stats["reconnects"] += 1
+        return connection
+
+    def __checkin(self, connection):
+        self.__pool.put((connection, time.monotonic()))
+
+    def __statement_cache(self, connection):
+        with self.__lock:
+            cache = self.__statement_caches.get(connection)
+            if cache is None:
+                cache = self.__statement_caches[connection] = StatementCache(
+                    lambda: self.backend.prepare(connection), self.statement_cache_size, self.__statement_stats,
+                    plain=lambda: self.backend.cursor(connection, buffered=True))
+        return cache
+
+    def __forget_statements(self, connection):
+        with self.__lock:
+            cache = self.__statement_caches.pop(connection, None)
+        if cache is not None:
+            cache.close()
+
+    def __cursor(self, connection, buffered=False, cached=True):
+        if cached and self.statement_cache_size:
+            cursor = CachedStatementCursor(self.__statement_cache(connection))
+        else:
+            cursor = self.backend.cursor(connection, buffered=buffered)
+        return InstrumentedCursor(cursor, self.instrumentation, self.backend.explain_prefix)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with-block."""
+        connection = self.__checkout()
+        try:
+            yield connection
+        finally:
+            self.__checkin(connection)
+
+    @contextmanager
+    def transaction(self):
+        """Run several statements on one connection and commit them together.
+
+        Yields a cursor; the transaction is rolled back and the error re-raised
+        if the with-block fails, so callers decide how to report it.
+        """
+        with self.connection() as connection:
+            cursor = self.__cursor(connection)
+            self.backend.begin(connection)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
 
     def execute(self, query, values=None):
         try:
-            if not self.cursor:
-                raise Exception("Cursor is not initialized.")
-            self.cursor.execute(query, values or ())
-            self.connection.commit()
-        except mysql.connector.Error as e:
-            print(f"❌ ERROR: MySQL execution failed: {e}")
+            with self.connection() as connection:
+                cursor = self.__cursor(connection)
+                try:
+                    cursor.execute(query, values or ())
+                    connection.commit()
+                    return cursor.lastrowid
+                finally:
+                    cursor.close()
+        except self.backend.Error as e:
+            print(f"❌ ERROR: {self.backend.label} execution failed: {e}")
         except Exception as e:
             print(f"❌ ERROR: Execution failed: {e}")
 
     def fetch(self, query, values=None):
         try:
-            if not self.cursor:
-                raise Exception("Cursor is not initialized.")
-            self.cursor.execute(query, values or ())
-            return self.cursor.fetchall()
-        except mysql.connector.Error as e:
-            print(f"❌ ERROR: MySQL fetch failed: {e}")
+            with self.connection() as connection:
+                cursor = self.__cursor(connection)
+                try:
+                    cursor.execute(query, values or ())
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+        except self.backend.Error as e:
+            print(f"❌ ERROR: {self.backend.label} fetch failed: {e}")
         except Exception as e:
             print(f"❌ ERROR: Fetch failed: {e}")
         return []
 
     def fetch_one(self, query, values=None):
         try:
-            if not self.cursor:
-                raise Exception("Cursor is not initialized.")
-            self.cursor.execute(query, values or ())
-            return self.cursor.fetchone()
-        except mysql.connector.Error as e:
-            print(f"❌ ERROR: MySQL fetch_one failed: {e}")
+            with self.connection() as connection:
+                cursor = self.__cursor(connection, buffered=True)
+                try:
+                    cursor.execute(query, values or ())
+                    return cursor.fetchone()
+                finally:
+                    cursor.close()
+        except self.backend.Error as e:
+            print(f"❌ ERROR: {self.backend.label} fetch_one failed: {e}")
         except Exception as e:
             print(f"❌ ERROR: Fetch_one failed: {e}")
         return None
 
+    def stream(self, query, values=None, chunk_size=500):
+        """Yield result rows one at a time without loading the whole result set.
+
+        Rows are pulled with fetchmany from an unbuffered (server-side) cursor,
+        and the connection stays checked out until the generator is exhausted
+        or closed.
+        """
+        try:
+            with self.connection() as connection:
+                # Streams bypass the statement cache: they need an unbuffered cursor
+                cursor = self.__cursor(connection, cached=False)
+                try:
+                    cursor.execute(query, values or ())
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield from rows
+                finally:
+                    # Drop unread rows so the connection is clean for the next caller
+                    self.backend.discard_results(connection)
+                    cursor.close()
+        except self.backend.Error as e:
+            print(f"❌ ERROR: {self.backend.label} stream failed: {e}")
+        except Exception as e:
+            print(f"❌ ERROR: Stream failed: {e}")
+
+    def query_stats(self):
+        """Per-statement call counts, latency and rows, keyed by normalized SQL."""
+        return self.instrumentation.snapshot()
+
+    def add_query_hook(self, hook):
+        """Subscribe ``hook(event)`` to every measured statement."""
+        return self.instrumentation.subscribe(hook)
+
+    def remove_query_hook(self, hook):
+        self.instrumentation.unsubscribe(hook)
+
+    def statement_cache_stats(self):
+        """Prepared-statement cache hits, misses, evictions and skipped dynamic SQL across the pool."""
+        stats = self.__statement_stats.snapshot()
+        stats["capacity_per_connection"] = self.statement_cache_size
+        return stats
+
+    def pool_stats(self):
+        """Return a snapshot of pool usage and wait-time metrics."""
+        with self.__lock:
+            stats = dict(self.__stats)
+        stats["pool_size"] = self.pool_size
+        stats["idle"] = self.__pool.qsize()
+        stats["in_use"] = self.pool_size - stats["idle"]
+        stats["avg_wait"] = stats["wait_time"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def __drain(self):
+        while True:
+            try:
+                connection, _ = self.__pool.get_nowait()
+            except queue.Empty:
+                break
+            self.__forget_statements(connection)
+            connection.close()
+
     def close(self):
         try:
-            if self.cursor:
-                self.cursor.close()
-            if self.connection:
-                self.connection.close()
+            self.__ready = False
+            self.__drain()
             print("🔒 Database connection closed.")
-        except mysql.connector.Error as e:
+        except self.backend.Error as e:
             print(f"❌ ERROR: Failed to close database properly: {e}")
         except Exception as e:
             print(f"❌ ERROR: General close error: {e}")
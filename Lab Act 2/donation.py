@@ -1,10 +1,70 @@
+from decimal import Decimal
+
 from database import Database
+from cache import invalidate_campaigns
+from campaign_stats import record_batch, record_donation
+from leaderboard import read_totals, record_donor, record_donors
+
+# The statements of one paid donation, shared with AsyncDonation
+DEBIT_BALANCE = "UPDATE users SET balance = balance - %s WHERE user_id = %s AND balance >= %s"
+CREDIT_CAMPAIGN = "UPDATE campaigns SET funds_raised = funds_raised + %s WHERE campaign_id = %s"
+INSERT_DONATION = "INSERT INTO donations (user_id, campaign_id, amount, donation_date) VALUES (%s, %s, %s, NOW())"
+INSUFFICIENT_BALANCE = "Insufficient balance! Please add funds."
+CENT = Decimal("0.01")
+
+class _DonationRejected(Exception):
+    """Raised inside a donation transaction to roll it back with a user-facing message."""
+
+def parse_amount(amount):
+    """Return ``amount`` as a Decimal; raises ValueError unless it is a positive, whole number of cents."""
+    try:
+        amount = Decimal(str(amount))
+        if not amount.is_finite() or amount <= 0:
+            raise ValueError("Donation amount must be positive.")
+        if amount != amount.quantize(CENT):
+            raise ValueError("Donation amount must have at most two decimal places.")
+    except ArithmeticError:
+        raise ValueError("Donation amount must be a number.")
+    return amount
 
 class Donation:
-    def __init__(self, db):
+    def __init__(self, db, cache=None, journal=None, leaderboard=None):
         self.__db = db
+        self.__cache = cache
+        self.__journal = journal
+        self.__leaderboard = leaderboard
+
+    def __read_totals(self, cursor, user_ids, campaign_ids):
+        if self.__leaderboard is None:
+            return None
+        return read_totals(cursor, user_ids, campaign_ids)
+
+    def __update_leaderboard(self, totals):
+        if totals is not None:
+            self.__leaderboard.update(*totals)
 
     def donate_to_campaign(self, user_id, campaign_id, amount):
+        """Record a donation and add it to the campaign's funds_raised.
+
+        With a ``DonationJournal`` the donation is acknowledged once it is
+        fsync'd to the journal and applied to the database in a later batch.
+        """
+        if self.__journal is not None:
+            try:
+                self.__journal.append(user_id, campaign_id, amount)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            except Exception as e:
+                print(f"❌ Donation failed due to an error: {e}")
+                return
+            print(f"✅ Successfully donated ${amount:.2f} to campaign ID: {campaign_id}")
+            return True
+        try:
+            amount = parse_amount(amount)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
         try:
             # Validate campaign existence
             check_query = "SELECT COUNT(*) FROM campaigns WHERE campaign_id = %s"
@@ -13,26 +73,145 @@ class Donation:
                 print(f"❌ Campaign ID {campaign_id} does not exist.")
                 return
 
-            # Insert donation
-            query = """
-            INSERT INTO donations (user_id, campaign_id, amount, donation_date)
-            VALUES (%s, %s, %s, NOW());
-            """
-            self.__db.execute(query, (user_id, campaign_id, amount))
+            with self.__db.transaction() as cursor:
+                # Stats first: the unique-donor check must not see the new row
+                record_donation(cursor, user_id, campaign_id, amount)
+                record_donor(cursor, user_id, amount)
 
-            # Update funds_raised
-            update_query = """
-            UPDATE campaigns 
-            SET funds_raised = funds_raised + %s 
-            WHERE campaign_id = %s;
-            """
-            self.__db.execute(update_query, (amount, campaign_id))
+                # Insert donation
+                query = """
+                INSERT INTO donations (user_id, campaign_id, amount, donation_date)
+                VALUES (%s, %s, %s, NOW());
+                """
+                cursor.execute(query, (user_id, campaign_id, amount))
+
+                # Update funds_raised
+                update_query = """
+                UPDATE campaigns 
+                SET funds_raised = funds_raised + %s 
+                WHERE campaign_id = %s;
+                """
+                cursor.execute(update_query, (amount, campaign_id))
+                totals = self.__read_totals(cursor, [user_id], [campaign_id])
+            invalidate_campaigns(self.__cache, campaign_id)
+            self.__update_leaderboard(totals)
 
             print(f"✅ Successfully donated ${amount:.2f} to campaign ID: {campaign_id}")
             return True
         except Exception as e:
             print(f"❌ Donation failed due to an error: {e}")
 
+    def donate(self, user_id, campaign_id, amount):
+        """Debit the donor, record the donation and bump funds_raised in one commit.
+
+        The debit is a conditional UPDATE, so the balance check and the charge
+        happen atomically and nothing is written if any step fails. The
+        campaign_stats row is updated in the same transaction. Returns
+        ``(ok, message)``.
+        """
+        try:
+            amount = parse_amount(amount)
+        except ValueError as e:
+            return False, f"❌ {e}"
+        try:
+            with self.__db.transaction() as cursor:
+                cursor.execute(DEBIT_BALANCE, (amount, user_id, amount))
+                if cursor.rowcount == 0:
+                    raise _DonationRejected(INSUFFICIENT_BALANCE)
+
+                cursor.execute(CREDIT_CAMPAIGN, (amount, campaign_id))
+                if cursor.rowcount == 0:
+                    raise _DonationRejected(f"❌ Campaign ID {campaign_id} does not exist.")
+
+                record_donation(cursor, user_id, campaign_id, amount)
+                record_donor(cursor, user_id, amount)
+                cursor.execute(INSERT_DONATION, (user_id, campaign_id, amount))
+                totals = self.__read_totals(cursor, [user_id], [campaign_id])
+            invalidate_campaigns(self.__cache, campaign_id)
+            self.__update_leaderboard(totals)
+            return True, f"✅ Successfully donated ${amount:.2f} to campaign ID: {campaign_id}"
+        except _DonationRejected as e:
+            return False, str(e)
+        except Exception as e:
+            return False, f"❌ Donation failed due to an error: {e}"
+
+    def donate_with_payment(self, user_id, campaign_id, amount):
+        """Charge the donor's balance and record the donation (see ``donate``)."""
+        ok, message = self.donate(user_id, campaign_id, amount)
+        print(message)
+        return ok
+
+    def donate_many(self, donations, batch_size=1000):
+        """Record a batch of (user_id, campaign_id, amount) donations in one transaction.
+
+        Campaign IDs are validated with one query per batch, donations are
+        written with multi-row INSERTs and funds_raised gets one aggregated
+        increment per campaign. Returns one result dict per input row.
+        """
+        donations = list(donations)
+        results = []
+        for user_id, campaign_id, amount in donations:
+            results.append({"user_id": user_id, "campaign_id": campaign_id, "amount": amount, "status": "pending"})
+
+        try:
+            with self.__db.transaction() as cursor:
+                # Validate every referenced campaign up front
+                campaign_ids = list({row["campaign_id"] for row in results})
+                existing = set()
+                for start in range(0, len(campaign_ids), batch_size):
+                    chunk = campaign_ids[start:start + batch_size]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(f"SELECT campaign_id FROM campaigns WHERE campaign_id IN ({placeholders})", chunk)
+                    existing.update(str(row[0]) for row in cursor.fetchall())
+
+                accepted = []
+                totals = {}
+                for row in results:
+                    if str(row["campaign_id"]) not in existing:
+                        row["status"] = "campaign_not_found"
+                        continue
+                    try:
+                        amount = parse_amount(row["amount"])
+                    except ValueError:
+                        row["status"] = "invalid_amount"
+                        continue
+                    row["status"] = "ok"
+                    accepted.append((row, amount))
+                    totals[row["campaign_id"]] = totals.get(row["campaign_id"], Decimal("0")) + amount
+
+                record_batch(cursor, [(row["user_id"], row["campaign_id"], amount) for row, amount in accepted],
+                             chunk_size=batch_size)
+                record_donors(cursor, [(row["user_id"], amount) for row, amount in accepted])
+
+                # Insert donations with multi-row INSERTs
+                for start in range(0, len(accepted), batch_size):
+                    chunk = accepted[start:start + batch_size]
+                    placeholders = ", ".join(["(%s, %s, %s, NOW())"] * len(chunk))
+                    values = []
+                    for row, amount in chunk:
+                        values.extend((row["user_id"], row["campaign_id"], amount))
+                    cursor.execute(
+                        f"INSERT INTO donations (user_id, campaign_id, amount, donation_date) VALUES {placeholders}",
+                        values,
+                    )
+
+                # One aggregated funds_raised increment per campaign
+                if totals:
+                    cursor.executemany(
+                        "UPDATE campaigns SET funds_raised = funds_raised + %s WHERE campaign_id = %s",
+                        [(total, campaign_id) for campaign_id, total in totals.items()],
+                    )
+                leaderboard_totals = self.__read_totals(cursor, [row["user_id"] for row, _ in accepted], list(totals))
+
+            invalidate_campaigns(self.__cache, *totals)
+            self.__update_leaderboard(leaderboard_totals)
+            print(f"✅ Recorded {len(accepted)} of {len(results)} donations.")
+        except Exception as e:
+            for row in results:
+                row["status"] = "failed"
+            print(f"❌ Bulk donation failed due to an error: {e}")
+        return results
+
     def get_total_donations(self, campaign_id):
         """Retrieve the total amount of funds raised for a campaign."""
         try:
@@ -47,22 +226,48 @@ class Donation:
             print(f"❌ Could not retrieve total donations: {e}")
             return 0.00
 
-    def view_donation_history(self, user_id):
-        """Fetches and displays the donation history of a user."""
-        try:
+    def get_donation_history_page(self, user_id, page_size=50, after=None):
+        """Return one page of a user's donations, newest first.
+
+        ``after`` is the ``(donation_date, donation_id)`` of the last row of the
+        previous page, so each page is a bounded index range scan no matter how
+        deep into the history it is.
+        """
+        if after is None:
             query = """
-            SELECT campaign_id, amount, donation_date 
-            FROM donations 
-            WHERE user_id = %s 
-            ORDER BY donation_date DESC
+            SELECT campaign_id, amount, donation_date, donation_id
+            FROM donations
+            WHERE user_id = %s
+            ORDER BY donation_date DESC, donation_id DESC
+            LIMIT %s
             """
-            donations = self.__db.fetch(query, (user_id,))
-            
-            if donations:
-                print("\n📜 Your Donation History:")
+            return self.__db.fetch(query, (user_id, page_size))
+        last_date, last_id = after
+        query = """
+        SELECT campaign_id, amount, donation_date, donation_id
+        FROM donations
+        WHERE user_id = %s
+          AND (donation_date < %s OR (donation_date = %s AND donation_id < %s))
+        ORDER BY donation_date DESC, donation_id DESC
+        LIMIT %s
+        """
+        return self.__db.fetch(query, (user_id, last_date, last_date, last_id, page_size))
+
+    def view_donation_history(self, user_id, page_size=50):
+        """Fetches and displays the donation history of a user, one page at a time."""
+        try:
+            after = None
+            while True:
+                donations = self.get_donation_history_page(user_id, page_size, after)
+                if after is None:
+                    if not donations:
+                        print("ℹ️ No donations found.")
+                        return
+                    print("\n📜 Your Donation History:")
                 for donation in donations:
                     print(f"📌 Campaign {donation[0]}: Donated ${donation[1]:.2f} on {donation[2]}\n")
-            else:
-                print("ℹ️ No donations found.")
+                if len(donations) < page_size:
+                    return
+                after = (donations[-1][2], donations[-1][3])
         except Exception as e:
             print(f"❌ Error fetching donation history: {e}")
@@ -0,0 +1,335 @@
+"""Write-behind donation journal with group commit.
+
+In journal mode ``Donation.donate_to_campaign`` appends the accepted donation
+to a local append-only file, fsyncs it and acknowledges the caller. A
+background flusher applies the journaled donations to ``donations``,
+``campaigns.funds_raised`` and ``campaign_stats`` in batches, one transaction
+per batch. The batch also stores the last applied sequence number in the
+``journal:<file name>`` watermark, so every entry is applied exactly once.
+Rows get ``NOW()`` as their ``donation_date`` like any other insert, and
+the time the entry was acknowledged goes to ``acknowledged_at`` (migration 10).
+
+Batches are flushed when ``batch_size`` entries are waiting or the oldest has
+waited ``max_latency_ms``. Concurrent appenders share fsyncs. On startup every
+entry newer than the watermark is replayed, which recovers donations that
+were acknowledged but not applied before a crash.
+
+``append`` checks the user, the campaign and the amount before it
+acknowledges. If a batch still fails on bad data (the user was deleted
+meanwhile, say), its entries are applied one at a time. Entries that fail
+on their own go to ``<path>.dead`` with the error, and the rest land. So do
+entries whose campaign was deleted after they were acknowledged, to be
+refunded or replayed by hand. A crash can repeat a dead-letter line; its
+``seq`` identifies the entry.
+Other errors, such as a lost connection, leave the batch queued for a retry.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+
+from cache import invalidate_campaigns
+from campaign_stats import record_batch
+from leaderboard import read_totals, record_donors
+from watermarks import get_watermark, read_watermark, set_watermark
+
+CENT = Decimal("0.01")
+# Largest amount a decimal(10,2) column holds
+MAX_AMOUNT = Decimal("99999999.99")
+
+def _is_bad_data(error):
+    """True for errors that retrying can't fix: constraint violations and values the column rejects."""
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"IntegrityError", "DataError", "InvalidOperation"})
+
+class DonationJournal:
+    def __init__(self, db, path, batch_size=500, max_latency_ms=50, cache=None, fsync=True,
+                 compact_bytes=64 * 1024 * 1024, retry_seconds=1.0, leaderboard=None):
+        self.__db = db
+        self.path = path
+        self.batch_size = batch_size
+        self.max_latency_ms = max_latency_ms
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.retry_seconds = retry_seconds
+        self.__cache = cache
+        self.__leaderboard = leaderboard
+        self.__watermark = f"journal:{os.path.basename(path)}"
+        self.__lock = threading.Lock()
+        self.__sync_lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__pending = []
+        self.__known = {"campaigns": set(), "users": set()}
+        self.dead_letter_path = path + ".dead"
+        self.__stats = {"appended": 0, "applied": 0, "batches": 0, "fsyncs": 0, "replayed": 0,
+                        "errors": 0, "dead_lettered": 0}
+        self.__stopping = False
+
+        self.__applied_seq = read_watermark(db, self.__watermark)
+        self.__pending = self.__recover()
+        self.__last_seq = max([self.__applied_seq] + [entry["seq"] for entry in self.__pending])
+        self.__synced_seq = self.__last_seq
+        self.__stats["replayed"] = len(self.__pending)
+        self.__file = open(path, "a", encoding="utf-8")
+        self.__flusher = threading.Thread(target=self.__run, name="donation-journal", daemon=True)
+        self.__flusher.start()
+        if self.__pending:
+            print(f"ℹ️ Replaying {len(self.__pending)} journaled donations.")
+
+    def __recover(self):
+        """Read unapplied entries and cut off a torn final line left by a crash."""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        good_bytes = 0
+        with open(self.path, "rb") as journal:
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                good_bytes += len(line)
+                if entry["seq"] > self.__applied_seq:
+                    entries.append(entry)
+        if good_bytes != os.path.getsize(self.path):
+            with open(self.path, "r+b") as journal:
+                journal.truncate(good_bytes)
+        return entries
+
+    def __exists(self, table, column, key):
+        known = self.__known[table]
+        if key in known:
+            return True
+        if self.__db.fetch_one(f"SELECT 1 FROM {table} WHERE {column} = %s", (key,)):
+            known.add(key)
+            return True
+        return False
+
+    def append(self, user_id, campaign_id, amount):
+        """Durably record one donation; returns its sequence number once it is on disk.
+
+        Raises ValueError for an unknown user or campaign, or an amount that is
+        not positive, has more than two decimal places or is too large.
+        """
+        try:
+            amount = Decimal(str(amount))
+        except ArithmeticError:
+            raise ValueError("Donation amount must be a number.")
+        if not amount.is_finite() or amount <= 0:
+            raise ValueError("Donation amount must be positive.")
+        if amount != amount.quantize(CENT) or amount > MAX_AMOUNT:
+            raise ValueError(f"Donation amount must have at most two decimal places and be at most {MAX_AMOUNT}.")
+        if not self.__exists("users", "user_id", user_id):
+            raise ValueError(f"User ID {user_id} does not exist.")
+        if not self.__exists("campaigns", "campaign_id", campaign_id):
+            raise ValueError(f"Campaign ID {campaign_id} does not exist.")
+
+        with self.__lock:
+            if self.__stopping:
+                raise RuntimeError("The donation journal is closed.")
+            self.__last_seq += 1
+            entry = {
+                "seq": self.__last_seq,
+                "user_id": user_id,
+                "campaign_id": campaign_id,
+                "amount": str(amount),
+                "at": datetime.datetime.now().isoformat(" ", "seconds"),
+            }
+            self.__file.write(json.dumps(entry) + "\n")
+            self.__file.flush()
+            self.__stats["appended"] += 1
+            # Queue in sequence order; applying before our fsync is harmless since the
+            # database commit is durable on its own and the watermark prevents re-applying
+            entry["queued_at"] = time.monotonic()
+            self.__pending.append(entry)
+            # Wake the flusher to start the latency clock or to take a full batch
+            if len(self.__pending) in (1, self.batch_size):
+                self.__changed.notify()
+        self.__sync(entry["seq"])
+        return entry["seq"]
+
+    def __sync(self, seq):
+        """fsync the journal unless another appender's fsync already covered ``seq``."""
+        if not self.fsync:
+            return
+        with self.__sync_lock:
+            if self.__synced_seq >= seq:
+                return
+            with self.__lock:
+                covered = self.__last_seq
+                fileno = self.__file.fileno()
+            os.fsync(fileno)
+            self.__synced_seq = covered
+            self.__stats["fsyncs"] += 1
+
+    def __next_batch(self):
+        with self.__lock:
+            while not self.__stopping:
+                if len(self.__pending) >= self.batch_size:
+                    break
+                if self.__pending:
+                    waited_ms = (time.monotonic() - self.__pending[0].get("queued_at", 0)) * 1000
+                    if waited_ms >= self.max_latency_ms:
+                        break
+                    self.__changed.wait((self.max_latency_ms - waited_ms) / 1000)
+                else:
+                    self.__changed.wait()
+            return self.__pending[:self.batch_size]
+
+    def __run(self):
+        while True:
+            batch = self.__next_batch()
+            if not batch:
+                if self.__stopping:
+                    return
+                continue
+            try:
+                try:
+                    self.__apply(batch)
+                except Exception as e:
+                    if not _is_bad_data(e):
+                        raise
+                    # Find the entries at fault instead of retrying the whole batch forever
+                    self.__apply_one_by_one(batch)
+            except Exception as e:
+                print(f"❌ ERROR: Applying journaled donations failed, will retry: {e}")
+                with self.__lock:
+                    self.__stats["errors"] += 1
+                    if self.__stopping:
+                        return
+                    self.__changed.wait(self.retry_seconds)
+                continue
+            with self.__lock:
+                self.__pending = self.__pending[len(batch):]
+                self.__applied_seq = batch[-1]["seq"]
+                self.__changed.notify_all()
+                self.__compact()
+
+    def __apply(self, batch):
+        campaign_ids = list({entry["campaign_id"] for entry in batch})
+        with self.__db.transaction() as cursor:
+            # Entries at or below the watermark were applied by an earlier run
+            applied_seq = get_watermark(cursor, self.__watermark)
+            entries = [entry for entry in batch if entry["seq"] > applied_seq]
+            placeholders = ", ".join(["%s"] * len(campaign_ids))
+            cursor.execute(f"SELECT campaign_id FROM campaigns WHERE campaign_id IN ({placeholders})", campaign_ids)
+            existing = {str(row[0]) for row in cursor.fetchall()}
+            # A campaign deleted after the donation was acknowledged can't take it any more
+            accepted = [entry for entry in entries if str(entry["campaign_id"]) in existing]
+            orphaned = [entry for entry in entries if str(entry["campaign_id"]) not in existing]
+
+            if accepted:
+                rows = [(entry["user_id"], entry["campaign_id"], Decimal(entry["amount"])) for entry in accepted]
+                record_batch(cursor, rows)
+                record_donors(cursor, [(user_id, amount) for user_id, _, amount in rows])
+                # donation_date is the insert time like on every other path, so a replayed entry
+                # can't look old enough to watermarks.committed; the acknowledgement keeps its own column
+                placeholders = ", ".join(["(%s, %s, %s, NOW(), %s)"] * len(accepted))
+                values = []
+                for entry in accepted:
+                    values.extend((entry["user_id"], entry["campaign_id"], Decimal(entry["amount"]), entry["at"]))
+                cursor.execute(
+                    "INSERT INTO donations (user_id, campaign_id, amount, donation_date, acknowledged_at) "
+                    f"VALUES {placeholders}",
+                    values,
+                )
+                totals = {}
+                for user_id, campaign_id, amount in rows:
+                    totals[campaign_id] = totals.get(campaign_id, Decimal("0")) + amount
+                cursor.executemany(
+                    "UPDATE campaigns SET funds_raised = funds_raised + %s WHERE campaign_id = %s",
+                    [(total, campaign_id) for campaign_id, total in totals.items()],
+                )
+            leaderboard_totals = None
+            if self.__leaderboard is not None and accepted:
+                leaderboard_totals = read_totals(cursor, [entry["user_id"] for entry in accepted],
+                                                 [entry["campaign_id"] for entry in accepted])
+            if orphaned:
+                # On disk before the watermark passes them
+                self.__write_dead_letters(orphaned, "campaign no longer exists")
+            set_watermark(cursor, self.__watermark, batch[-1]["seq"])
+
+        invalidate_campaigns(self.__cache, *{entry["campaign_id"] for entry in accepted})
+        if leaderboard_totals is not None:
+            self.__leaderboard.update(*leaderboard_totals)
+        with self.__lock:
+            self.__stats["batches"] += 1
+            self.__stats["applied"] += len(accepted)
+
+    def __apply_one_by_one(self, batch):
+        """Apply each entry in its own transaction, dead-lettering the ones with bad data."""
+        for entry in batch:
+            try:
+                self.__apply([entry])
+            except Exception as e:
+                if not _is_bad_data(e):
+                    raise
+                self.__dead_letter(entry, e)
+
+    def __write_dead_letters(self, entries, error):
+        """Append the entries with the error to the dead-letter file and fsync it."""
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letters:
+            for entry in entries:
+                record = {key: value for key, value in entry.items() if key != "queued_at"}
+                record["error"] = str(error)
+                dead_letters.write(json.dumps(record) + "\n")
+            dead_letters.flush()
+            if self.fsync:
+                os.fsync(dead_letters.fileno())
+        with self.__lock:
+            self.__stats["dead_lettered"] += len(entries)
+        for entry in entries:
+            print(f"⚠️ Journaled donation {entry['seq']} can't be applied and was moved to "
+                  f"{self.dead_letter_path}: {error}")
+
+    def __dead_letter(self, entry, error):
+        # On disk before the watermark passes it; a crash in between only repeats the line
+        self.__write_dead_letters([entry], error)
+        with self.__db.transaction() as cursor:
+            if get_watermark(cursor, self.__watermark, for_update=True) < entry["seq"]:
+                set_watermark(cursor, self.__watermark, entry["seq"])
+
+    def __compact(self):
+        """Start a fresh file once everything in a large journal is applied (lock held)."""
+        if self.__pending or self.__applied_seq != self.__last_seq:
+            return
+        if self.__file.tell() < self.compact_bytes:
+            return
+        self.__file.truncate(0)
+        self.__file.seek(0)
+
+    def flush(self, timeout=None):
+        """Block until every entry appended so far is applied; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__lock:
+            target = self.__last_seq
+            self.__changed.notify()
+            while self.__applied_seq < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.__changed.wait(remaining)
+        return True
+
+    def stats(self):
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["pending"] = len(self.__pending)
+            stats["last_seq"] = self.__last_seq
+            stats["applied_seq"] = self.__applied_seq
+        return stats
+
+    def close(self, timeout=30):
+        """Apply what is pending, then stop the flusher and close the file."""
+        flushed = self.flush(timeout)
+        with self.__lock:
+            self.__stopping = True
+            self.__changed.notify_all()
+        self.__flusher.join(timeout)
+        self.__file.close()
+        if not flushed:
+            print("⚠️ Journal closed with unapplied donations; they will be replayed on the next start.")
@@ -1,8 +1,16 @@
+from cache import joined_events_key
 from database import Database
+from event_index import normalize_location
 
 class Event:
-    def __init__(self, db):
+    # With a cache, users who joined more events than this are filtered in SQL instead
+    JOINED_FILTER_LIMIT = 500
+
+    def __init__(self, db, cache=None, search=None, index=None):
         self.__db = db
+        self.__cache = cache
+        self.__search = search
+        self.__index = index
 
     def create_event(self, organization_id, title, description, event_date, location):
         """Allows an organization to create an event."""
@@ -11,69 +19,322 @@ class Event:
             INSERT INTO events (user_id, name, description, date, location)
             VALUES (%s, %s, %s, %s, %s)
             """
-            self.__db.execute(query, (organization_id, title, description, event_date, location))
+            event_id = self.__db.execute(query, (organization_id, title, description, event_date, location))
+            if self.__search is not None and event_id:
+                self.__search.add_event(event_id, title, description, location)
+            if self.__index is not None and event_id:
+                self.__index.add(event_id, event_date, location)
             print("✅ Event created successfully!")
+            return True
         except Exception as e:
             print(f"❌ ERROR: Event creation failed! {e}")
 
-    def view_active_events(self, user_id):
-        """Fetch and display active events the user has NOT volunteered for."""
-        query = """
-            SELECT e.event_id, e.name, e.description, e.date, e.location
-            FROM events e
-            WHERE e.status = 'active'
-            AND e.event_id NOT IN (
-                SELECT event_id FROM event_volunteers WHERE user_id = %s
-            )
+    def get_joined_event_ids(self, user_id):
+        """Return the set of event IDs (as strings) the user has signed up for.
+
+        Read through the cache when there is one; signups and opt-outs made
+        through this class keep the cached set current.
         """
-        events = self.__db.fetch(query, (user_id,))
+        def load():
+            rows = self.__db.fetch("SELECT event_id FROM event_volunteers WHERE user_id = %s", (user_id,))
+            return frozenset(str(row[0]) for row in rows)
 
-        if events:
-            print("\n📌 Active Events Available for You to Volunteer:")
-            for event in events:
-                print(f"📅 Event ID: {event[0]} \n{event[1]}  \n{event[2]} \non {event[3]} \nat {event[4]}\n")
+        if self.__cache is None:
+            return load()
+        return self.__cache.get_or_load(joined_events_key(user_id), load)
+
+    def __remember_signup(self, user_id, event_id, joined):
+        if self.__cache is None:
+            return
+        key = joined_events_key(user_id)
+        found, event_ids = self.__cache.get(key)
+        if not found:
+            return
+        if joined:
+            self.__cache.set(key, event_ids | {str(event_id)})
         else:
-            print("ℹ️ You have volunteered for all available events!")
+            self.__cache.set(key, event_ids - {str(event_id)})
 
+    def get_active_events(self, user_id, page_size=50, after=None, upcoming_only=True, until=None):
+        """Return one page of active events the user has NOT volunteered for.
 
-    def volunteer_for_event(self, user_id, event_id):
-        """Allows a user to volunteer for an event."""
+        Events are ordered by ``(date, event_id)``; ``after`` is that pair for
+        the last row of the previous page (keyset pagination) and ``page_size``
+        of None returns every match. ``upcoming_only`` skips events before
+        today and ``until`` ends the date window.
+
+        The signups are excluded with a NOT EXISTS probe on the unique
+        (user_id, event_id) index. With a cache, the user's joined event IDs
+        come from it instead and are excluded by value, so the query does not
+        touch event_volunteers at all.
+        """
+        conditions = ["e.status = 'active'"]
+        values = []
+        if upcoming_only:
+            conditions.append("e.date >= CURDATE()")
+        if until is not None:
+            conditions.append("e.date <= %s")
+            values.append(until)
+        if after is not None:
+            last_date, last_id = after
+            conditions.append("(e.date > %s OR (e.date = %s AND e.event_id > %s))")
+            values.extend((last_date, last_date, last_id))
+
+        self.__exclude_joined(user_id, conditions, values)
+
+        query = f"""
+        SELECT e.event_id, e.name, e.description, e.date, e.location
+        FROM events e
+        WHERE {" AND ".join(conditions)}
+        ORDER BY e.date, e.event_id
+        """
+        if page_size is not None:
+            query += "LIMIT %s"
+            values.append(page_size)
+        return self.__db.fetch(query, tuple(values))
+
+    def __exclude_joined(self, user_id, conditions, values):
+        """Add the condition leaving out events ``user_id`` signed up for."""
+        joined = None
+        if self.__cache is not None:
+            joined = self.get_joined_event_ids(user_id)
+            if len(joined) > self.JOINED_FILTER_LIMIT:
+                joined = None
+        if joined is None:
+            conditions.append(
+                "NOT EXISTS (SELECT 1 FROM event_volunteers v WHERE v.user_id = %s AND v.event_id = e.event_id)")
+            values.append(user_id)
+        elif joined:
+            conditions.append(f"e.event_id NOT IN ({', '.join(['%s'] * len(joined))})")
+            values.extend(sorted(joined))
+
+    def find_events(self, start=None, end=None, location=None, status="active", user_id=None, page_size=50,
+                    after=None):
+        """Return one page of events matching the filters, ordered by ``(date, event_id)``.
+
+        ``start`` and ``end`` are inclusive dates (``start`` defaults to
+        today), ``location`` matches the start of the location ("batangas"
+        finds "Batangas City"), ``status`` of None means any status and
+        ``user_id`` leaves out the events that user joined. ``after`` is the
+        ``(date, event_id)`` of the previous page's last row. Rows are
+        ``(event_id, name, description, date, location, volunteer_count)``.
+
+        With an index the page is picked in memory and only its rows are read;
+        otherwise one query over the (status, date) or (location, date) index.
+        """
+        if self.__index is not None:
+            exclude = set()
+            if user_id is not None:
+                exclude = {int(event_id) for event_id in self.get_joined_event_ids(user_id)}
+            page = self.__index.find(start, end, location, status, after, page_size, exclude)
+            if page is not None:
+                return self.__read_page(page)
+
+        conditions = []
+        values = []
+        if status is not None:
+            conditions.append("e.status = %s")
+            values.append(status)
+        if start is None:
+            conditions.append("e.date >= CURDATE()")
+        else:
+            conditions.append("e.date >= %s")
+            values.append(start)
+        if end is not None:
+            conditions.append("e.date <= %s")
+            values.append(end)
+        if location is not None:
+            # LIKE is case-insensitive on both backends, but unlike the index it can't see past
+            # stray spaces or punctuation in the stored location
+            prefix = normalize_location(location).replace("!", "!!").replace("%", "!%").replace("_", "!_")
+            conditions.append("e.location LIKE %s ESCAPE '!'")
+            values.append(prefix + "%")
+        if after is not None:
+            last_date, last_id = after
+            conditions.append("(e.date > %s OR (e.date = %s AND e.event_id > %s))")
+            values.extend((last_date, last_date, last_id))
+        if user_id is not None:
+            self.__exclude_joined(user_id, conditions, values)
+        query = f"""
+        SELECT e.event_id, e.name, e.description, e.date, e.location,
+            (SELECT COUNT(*) FROM event_volunteers v WHERE v.event_id = e.event_id)
+        FROM events e
+        WHERE {" AND ".join(conditions)}
+        ORDER BY e.date, e.event_id
+        """
+        if page_size is not None:
+            query += "LIMIT %s"
+            values.append(page_size)
+        return self.__db.fetch(query, tuple(values))
+
+    def __read_page(self, page):
+        """Event rows for ``[(event_id, volunteers), ...]`` from the index, in its order."""
+        if not page:
+            return []
+        placeholders = ", ".join(["%s"] * len(page))
+        rows = self.__db.fetch(
+            f"SELECT event_id, name, description, date, location FROM events WHERE event_id IN ({placeholders})",
+            [event_id for event_id, _ in page],
+        ) or []
+        found = {int(row[0]): tuple(row) for row in rows}
+        for event_id, _ in page:
+            if event_id not in found:
+                # Deleted behind the index's back
+                self.__index.remove(event_id)
+        return [found[event_id] + (volunteers,) for event_id, volunteers in page if event_id in found]
+
+    def view_events(self, start=None, end=None, location=None, user_id=None, page_size=50):
+        """Display active events in a date range and/or location, one page at a time."""
         try:
-            # Retrieve user's name from the users table
-            user_query = "SELECT name FROM users WHERE user_id = %s"
-            user_result = self.__db.fetch(user_query, (user_id,))
-            
-            if not user_result:
-                print("❌ ERROR: User not found!")
-                return
-            
-            user_name = user_result[0][0]
+            after = None
+            while True:
+                events = self.find_events(start, end, location, user_id=user_id, page_size=page_size, after=after)
+                if after is None:
+                    if not events:
+                        print("ℹ️ No events match those filters.")
+                        return
+                    print("\n📌 Events:")
+                for event in events:
+                    print(f"📅 Event ID: {event[0]} \n{event[1]}  \n{event[2]} \non {event[3]} \nat {event[4]}"
+                          f"\n👥 {event[5]} volunteer(s)\n")
+                if len(events) < page_size:
+                    return
+                after = (events[-1][3], events[-1][0])
+        except Exception as e:
+            print(f"❌ Error fetching events: {e}")
 
-            # Check if the event exists
-            event_query = "SELECT event_id FROM events WHERE event_id = %s"
-            event_result = self.__db.fetch(event_query, (event_id,))
-            
-            if not event_result:
-                print("❌ ERROR: Event does not exist!")
-                return
-            
-            # Insert volunteer record
-            query = "INSERT INTO event_volunteers (user_id, event_id, name, volunteer_date) VALUES (%s, %s, %s, NOW())"
-            self.__db.execute(query, (user_id, event_id, user_name))
-            
-            print(f"✅ {user_name}, you have successfully volunteered for the event!")
+    def view_active_events(self, user_id, page_size=50):
+        """Fetch and display upcoming active events the user has NOT volunteered for, one page at a time."""
+        try:
+            after = None
+            while True:
+                events = self.get_active_events(user_id, page_size, after)
+                if after is None:
+                    if not events:
+                        print("ℹ️ You have volunteered for all available events!")
+                        return
+                    print("\n📌 Active Events Available for You to Volunteer:")
+                for event in events:
+                    print(f"📅 Event ID: {event[0]} \n{event[1]}  \n{event[2]} \non {event[3]} \nat {event[4]}\n")
+                if len(events) < page_size:
+                    return
+                after = (events[-1][3], events[-1][0])
         except Exception as e:
-            print(f"❌ ERROR: Volunteering failed! {e}")
+            print(f"❌ Error fetching active events: {e}")
 
-    def view_volunteer_history(self, user_id):
-        """Fetches and displays the events a user has volunteered for."""
+
+    def volunteer(self, user_id, event_id, user_name=None):
+        """Sign a user up for an event; returns ``(ok, message)``.
+
+        One INSERT ... SELECT copies the name from users and only inserts when
+        both the user and the event exist and the user hasn't signed up yet.
+        A concurrent signup for the same pair trips the unique (user_id,
+        event_id) key; any other error (a foreign key, a value too long)
+        fails the signup. The lookups below run only when nothing was
+        inserted, to explain why. Callers that don't pass ``user_name`` get
+        the user and event checked first, as before, so the success message
+        can still greet the volunteer by name.
+        """
+        try:
+            if user_name is None:
+                user_result = self.__db.fetch("SELECT name FROM users WHERE user_id = %s", (user_id,))
+                if not user_result:
+                    return False, "❌ ERROR: User not found!"
+                user_name = user_result[0][0]
+                if not self.__db.fetch("SELECT event_id FROM events WHERE event_id = %s", (event_id,)):
+                    return False, "❌ ERROR: Event does not exist!"
+
+            query = """
+            INSERT INTO event_volunteers (user_id, event_id, name, volunteer_date)
+            SELECT u.user_id, e.event_id, u.name, NOW()
+            FROM users u JOIN events e ON e.event_id = %s
+            WHERE u.user_id = %s
+              AND NOT EXISTS (SELECT 1 FROM event_volunteers v WHERE v.user_id = u.user_id AND v.event_id = e.event_id)
+            """
+            conflict = None
+            try:
+                with self.__db.transaction() as cursor:
+                    cursor.execute(query, (event_id, user_id))
+                    inserted = cursor.rowcount
+            except Exception as e:
+                if type(e).__name__ != "IntegrityError":
+                    raise
+                inserted, conflict = 0, e
+
+            if inserted > 0:
+                self.__remember_signup(user_id, event_id, True)
+                if self.__index is not None:
+                    self.__index.volunteers_changed(event_id, 1)
+                return True, f"✅ {user_name}, you have successfully volunteered for the event!"
+
+            if not self.__db.fetch("SELECT name FROM users WHERE user_id = %s", (user_id,)):
+                return False, "❌ ERROR: User not found!"
+            if not self.__db.fetch("SELECT event_id FROM events WHERE event_id = %s", (event_id,)):
+                return False, "❌ ERROR: Event does not exist!"
+            if conflict is not None and not self.__db.fetch(
+                    "SELECT volunteer_id FROM event_volunteers WHERE user_id = %s AND event_id = %s", (user_id, event_id)):
+                return False, f"❌ ERROR: Volunteering failed! {conflict}"
+            return False, "ℹ️ You have already volunteered for this event."
+        except Exception as e:
+            return False, f"❌ ERROR: Volunteering failed! {e}"
+
+    def volunteer_for_event(self, user_id, event_id, user_name=None):
+        """Allows a user to volunteer for an event."""
+        ok, message = self.volunteer(user_id, event_id, user_name)
+        print(message)
+        return ok
+
+    def volunteer_many(self, event_id, user_ids, batch_size=1000):
+        """Register a roster of users for an event in one transaction.
+
+        Each batch is one INSERT ... SELECT over the users table; unknown users
+        and existing signups are skipped, and any other error fails the whole
+        roster. Returns the number of new signups.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        try:
+            registered = 0
+            with self.__db.transaction() as cursor:
+                cursor.execute("SELECT event_id FROM events WHERE event_id = %s", (event_id,))
+                if not cursor.fetchall():
+                    print("❌ ERROR: Event does not exist!")
+                    return 0
+                for start in range(0, len(user_ids), batch_size):
+                    chunk = user_ids[start:start + batch_size]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(
+                        f"""
+                        INSERT INTO event_volunteers (user_id, event_id, name, volunteer_date)
+                        SELECT u.user_id, %s, u.name, NOW() FROM users u
+                        WHERE u.user_id IN ({placeholders})
+                          AND NOT EXISTS (SELECT 1 FROM event_volunteers v WHERE v.user_id = u.user_id AND v.event_id = %s)
+                        """,
+                        [event_id] + chunk + [event_id],
+                    )
+                    registered += max(cursor.rowcount, 0)
+            if self.__cache is not None:
+                self.__cache.invalidate(*(joined_events_key(user_id) for user_id in user_ids))
+            if self.__index is not None:
+                self.__index.volunteers_changed(event_id, registered)
+            print(f"✅ Registered {registered} of {len(user_ids)} volunteers for event {event_id}.")
+            return registered
+        except Exception as e:
+            print(f"❌ ERROR: Bulk volunteer registration failed! {e}")
+            return 0
+
+    def get_volunteer_history(self, user_id):
+        """Return the events a user has volunteered for, latest first."""
         query = """
         SELECT e.event_id, e.name, e.date, e.location, v.name FROM events e
         JOIN event_volunteers v ON e.event_id = v.event_id
         WHERE v.user_id = %s
         ORDER BY e.date DESC
         """
-        events = self.__db.fetch(query, (user_id,))
+        return self.__db.fetch(query, (user_id,))
+
+    def view_volunteer_history(self, user_id):
+        """Fetches and displays the events a user has volunteered for."""
+        events = self.get_volunteer_history(user_id)
         
         if events:
             print("\n📜 Your Volunteer History:")
@@ -82,44 +343,73 @@ class Event:
         else:
             print("ℹ️ No volunteered events found.")
 
-    def view_volunteers_for_event(self, event_id):
-        """Fetches and displays all volunteers for a specific event."""
+    def get_volunteers_page(self, event_id, page_size=100, after=None):
+        """Return one page of an event's volunteers, newest first.
+
+        ``after`` is the ``(volunteer_date, volunteer_id)`` of the last row of
+        the previous page (keyset pagination).
+        """
+        if after is None:
+            query = """
+            SELECT v.name, v.volunteer_date, v.volunteer_id FROM event_volunteers v
+            WHERE v.event_id = %s
+            ORDER BY v.volunteer_date DESC, v.volunteer_id DESC
+            LIMIT %s
+            """
+            return self.__db.fetch(query, (event_id, page_size))
+        last_date, last_id = after
         query = """
-        SELECT v.name, v.volunteer_date FROM event_volunteers v
+        SELECT v.name, v.volunteer_date, v.volunteer_id FROM event_volunteers v
         WHERE v.event_id = %s
-        ORDER BY v.volunteer_date DESC
+          AND (v.volunteer_date < %s OR (v.volunteer_date = %s AND v.volunteer_id < %s))
+        ORDER BY v.volunteer_date DESC, v.volunteer_id DESC
+        LIMIT %s
         """
-        volunteers = self.__db.fetch(query, (event_id,))
-        
-        if volunteers:
-            print(f"\n📋 Volunteers for Event {event_id}:")
+        return self.__db.fetch(query, (event_id, last_date, last_date, last_id, page_size))
+
+    def view_volunteers_for_event(self, event_id, page_size=100):
+        """Fetches and displays all volunteers for a specific event, one page at a time."""
+        after = None
+        while True:
+            volunteers = self.get_volunteers_page(event_id, page_size, after)
+            if after is None:
+                if not volunteers:
+                    print("ℹ️ No volunteers for this event yet.")
+                    return
+                print(f"\n📋 Volunteers for Event {event_id}:")
             for volunteer in volunteers:
                 print(f"👤 {volunteer[0]} - Joined on {volunteer[1]}\n")
-        else:
-            print("ℹ️ No volunteers for this event yet.")
+            if len(volunteers) < page_size:
+                return
+            after = (volunteers[-1][1], volunteers[-1][2])
 
-    def opt_out_of_event(self, user_id, event_id):
-        """Allows a user to opt out of an event they previously volunteered for."""
+    def opt_out(self, user_id, event_id):
+        """Remove a user's signup for an event; returns ``(ok, message)``."""
         try:
-            # Check if the user has volunteered for the event
-            check_query = "SELECT * FROM event_volunteers WHERE user_id = %s AND event_id = %s"
-            volunteer_result = self.__db.fetch(check_query, (user_id, event_id))
+            # The DELETE is the check: no row removed means the user wasn't signed up
+            with self.__db.transaction() as cursor:
+                cursor.execute("DELETE FROM event_volunteers WHERE user_id = %s AND event_id = %s", (user_id, event_id))
+                removed = cursor.rowcount
 
-            if not volunteer_result:
-                print("❌ ERROR: You are not registered as a volunteer for this event!")
-                return
-            
-            # Remove volunteer record
-            delete_query = "DELETE FROM event_volunteers WHERE user_id = %s AND event_id = %s"
-            self.__db.execute(delete_query, (user_id, event_id))
+            if removed <= 0:
+                return False, "❌ ERROR: You are not registered as a volunteer for this event!"
+            self.__remember_signup(user_id, event_id, False)
+            if self.__index is not None:
+                self.__index.volunteers_changed(event_id, -1)
             
-            print("✅ You have successfully opted out of the event.")
+            return True, "✅ You have successfully opted out of the event."
         except Exception as e:
-            print(f"❌ ERROR: Opting out failed! {e}")
+            return False, f"❌ ERROR: Opting out failed! {e}"
+
+    def opt_out_of_event(self, user_id, event_id):
+        """Allows a user to opt out of an event they previously volunteered for."""
+        ok, message = self.opt_out(user_id, event_id)
+        print(message)
+        return ok
 
     
-    def view_my_events(self, user_id):
-        """Fetch and display events created by the logged-in organization along with their volunteers."""
+    def get_my_events(self, user_id):
+        """Return events created by the organization along with their volunteers."""
         query = """
         SELECT e.event_id, e.name, e.description, e.date, e.location, 
             GROUP_CONCAT(u.name SEPARATOR ', ') AS volunteers
@@ -129,8 +419,11 @@ class Event:
         WHERE e.user_id = %s
         GROUP BY e.event_id, e.name, e.description, e.date, e.location
         """
+        return self.__db.fetch(query, (user_id,))
 
-        events = self.__db.fetch(query, (user_id,))
+    def view_my_events(self, user_id):
+        """Fetch and display events created by the logged-in organization along with their volunteers."""
+        events = self.get_my_events(user_id)
 
         if events:
             print("\n📅 Your Created Events with Volunteers:")
@@ -0,0 +1,219 @@
+"""In-process index of upcoming events for date-range and location queries.
+
+``EventIndex`` keeps every event dated today or later in a list sorted by
+``(date, event_id)``, plus one such list per normalized location with the
+locations themselves kept sorted. A date range is a pair of ``bisect`` calls.
+A location is matched by prefix ("batangas" finds "Batangas City"): the
+matching locations are a bisect range of the sorted names, and their lists
+are merged in date order. Status and volunteer counts are kept per event.
+
+``Event`` takes an ``index`` argument. It adds the events it creates and
+moves the volunteer counts on signup and opt-out. Events dated before the
+index's ``since`` day are dropped when the day changes, and queries reaching
+further back return None so ``Event.find_events`` falls back to SQL::
+
+    python event_index.py [--start 2025-03-29] [--end 2025-03-30] [--location "Batangas City"]
+"""
+import argparse
+import datetime
+import heapq
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from database import Database
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+# Sorts after any event ID
+LAST = float("inf")
+
+def normalize_location(location):
+    """Lowercase words separated by single spaces: " Batangas  City," -> "batangas city"."""
+    return NON_ALPHANUMERIC.sub(" ", (location or "").lower()).strip()
+
+def to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
+
+class EventIndex:
+    def __init__(self, db, load=True):
+        self.__db = db
+        self.__lock = threading.Lock()
+        self.since = datetime.date.today()
+        self.__clear()
+        if load:
+            self.rebuild()
+
+    def __clear(self):
+        self.__by_date = []
+        self.__by_location = {}
+        self.__locations = []
+        # event_id: (date, location key, status, volunteers)
+        self.__events = {}
+
+    def __len__(self):
+        return len(self.__events)
+
+    def __contains__(self, event_id):
+        return event_id in self.__events
+
+    def rebuild(self, since=None):
+        """Reload every event dated ``since`` (default today) or later."""
+        since = since or datetime.date.today()
+        rows = self.__db.fetch(
+            """
+            SELECT e.event_id, e.date, e.location, e.status, COUNT(v.volunteer_id)
+            FROM events e
+            LEFT JOIN event_volunteers v ON v.event_id = e.event_id
+            WHERE e.date >= %s
+            GROUP BY e.event_id, e.date, e.location, e.status
+            """,
+            (since,),
+        ) or []
+        events = {}
+        by_location = {}
+        keys = {}
+        for event_id, date, location, status, volunteers in rows:
+            event_id, date = int(event_id), to_date(date)
+            key = normalize_location(location)
+            key = keys.setdefault(key, key)
+            events[event_id] = (date, key, status, int(volunteers))
+            by_location.setdefault(key, []).append((date, event_id))
+        for entries in by_location.values():
+            entries.sort()
+        with self.__lock:
+            self.__clear()
+            self.since = since
+            self.__events = events
+            self.__by_location = by_location
+            self.__locations = sorted(by_location)
+            self.__by_date = sorted((date, event_id) for event_id, (date, _, _, _) in events.items())
+        return len(events)
+
+    def add(self, event_id, date, location, status="active", volunteers=0):
+        date, event_id = to_date(date), int(event_id)
+        key = normalize_location(location)
+        with self.__lock:
+            self.__discard(event_id)
+            if date < self.since:
+                return
+            self.__events[event_id] = (date, key, status, volunteers)
+            insort(self.__by_date, (date, event_id))
+            entries = self.__by_location.get(key)
+            if entries is None:
+                entries = self.__by_location[key] = []
+                insort(self.__locations, key)
+            insort(entries, (date, event_id))
+
+    def remove(self, event_id):
+        with self.__lock:
+            self.__discard(int(event_id))
+
+    def __discard(self, event_id):
+        event = self.__events.pop(event_id, None)
+        if event is None:
+            return
+        date, key = event[0], event[1]
+        del self.__by_date[bisect_left(self.__by_date, (date, event_id))]
+        entries = self.__by_location[key]
+        del entries[bisect_left(entries, (date, event_id))]
+        if not entries:
+            del self.__by_location[key]
+            del self.__locations[bisect_left(self.__locations, key)]
+
+    def volunteers_changed(self, event_id, delta):
+        """Move an event's volunteer count after a signup (+) or opt-out (-)."""
+        event_id = int(event_id)
+        with self.__lock:
+            event = self.__events.get(event_id)
+            if event is not None:
+                self.__events[event_id] = event[:3] + (max(event[3] + delta, 0),)
+
+    def __prune(self, today):
+        """Drop events dated before ``today``."""
+        cut = bisect_left(self.__by_date, (today,))
+        for date, event_id in self.__by_date[:cut]:
+            key = self.__events.pop(event_id)[1]
+            entries = self.__by_location.get(key)
+            if entries is not None:
+                del entries[:bisect_left(entries, (today,))]
+                if not entries:
+                    del self.__by_location[key]
+                    del self.__locations[bisect_left(self.__locations, key)]
+        del self.__by_date[:cut]
+        self.since = today
+
+    @staticmethod
+    def __window(entries, start, end, after):
+        lo = bisect_left(entries, (start,))
+        if after is not None:
+            lo = max(lo, bisect_right(entries, after))
+        hi = len(entries) if end is None else bisect_right(entries, (end, LAST))
+        # islice would step over the first lo entries one by one
+        return map(entries.__getitem__, range(lo, hi))
+
+    def find(self, start=None, end=None, location=None, status="active", after=None, limit=50, exclude=()):
+        """Return ``[(event_id, volunteers), ...]`` in ``(date, event_id)`` order.
+
+        ``start`` and ``end`` are inclusive dates (``start`` defaults to today),
+        ``location`` a location prefix, ``status`` None for any status,
+        ``after`` the ``(date, event_id)`` of the previous page's last event and
+        ``exclude`` event IDs to skip. Returns None when ``start`` is before
+        the indexed range.
+        """
+        today = datetime.date.today()
+        start = today if start is None else to_date(start)
+        end = None if end is None else to_date(end)
+        if after is not None:
+            after = (to_date(after[0]), int(after[1]))
+        found = []
+        with self.__lock:
+            if today > self.since:
+                self.__prune(today)
+            if start < self.since:
+                return None
+            if location is None:
+                candidates = self.__window(self.__by_date, start, end, after)
+            else:
+                prefix = normalize_location(location)
+                locations = self.__locations
+                windows = []
+                for position in range(bisect_left(locations, prefix), len(locations)):
+                    key = locations[position]
+                    if not key.startswith(prefix):
+                        break
+                    windows.append(self.__window(self.__by_location[key], start, end, after))
+                candidates = heapq.merge(*windows)
+            for _, event_id in candidates:
+                _, _, event_status, volunteers = self.__events[event_id]
+                if (status is None or event_status == status) and event_id not in exclude:
+                    found.append((event_id, volunteers))
+                    if limit is not None and len(found) >= limit:
+                        break
+        return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=datetime.date.fromisoformat)
+    parser.add_argument("--end", type=datetime.date.fromisoformat)
+    parser.add_argument("--location")
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    # event.py imports this module
+    from event import Event
+
+    db = Database()
+    try:
+        index = EventIndex(db)
+        print(f"ℹ️ Indexed {len(index):,} upcoming events.")
+        Event(db, index=index).view_events(start=args.start, end=args.end, location=args.location,
+                                           page_size=args.page_size)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
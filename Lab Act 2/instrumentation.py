@@ -0,0 +1,192 @@
+"""Per-statement query instrumentation for ``Database``.
+
+Every cursor handed out by ``Database`` is wrapped in an ``InstrumentedCursor``
+that measures each statement and the rows it returned. Measurements are
+aggregated by normalized SQL (literals and placeholders replaced with ``?``),
+statements slower than the configured threshold are written to the
+``donations.slow_query`` logger as JSON, and subscribed hooks receive every
+measurement so external profilers can consume them. Parameters are never
+recorded because they include passwords.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+slow_query_logger = logging.getLogger("donations.slow_query")
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\?[^)]*\))(?:\s*,\s*\(\?[^)]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query):
+    """Collapse a statement to its shape so calls with different values group together."""
+    query = _WHITESPACE.sub(" ", query).strip().rstrip(";").strip()
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _PLACEHOLDER.sub("?", query)
+    query = _IN_LIST.sub("IN (...)", query)
+    query = _VALUES_LIST.sub(r"\1, ...", query)
+    return query
+
+class QueryInstrumentation:
+    def __init__(self, slow_query_ms=None, explain_slow_queries=False):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow_queries = explain_slow_queries
+        self.__stats = {}
+        self.__hooks = []
+        self.__lock = threading.Lock()
+
+    def subscribe(self, hook):
+        """Call ``hook(event)`` with a dict for every measured statement."""
+        with self.__lock:
+            self.__hooks.append(hook)
+        return hook
+
+    def unsubscribe(self, hook):
+        with self.__lock:
+            if hook in self.__hooks:
+                self.__hooks.remove(hook)
+
+    def is_slow(self, elapsed_ms):
+        return self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms
+
+    def record(self, query, elapsed_ms, rows, error=None, plan=None):
+        normalized = normalize_sql(query)
+        with self.__lock:
+            entry = self.__stats.get(normalized)
+            if entry is None:
+                entry = self.__stats[normalized] = {
+                    "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "errors": 0, "slow": 0,
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["rows"] += rows
+            if error is not None:
+                entry["errors"] += 1
+            slow = self.is_slow(elapsed_ms)
+            if slow:
+                entry["slow"] += 1
+            hooks = list(self.__hooks)
+
+        event = {"sql": normalized, "elapsed_ms": elapsed_ms, "rows": rows, "error": error, "slow": slow}
+        if slow:
+            record = dict(event, plan=plan) if plan is not None else event
+            slow_query_logger.warning(json.dumps(record, default=str))
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception:
+                slow_query_logger.exception("Query hook %r failed", hook)
+
+    def snapshot(self):
+        """Return per-statement stats, slowest total time first."""
+        with self.__lock:
+            stats = {sql: dict(entry) for sql, entry in self.__stats.items()}
+        for entry in stats.values():
+            entry["mean_ms"] = entry["total_ms"] / entry["calls"]
+        return dict(sorted(stats.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def reset(self):
+        with self.__lock:
+            self.__stats.clear()
+
+class InstrumentedCursor:
+    """Cursor proxy that times statements and counts the rows they produce.
+
+    A statement's measurement is finished when the next statement starts or
+    the cursor is closed, so the time spent fetching rows is included.
+    """
+
+    def __init__(self, cursor, instrumentation, explain_prefix=None):
+        self.__cursor = cursor
+        self.__instrumentation = instrumentation
+        self.__explain_prefix = explain_prefix
+        self.__pending = None
+
+    def __start(self, query, values):
+        self.__finish()
+        self.__pending = {"query": query, "values": values, "started": time.perf_counter(),
+                          "execute_ms": None, "fetch_ms": 0.0, "rows": 0}
+
+    def __finish(self, error=None):
+        pending, self.__pending = self.__pending, None
+        if pending is None:
+            return
+        if pending["execute_ms"] is None:
+            elapsed_ms = (time.perf_counter() - pending["started"]) * 1000
+        else:
+            elapsed_ms = pending["execute_ms"] + pending["fetch_ms"]
+        rows = pending["rows"]
+        rowcount = getattr(self.__cursor, "rowcount", -1)
+        if not rows and rowcount and rowcount > 0:
+            rows = rowcount
+        plan = None
+        if (error is None and self.__instrumentation.explain_slow_queries and self.__explain_prefix
+                and self.__instrumentation.is_slow(elapsed_ms)
+                and pending["query"].lstrip().upper().startswith("SELECT")):
+            plan = self.__explain(pending["query"], pending["values"])
+        self.__instrumentation.record(pending["query"], elapsed_ms, rows, error=error, plan=plan)
+
+    def __explain(self, query, values):
+        try:
+            self.__cursor.execute(self.__explain_prefix + query, values or ())
+            return [list(row) for row in self.__cursor.fetchall()]
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+
+    def execute(self, query, values=None):
+        self.__start(query, values)
+        try:
+            result = self.__cursor.execute(query, values or ())
+        except Exception as e:
+            self.__finish(error=str(e))
+            raise
+        self.__pending["execute_ms"] = (time.perf_counter() - self.__pending["started"]) * 1000
+        return result
+
+    def executemany(self, query, seq_values):
+        self.__start(query, None)
+        try:
+            result = self.__cursor.executemany(query, seq_values)
+        except Exception as e:
+            self.__finish(error=str(e))
+            raise
+        self.__pending["execute_ms"] = (time.perf_counter() - self.__pending["started"]) * 1000
+        return result
+
+    def __timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        if self.__pending is not None:
+            self.__pending["fetch_ms"] += (time.perf_counter() - started) * 1000
+            if isinstance(result, list):
+                self.__pending["rows"] += len(result)
+            elif result is not None:
+                self.__pending["rows"] += 1
+        return result
+
+    def fetchone(self):
+        return self.__timed_fetch(self.__cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self.__timed_fetch(self.__cursor.fetchmany)
+        return self.__timed_fetch(self.__cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self.__timed_fetch(self.__cursor.fetchall)
+
+    def close(self):
+        self.__finish()
+        self.__cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self.__cursor, name)
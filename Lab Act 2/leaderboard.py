@@ -0,0 +1,372 @@
+"""In-process leaderboards for campaigns and donors.
+
+``Leaderboards`` keeps the top campaigns by funds raised (overall and per
+organization), the campaigns nearest to their goal and the top donors by
+total given. Each board is a ``BoundedRanking``: a list kept sorted with
+``bisect`` that holds ``size + slack`` entries, so memory stays bounded and
+reading the top N is a slice.
+
+Boards are loaded from the database when the service starts. Donor totals
+come from ``donor_totals`` (migration 10), which every donation write path
+keeps current with ``record_donor`` or ``record_donors`` in its transaction.
+Paths given a ``leaderboard`` also call ``read_totals`` inside the
+transaction, then ``Leaderboards.update`` after the commit, so the boards get
+the new absolute totals rather than deltas. A board that runs short after
+removals is reloaded alone on a background thread; reads never wait for it.
+Per-organization boards are loaded the first time they are read and kept for
+the most recent ``max_organizations`` organizations::
+
+    python leaderboard.py [--size 10]
+
+Totals only ever grow in this system; call ``rebuild_donor_totals`` and
+``rebuild`` after refunds or deletes.
+"""
+import argparse
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from decimal import Decimal
+
+from database import Database
+
+CAMPAIGN_COLUMNS = "c.campaign_id, c.title, COALESCE(c.funds_raised, 0), c.goal_amount, c.user_id"
+
+RECORD_DONOR = "UPDATE donor_totals SET total_amount = total_amount + %s WHERE user_id = %s"
+DONOR_COLUMNS = "t.user_id, u.name, t.total_amount"
+
+def _seed_donors(cursor, user_ids):
+    """Create donor_totals rows that are missing, e.g. for users loaded outside the app."""
+    user_ids = list(user_ids)
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"SELECT user_id FROM donor_totals WHERE user_id IN ({placeholders})", user_ids)
+    present = {str(row[0]) for row in cursor.fetchall()}
+    missing = [user_id for user_id in user_ids if str(user_id) not in present]
+    if not missing:
+        return
+    cursor.execute(
+        f"""
+        INSERT INTO donor_totals (user_id, total_amount)
+        SELECT u.user_id, COALESCE(SUM(d.amount), 0) FROM users u LEFT JOIN donations d ON d.user_id = u.user_id
+        WHERE u.user_id IN ({", ".join(["%s"] * len(missing))})
+        GROUP BY u.user_id
+        """,
+        missing,
+    )
+
+def record_donor(cursor, user_id, amount):
+    """Add one donation to the donor's total. Call before inserting the donation row."""
+    cursor.execute(RECORD_DONOR, (amount, user_id))
+    if cursor.rowcount == 0:
+        _seed_donors(cursor, [user_id])
+        cursor.execute(RECORD_DONOR, (amount, user_id))
+
+async def record_donor_async(cursor, user_id, amount):
+    """``record_donor`` for the ``AsyncCursor`` of ``AsyncDatabase.transaction``."""
+    await cursor.execute(RECORD_DONOR, (amount, user_id))
+    if cursor.rowcount == 0:
+        await cursor.execute(
+            """
+            INSERT INTO donor_totals (user_id, total_amount)
+            SELECT %s, COALESCE(SUM(amount), 0) FROM donations WHERE user_id = %s
+            """,
+            (user_id, user_id),
+        )
+        await cursor.execute(RECORD_DONOR, (amount, user_id))
+
+def record_donors(cursor, donations):
+    """Add ``(user_id, amount)`` pairs to the donor totals. Call before inserting the rows."""
+    per_donor = {}
+    for user_id, amount in donations:
+        per_donor[user_id] = per_donor.get(user_id, 0) + amount
+    if not per_donor:
+        return
+    _seed_donors(cursor, per_donor)
+    cursor.executemany(RECORD_DONOR, [(total, user_id) for user_id, total in per_donor.items()])
+
+def rebuild_donor_totals(db):
+    """Recompute donor_totals from the ledger, e.g. after a bulk load or deletes."""
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM donor_totals")
+        cursor.execute("INSERT INTO donor_totals (user_id, total_amount) "
+                       "SELECT user_id, SUM(amount) FROM donations WHERE user_id IS NOT NULL GROUP BY user_id")
+
+def read_totals(cursor, user_ids, campaign_ids):
+    """Current totals for the donors and campaigns a donation touched.
+
+    Call inside the donation's transaction, after its writes, and pass the
+    result to ``Leaderboards.update`` once it commits. Returns
+    ``(campaign_rows, donor_rows)``.
+    """
+    campaign_rows = []
+    donor_rows = []
+    campaign_ids = list(dict.fromkeys(campaign_ids))
+    user_ids = list(dict.fromkeys(user_ids))
+    if campaign_ids:
+        placeholders = ", ".join(["%s"] * len(campaign_ids))
+        cursor.execute(f"SELECT {CAMPAIGN_COLUMNS} FROM campaigns c WHERE c.campaign_id IN ({placeholders})",
+                       campaign_ids)
+        campaign_rows = cursor.fetchall()
+    if user_ids:
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        cursor.execute(
+            f"SELECT {DONOR_COLUMNS} FROM donor_totals t JOIN users u ON u.user_id = t.user_id "
+            f"WHERE t.user_id IN ({placeholders})",
+            user_ids,
+        )
+        donor_rows = cursor.fetchall()
+    return campaign_rows, donor_rows
+
+class BoundedRanking:
+    """The highest-scoring ``capacity`` items, kept sorted with bisect.
+
+    Entries are ``(-score, item_id)`` so the best item comes first and ties
+    go to the lower ID. A score lower than an item's current one is ignored:
+    it comes from a read that raced with a newer donation. ``complete`` is
+    False once an item has been dropped for lack of room, and ``needs_reload``
+    turns True when removals leave a truncated board with fewer than ``size``
+    items.
+    """
+
+    def __init__(self, size, capacity):
+        self.size = size
+        self.capacity = max(capacity, size)
+        self.__entries = []
+        self.__items = {}
+        self.complete = True
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, item_id):
+        return item_id in self.__items
+
+    @property
+    def needs_reload(self):
+        return not self.complete and len(self.__entries) < self.size
+
+    def offer(self, item_id, score, details=None):
+        current = self.__items.get(item_id)
+        if current is not None:
+            if score < current[0]:
+                return
+            self.__discard(item_id)
+        entry = (-score, item_id)
+        if len(self.__entries) >= self.capacity and entry >= self.__entries[-1]:
+            # Below the lowest kept score: the board can't tell it apart from anything else it dropped
+            self.complete = False
+            return
+        insort(self.__entries, entry)
+        self.__items[item_id] = (score, details)
+        if len(self.__entries) > self.capacity:
+            _, dropped = self.__entries.pop()
+            del self.__items[dropped]
+            self.complete = False
+
+    def remove(self, item_id):
+        if item_id in self.__items:
+            self.__discard(item_id)
+
+    def __discard(self, item_id):
+        score, _ = self.__items.pop(item_id)
+        del self.__entries[bisect_left(self.__entries, (-score, item_id))]
+
+    def top(self, n=None):
+        """``(item_id, score, details)`` for the best ``n`` items (default ``size``)."""
+        n = self.size if n is None else min(n, self.capacity)
+        return [(item_id, self.__items[item_id][0], self.__items[item_id][1]) for _, item_id in self.__entries[:n]]
+
+class Leaderboards:
+    def __init__(self, db, size=10, slack=None, max_organizations=1024, load=True):
+        self.__db = db
+        self.size = size
+        self.capacity = size + (size if slack is None else slack)
+        self.max_organizations = max_organizations
+        self.__lock = threading.Lock()
+        self.__boards = {name: BoundedRanking(size, self.capacity) for name in ("campaigns", "nearest", "donors")}
+        self.__organizations = OrderedDict()
+        # Board name -> rows that arrived while its reload was reading the database
+        self.__reloading = {}
+        self.__reload_threads = []
+        if load:
+            self.rebuild()
+
+    def __load_campaigns(self, where="1 = 1", order="c.funds_raised DESC", values=()):
+        query = f"""
+        SELECT {CAMPAIGN_COLUMNS} FROM campaigns c
+        WHERE {where}
+        ORDER BY {order}, c.campaign_id
+        LIMIT %s
+        """
+        return self.__db.fetch(query, tuple(values) + (self.capacity + 1,))
+
+    def __fill(self, board, rows, offer):
+        for row in rows:
+            offer(board, row)
+        if len(rows) <= self.capacity:
+            # Everything that qualifies fit on the board
+            board.complete = True
+
+    def __load(self, name):
+        """A fresh copy of one board, read from campaigns or donor_totals."""
+        board = BoundedRanking(self.size, self.capacity)
+        if name == "campaigns":
+            self.__fill(board, self.__load_campaigns(), self.__offer_funds)
+        elif name == "nearest":
+            self.__fill(board, self.__load_campaigns("c.goal_amount > 0 AND c.funds_raised < c.goal_amount",
+                                                     "c.funds_raised / c.goal_amount DESC"), self.__offer_progress)
+        else:
+            rows = self.__db.fetch(
+                f"""
+                SELECT {DONOR_COLUMNS} FROM donor_totals t JOIN users u ON u.user_id = t.user_id
+                WHERE t.total_amount > 0
+                ORDER BY t.total_amount DESC, t.user_id
+                LIMIT %s
+                """,
+                (self.capacity + 1,),
+            )
+            self.__fill(board, rows, self.__offer_donor)
+        return board
+
+    def rebuild(self):
+        """Reload every board from the database."""
+        boards = {name: self.__load(name) for name in self.__boards}
+        with self.__lock:
+            self.__boards = boards
+            self.__organizations.clear()
+
+    def __reload(self, name):
+        try:
+            board = self.__load(name)
+        except Exception as e:
+            print(f"❌ ERROR: Reloading the {name} leaderboard failed! {e}")
+            with self.__lock:
+                del self.__reloading[name]
+            return
+        with self.__lock:
+            # Replay what committed while the board was being read; stale rows are ignored by offer
+            for campaign_rows, donor_rows in self.__reloading.pop(name):
+                self.__apply(board, name, campaign_rows, donor_rows)
+            self.__boards[name] = board
+
+    def __schedule_reloads(self):
+        """Start a background reload of each global board that ran short. Call holding the lock."""
+        for name, board in self.__boards.items():
+            if board.needs_reload and name not in self.__reloading:
+                self.__reloading[name] = []
+                thread = threading.Thread(target=self.__reload, args=(name,), name=f"leaderboard-{name}",
+                                          daemon=True)
+                self.__reload_threads = [alive for alive in self.__reload_threads if alive.is_alive()] + [thread]
+                thread.start()
+
+    def wait_for_reloads(self, timeout=None):
+        """Block until the background board reloads started so far are done."""
+        with self.__lock:
+            threads = list(self.__reload_threads)
+        for thread in threads:
+            thread.join(timeout)
+
+    @staticmethod
+    def __offer_funds(board, row):
+        campaign_id, title, funds_raised, goal_amount, organization_id = row
+        board.offer(int(campaign_id), Decimal(str(funds_raised)),
+                    {"title": title, "goal_amount": Decimal(str(goal_amount)), "organization_id": organization_id})
+
+    @staticmethod
+    def __offer_progress(board, row):
+        campaign_id, title, funds_raised, goal_amount, organization_id = row
+        funds_raised, goal_amount = Decimal(str(funds_raised)), Decimal(str(goal_amount))
+        if goal_amount <= 0 or funds_raised >= goal_amount:
+            # Reached its goal: no longer "nearest to goal"
+            board.remove(int(campaign_id))
+            return
+        board.offer(int(campaign_id), funds_raised / goal_amount,
+                    {"title": title, "funds_raised": funds_raised, "goal_amount": goal_amount,
+                     "organization_id": organization_id})
+
+    @staticmethod
+    def __offer_donor(board, row):
+        user_id, name, total = row
+        board.offer(int(user_id), Decimal(str(total)), {"name": name})
+
+    def __apply(self, board, name, campaign_rows, donor_rows):
+        if name == "donors":
+            for row in donor_rows:
+                self.__offer_donor(board, row)
+            return
+        offer = self.__offer_funds if name == "campaigns" else self.__offer_progress
+        for row in campaign_rows:
+            offer(board, row)
+
+    def update(self, campaign_rows=(), donor_rows=()):
+        """Apply totals read with ``read_totals`` after a donation committed."""
+        with self.__lock:
+            for name, board in self.__boards.items():
+                self.__apply(board, name, campaign_rows, donor_rows)
+                if name in self.__reloading:
+                    self.__reloading[name].append((campaign_rows, donor_rows))
+            for row in campaign_rows:
+                organization = self.__organizations.get(row[4])
+                if organization is not None:
+                    self.__offer_funds(organization, row)
+            self.__schedule_reloads()
+
+    def __organization_board(self, organization_id):
+        with self.__lock:
+            board = self.__organizations.get(organization_id)
+            if board is not None and not board.needs_reload:
+                self.__organizations.move_to_end(organization_id)
+                return board
+        board = BoundedRanking(self.size, self.capacity)
+        self.__fill(board, self.__load_campaigns("c.user_id = %s", values=(organization_id,)), self.__offer_funds)
+        with self.__lock:
+            self.__organizations[organization_id] = board
+            while len(self.__organizations) > self.max_organizations:
+                self.__organizations.popitem(last=False)
+        return board
+
+    def __read(self, name, n):
+        """Top ``n`` of a global board; a board that ran short is being reloaded in the background."""
+        with self.__lock:
+            return self.__boards[name].top(n)
+
+    def top_campaigns(self, n=None):
+        """``(campaign_id, funds_raised, details)`` for the campaigns that raised the most."""
+        return self.__read("campaigns", n)
+
+    def top_campaigns_for_organization(self, organization_id, n=None):
+        board = self.__organization_board(organization_id)
+        with self.__lock:
+            return board.top(n)
+
+    def nearest_to_goal(self, n=None):
+        """``(campaign_id, progress, details)`` for unfinished campaigns closest to their goal."""
+        return self.__read("nearest", n)
+
+    def top_donors(self, n=None):
+        """``(user_id, total_given, details)`` for the most generous donors."""
+        return self.__read("donors", n)
+
+    def view_leaderboards(self, n=None):
+        print("\n🏆 Top Campaigns:")
+        for rank, (campaign_id, funds_raised, details) in enumerate(self.top_campaigns(n), 1):
+            print(f"{rank}. {details['title']} (ID {campaign_id}): ${funds_raised:,.2f}")
+        print("\n🎯 Nearest To Goal:")
+        for rank, (campaign_id, progress, details) in enumerate(self.nearest_to_goal(n), 1):
+            print(f"{rank}. {details['title']} (ID {campaign_id}): {progress:.0%} of ${details['goal_amount']:,.2f}")
+        print("\n💝 Top Donors:")
+        for rank, (user_id, total, details) in enumerate(self.top_donors(n), 1):
+            print(f"{rank}. {details['name']}: ${total:,.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10)
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        Leaderboards(db, size=args.size).view_leaderboards()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
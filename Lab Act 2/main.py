@@ -1,10 +1,13 @@
 import re
 from datetime import datetime
 from database import Database
+from cache import TTLCache
+from migrations import MigrationRunner
 from user import User
 from campaign import Campaign
 from donation import Donation
 from event import Event
+from session import Session
 
 def safe_input(prompt, type_=str, condition=lambda x: True, error_msg="Invalid input. Try again."):
     while True:
@@ -27,31 +30,19 @@ def validate_date(date_str):
         return False
 
 
-def add_funds(user_id, db):
+def add_funds(session):
     amount = safe_input("\nEnter the amount to add: $", float, lambda x: x > 0,
                         "Please enter a positive number.")
-    update_query = "UPDATE users SET balance = balance + %s WHERE user_id = %s"
-    db.execute(update_query, (amount, user_id))
-    print(f"Successfully added ${amount:.2f} to your balance!")
-
-def get_user_balance(user_id, db):
-    query = "SELECT balance FROM users WHERE user_id = %s"
-    result = db.fetch(query, (user_id,))
-    return result[0][0] if result else 0
-
-def process_payment(user_id, amount, db):
-    current_balance = get_user_balance(user_id, db)
-    if current_balance >= amount:
-        update_query = "UPDATE users SET balance = balance - %s WHERE user_id = %s"
-        db.execute(update_query, (amount, user_id))
-        return True
+    if session.add_funds(amount):
+        print(f"Successfully added ${amount:.2f} to your balance!")
     else:
-        print("Insufficient balance! Please add funds.")
-        return False
+        print("❌ Funds were not added. Please try again.")
 
-def donor_dashboard(donation, campaign, event, user_id, db):
+def donor_dashboard(donation, campaign, event, session):
+    user_id = session.user_id
     while True:
-        current_balance = get_user_balance(user_id, db)
+        # Served from the session's user cache after the first loop
+        current_balance = session.balance
         print(f"\n📊 Donor Dashboard \n💰 Your current balance: ${current_balance:.2f}")
         print("\n(1) Browse Campaigns \n(2) Donate to Campaign \n(3) View Donation History")
         print("(4) View Events \n(5) Volunteer for an Event \n(6) View Volunteered Events \n(7) Opt Out of Event")
@@ -66,10 +57,8 @@ def donor_dashboard(donation, campaign, event, user_id, db):
             campaign_id = input("Enter campaign ID to donate: ").strip()
             amount = safe_input("Enter donation amount: ", float, lambda x: x > 0,
                                 "Please enter a valid positive number.")
-            if process_payment(user_id, amount, db):
-                donation.donate_to_campaign(user_id, campaign_id, amount)
-            else:
-                print("❌ Donation failed due to insufficient balance.")
+            if not session.donate(donation, campaign_id, amount):
+                print("❌ Donation failed. Your balance has not been charged.")
 
         elif choice == "3":
             donation.view_donation_history(user_id)
@@ -79,7 +68,7 @@ def donor_dashboard(donation, campaign, event, user_id, db):
 
         elif choice == "5":
             event_id = input("Enter event ID to volunteer: ").strip()
-            event.volunteer_for_event(user_id, event_id)
+            session.volunteer(event, event_id)
 
         elif choice == "6":
             event.view_volunteer_history(user_id)
@@ -89,7 +78,7 @@ def donor_dashboard(donation, campaign, event, user_id, db):
             event.opt_out_of_event(user_id, event_id)
 
         elif choice == "8":
-            add_funds(user_id, db)
+            add_funds(session)
 
         elif choice == "9":
             print("🔒 Logging out...")
@@ -141,9 +130,16 @@ def organization_dashboard(campaign, event, user_id):
 
 def main():
     db = Database()
-    user = User(db)
-    campaign = Campaign(db)
-    donation = Donation(db)
+    try:
+        MigrationRunner(db).migrate()
+    except Exception as e:
+        print(f"❌ ERROR: Schema migration failed! {e}")
+    campaign_cache = TTLCache(ttl=60)
+    # Shared by every session; entries are small, so keep plenty
+    user_cache = TTLCache(ttl=300, max_entries=10000)
+    user = User(db, cache=user_cache)
+    campaign = Campaign(db, campaign_cache)
+    donation = Donation(db, campaign_cache)
     event = Event(db)
 
     while True:
@@ -180,9 +176,9 @@ def main():
             continue
 
         if logged_in_user:
-            user_id, *_, role = logged_in_user
+            user_id, *_, role = logged_in_user[0]
             if role == "donor":
-                donor_dashboard(donation, campaign, event, user_id, db)
+                donor_dashboard(donation, campaign, event, Session(db, logged_in_user[0], user_cache))
             elif role == "organization":
                 organization_dashboard(campaign, event, user_id)
             else:
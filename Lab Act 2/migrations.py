@@ -0,0 +1,363 @@
+"""Versioned schema migrations.
+
+Each ``Migration`` has a version, a name and the statements to apply (``up``)
+and revert (``down``). Statements are written in MySQL syntax like the rest
+of the code base; a dict keyed by dialect can be used where the engines
+differ. Applied versions are recorded in ``schema_migrations``.
+
+MySQL commits each DDL statement on its own, so a migration that fails
+halfway stays half applied and unrecorded. The runner therefore skips a
+``CREATE TABLE``/``CREATE INDEX``/``ADD COLUMN`` whose object already exists
+and a ``DROP`` whose object is gone, and a rerun picks up where it stopped. Data
+statements must be safe to repeat, or run after the last DDL statement so
+they commit together with the version row::
+
+    python migrations.py status
+    python migrations.py up [--to VERSION]
+    python migrations.py down --to VERSION
+"""
+import argparse
+import re
+
+from database import Database
+
+_DDL = re.compile(
+    r"^\s*(CREATE|DROP)\s+(?:UNIQUE\s+)?(INDEX|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?`?(\w+)`?"
+    r"(?:\s+ON\s+`?(\w+)`?)?",
+    re.IGNORECASE,
+)
+_ALTER = re.compile(r"^\s*ALTER\s+TABLE\s+`?(\w+)`?\s+(ADD|DROP)\s+(?:COLUMN\s+)?`?(\w+)`?", re.IGNORECASE)
+
+class Migration:
+    def __init__(self, version, name, up, down):
+        self.version = version
+        self.name = name
+        self.up = up
+        self.down = down
+
+    def statements(self, direction, dialect):
+        statements = self.up if direction == "up" else self.down
+        if isinstance(statements, dict):
+            statements = statements[dialect]
+        return statements
+
+MIGRATIONS = [
+    Migration(
+        1, "performance indexes",
+        up=[
+            # Donation history: WHERE user_id = ? ORDER BY donation_date DESC, donation_id DESC
+            "CREATE INDEX idx_donations_user_date ON donations (user_id, donation_date, donation_id)",
+            # Last donation per campaign in view_my_campaign_donations
+            "CREATE INDEX idx_donations_campaign_date ON donations (campaign_id, donation_date)",
+            "CREATE INDEX idx_campaigns_status ON campaigns (status)",
+            # Volunteer lists: WHERE event_id = ? ORDER BY volunteer_date DESC, volunteer_id DESC
+            "CREATE INDEX idx_event_volunteers_event_date ON event_volunteers (event_id, volunteer_date, volunteer_id)",
+        ],
+        down=[
+            "DROP INDEX idx_event_volunteers_event_date ON event_volunteers",
+            "DROP INDEX idx_campaigns_status ON campaigns",
+            "DROP INDEX idx_donations_campaign_date ON donations",
+            "DROP INDEX idx_donations_user_date ON donations",
+        ],
+    ),
+    Migration(
+        2, "unique volunteer signup",
+        up=[
+            # Keep the earliest signup of any duplicated (user_id, event_id) pair
+            """
+            DELETE FROM event_volunteers
+            WHERE volunteer_id NOT IN (
+                SELECT keep_id FROM (
+                    SELECT MIN(volunteer_id) AS keep_id FROM event_volunteers GROUP BY user_id, event_id
+                ) AS keepers
+            )
+            """,
+            "CREATE UNIQUE INDEX uq_event_volunteers_user_event ON event_volunteers (user_id, event_id)",
+        ],
+        down=[
+            "DROP INDEX uq_event_volunteers_user_event ON event_volunteers",
+        ],
+    ),
+    Migration(
+        3, "campaign stats",
+        up=[
+            """
+            CREATE TABLE campaign_stats (
+                campaign_id INT NOT NULL PRIMARY KEY,
+                total_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                unique_donors INT NOT NULL DEFAULT 0,
+                first_donation_at TIMESTAMP DEFAULT NULL,
+                last_donation_at TIMESTAMP DEFAULT NULL,
+                largest_gift DECIMAL(10,2) NOT NULL DEFAULT 0,
+                FOREIGN KEY (campaign_id) REFERENCES campaigns (campaign_id) ON DELETE CASCADE
+            )
+            """,
+            # Has this donor given to the campaign before? (unique_donors on every donation)
+            "CREATE INDEX idx_donations_campaign_user ON donations (campaign_id, user_id)",
+            """
+            INSERT INTO campaign_stats (campaign_id, total_amount, donation_count, unique_donors,
+                                        first_donation_at, last_donation_at, largest_gift)
+            SELECT c.campaign_id, COALESCE(SUM(d.amount), 0), COUNT(d.donation_id), COUNT(DISTINCT d.user_id),
+                   MIN(d.donation_date), MAX(d.donation_date), COALESCE(MAX(d.amount), 0)
+            FROM campaigns c
+            LEFT JOIN donations d ON d.campaign_id = c.campaign_id
+            GROUP BY c.campaign_id
+            """,
+        ],
+        down=[
+            "DROP INDEX idx_donations_campaign_user ON donations",
+            "DROP TABLE campaign_stats",
+        ],
+    ),
+    Migration(
+        4, "watermarks",
+        up=[
+            # Progress markers (e.g. the last applied journal sequence), updated with the data they describe
+            """
+            CREATE TABLE watermarks (
+                name VARCHAR(64) NOT NULL PRIMARY KEY,
+                value BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+        down=[
+            "DROP TABLE watermarks",
+        ],
+    ),
+    Migration(
+        5, "upcoming events index",
+        up=[
+            # Active events page: WHERE status = 'active' AND date >= CURDATE() ORDER BY date, event_id
+            "CREATE INDEX idx_events_status_date ON events (status, date, event_id)",
+        ],
+        down=[
+            "DROP INDEX idx_events_status_date ON events",
+        ],
+    ),
+    Migration(
+        6, "donation rollups",
+        up=[
+            # One table per granularity; bucket_start is the start of the hour, day or month
+            """
+            CREATE TABLE donation_rollups_hourly (
+                campaign_id INT NOT NULL,
+                bucket_start DATETIME NOT NULL,
+                total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (campaign_id, bucket_start),
+                FOREIGN KEY (campaign_id) REFERENCES campaigns (campaign_id) ON DELETE CASCADE
+            )
+            """,
+            # Range totals across all campaigns
+            "CREATE INDEX idx_donation_rollups_hourly_bucket ON donation_rollups_hourly (bucket_start)",
+            """
+            CREATE TABLE donation_rollups_daily (
+                campaign_id INT NOT NULL,
+                bucket_start DATETIME NOT NULL,
+                total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (campaign_id, bucket_start),
+                FOREIGN KEY (campaign_id) REFERENCES campaigns (campaign_id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX idx_donation_rollups_daily_bucket ON donation_rollups_daily (bucket_start)",
+            """
+            CREATE TABLE donation_rollups_monthly (
+                campaign_id INT NOT NULL,
+                bucket_start DATETIME NOT NULL,
+                total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (campaign_id, bucket_start),
+                FOREIGN KEY (campaign_id) REFERENCES campaigns (campaign_id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX idx_donation_rollups_monthly_bucket ON donation_rollups_monthly (bucket_start)",
+        ],
+        down=[
+            "DROP TABLE donation_rollups_monthly",
+            "DROP TABLE donation_rollups_daily",
+            "DROP TABLE donation_rollups_hourly",
+        ],
+    ),
+    Migration(
+        7, "event discovery indexes",
+        up=[
+            # Date ranges over every status: WHERE date BETWEEN ? AND ? ORDER BY date, event_id
+            "CREATE INDEX idx_events_date ON events (date, event_id)",
+            # Location prefix plus date range: WHERE location LIKE 'prefix%' AND date BETWEEN ? AND ?
+            "CREATE INDEX idx_events_location_date ON events (location, date, event_id)",
+        ],
+        down=[
+            "DROP INDEX idx_events_location_date ON events",
+            "DROP INDEX idx_events_date ON events",
+        ],
+    ),
+    Migration(
+        8, "login by email",
+        up=[
+            # Passwords are hashed now, so login only filters on email, which UNIQUE KEY email covers.
+            # Skipped where the plaintext login's (email, password) index was never created
+            "DROP INDEX idx_users_email_password ON users",
+        ],
+        down=[
+            "CREATE INDEX idx_users_email_password ON users (email, password)",
+        ],
+    ),
+    Migration(
+        9, "donor totals",
+        up=[
+            # Total given per donor, moved by each donation instead of summing the donor's history
+            """
+            CREATE TABLE donor_totals (
+                user_id INT NOT NULL PRIMARY KEY,
+                total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+            )
+            """,
+            # Top donors board: ORDER BY total_amount DESC
+            "CREATE INDEX idx_donor_totals_total ON donor_totals (total_amount)",
+            """
+            INSERT INTO donor_totals (user_id, total_amount)
+            SELECT user_id, SUM(amount) FROM donations WHERE user_id IS NOT NULL GROUP BY user_id
+            """,
+        ],
+        down=[
+            "DROP TABLE donor_totals",
+        ],
+    ),
+    Migration(
+        10, "journal acknowledgement time",
+        up=[
+            # When the journal acknowledged the donation; donation_date stays the insert time,
+            # which watermarks.committed relies on
+            "ALTER TABLE donations ADD COLUMN acknowledged_at DATETIME NULL",
+        ],
+        down=[
+            "ALTER TABLE donations DROP COLUMN acknowledged_at",
+        ],
+    ),
+]
+
+class MigrationRunner:
+    def __init__(self, db, migrations=MIGRATIONS):
+        self.__db = db
+        self.__migrations = sorted(migrations, key=lambda migration: migration.version)
+
+    def __ensure_table(self):
+        with self.__db.transaction() as cursor:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT NOT NULL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+
+    def applied_versions(self):
+        self.__ensure_table()
+        with self.__db.transaction() as cursor:
+            cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+            return [row[0] for row in cursor.fetchall()]
+
+    def current_version(self):
+        applied = self.applied_versions()
+        return applied[-1] if applied else 0
+
+    def pending(self):
+        applied = set(self.applied_versions())
+        return [migration for migration in self.__migrations if migration.version not in applied]
+
+    def status(self):
+        applied = set(self.applied_versions())
+        return [(migration.version, migration.name, migration.version in applied) for migration in self.__migrations]
+
+    def __exists(self, cursor, kind, name, table):
+        if self.__db.dialect == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = %s AND name = %s", (kind, name))
+        elif kind == "index":
+            cursor.execute("SELECT 1 FROM information_schema.STATISTICS "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+                           (table, name))
+        else:
+            cursor.execute("SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                           (name,))
+        return cursor.fetchone() is not None
+
+    def __column_exists(self, cursor, table, column):
+        if self.__db.dialect == "sqlite":
+            cursor.execute("SELECT 1 FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+        else:
+            cursor.execute("SELECT 1 FROM information_schema.COLUMNS "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s", (table, column))
+        return cursor.fetchone() is not None
+
+    def __run(self, cursor, statement):
+        """Execute one statement unless it is DDL whose effect is already in place."""
+        ddl = _DDL.match(statement)
+        if ddl:
+            action, kind, name, table = ddl.groups()
+            if self.__exists(cursor, kind.lower(), name, table) == (action.upper() == "CREATE"):
+                return
+        alter = _ALTER.match(statement)
+        if alter:
+            table, action, column = alter.groups()
+            if self.__column_exists(cursor, table, column) == (action.upper() == "ADD"):
+                return
+        cursor.execute(statement)
+
+    def migrate(self, target=None):
+        """Apply pending migrations up to and including ``target`` (default: all)."""
+        applied = []
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+            with self.__db.transaction() as cursor:
+                for statement in migration.statements("up", self.__db.dialect):
+                    self.__run(cursor, statement)
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                               (migration.version, migration.name))
+            print(f"⬆️ Applied migration {migration.version}: {migration.name}")
+            applied.append(migration.version)
+        return applied
+
+    def rollback(self, target):
+        """Revert applied migrations newer than ``target``."""
+        applied = set(self.applied_versions())
+        reverted = []
+        for migration in reversed(self.__migrations):
+            if migration.version <= target or migration.version not in applied:
+                continue
+            with self.__db.transaction() as cursor:
+                for statement in migration.statements("down", self.__db.dialect):
+                    self.__run(cursor, statement)
+                cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+            print(f"⬇️ Reverted migration {migration.version}: {migration.name}")
+            reverted.append(migration.version)
+        return reverted
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "up", "down"])
+    parser.add_argument("--to", type=int, help="target version")
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        runner = MigrationRunner(db)
+        if args.command == "status":
+            for version, name, applied in runner.status():
+                print(f"{'✅' if applied else '⏳'} {version:04d} {name}")
+        elif args.command == "up":
+            if not runner.migrate(args.to):
+                print("ℹ️ Schema is up to date.")
+        else:
+            if args.to is None:
+                parser.error("down requires --to VERSION")
+            runner.rollback(args.to)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Salted scrypt password hashes, computed off the serving threads.
+
+Hashes are stored as ``scrypt$<log2 n>$<r>$<p>$<salt>$<hash>`` (salt and
+hash in base64), so each row records the cost it was made with. Raising
+``cost`` (``PASSWORD_HASH_COST``, default 14: 16 MB and a few tens of
+milliseconds per hash) makes old hashes count as stale, and ``check``
+returns a fresh hash for them the next time their owner logs in. Rows still
+holding a plaintext password are compared in constant time and rehashed the
+same way.
+
+``PasswordHasher`` runs the work on a ``ProcessPoolExecutor``. Logins then
+use every core, whatever the serving process's threads are doing. Its
+workers start through a fork server (spawned where there is none), never
+forked from the threaded serving process, and servers create the
+``default_hasher`` before they start serving. ``workers=0`` hashes inline
+instead (tests, scripts)::
+
+    python passwords.py hash
+    python passwords.py rehash-all [--batch-size 100]
+"""
+import argparse
+import atexit
+import base64
+import getpass
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from database import Database
+
+PREFIX = "scrypt"
+DEFAULT_COST = int(os.environ.get("PASSWORD_HASH_COST", 14))
+BLOCK_SIZE = 8
+PARALLELISM = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+# Forking a process that runs threads can copy a lock some other thread holds
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _scrypt(password, salt, cost, block_size, parallelism):
+    n = 2 ** cost
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=block_size, p=parallelism,
+                          maxmem=2 * 128 * block_size * n * parallelism, dklen=HASH_BYTES)
+
+def hash_password(password, cost=DEFAULT_COST):
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, cost, BLOCK_SIZE, PARALLELISM)
+    return "$".join((PREFIX, str(cost), str(BLOCK_SIZE), str(PARALLELISM),
+                     base64.b64encode(salt).decode("ascii"), base64.b64encode(digest).decode("ascii")))
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(PREFIX + "$")
+
+def verify_password(password, stored):
+    """True if ``password`` matches ``stored``, a hash or a legacy plaintext password."""
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    try:
+        _, cost, block_size, parallelism, salt, digest = stored.split("$")
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), int(cost), int(block_size), int(parallelism))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def needs_rehash(stored, cost=DEFAULT_COST):
+    if not is_hashed(stored):
+        return True
+    return stored.split("$")[1:4] != [str(cost), str(BLOCK_SIZE), str(PARALLELISM)]
+
+def check_password(password, stored, cost=DEFAULT_COST):
+    """Return ``(ok, new_hash)``; ``new_hash`` is set when a match was stored in plaintext or at another cost."""
+    if not verify_password(password, stored):
+        return False, None
+    if needs_rehash(stored, cost):
+        return True, hash_password(password, cost)
+    return True, None
+
+class PasswordHasher:
+    def __init__(self, cost=DEFAULT_COST, workers=None):
+        self.cost = cost
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.__executor = None
+        if self.workers:
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                  mp_context=multiprocessing.get_context(START_METHOD))
+        self.__decoy = None
+
+    @property
+    def decoy(self):
+        """A hash to check against when no user matched, so unknown e-mails take as long as wrong passwords."""
+        if self.__decoy is None:
+            self.__decoy = self.hash(base64.b64encode(os.urandom(SALT_BYTES)).decode("ascii"))
+        return self.__decoy
+
+    def __submit(self, function, *args):
+        if self.__executor is not None:
+            return self.__executor.submit(function, *args)
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def hash_future(self, password):
+        return self.__submit(hash_password, password, self.cost)
+
+    def check_future(self, password, stored):
+        """Future of ``(ok, new_hash)``; see ``check_password``."""
+        return self.__submit(check_password, password, stored, self.cost)
+
+    def hash(self, password):
+        return self.hash_future(password).result()
+
+    def check(self, password, stored):
+        return self.check_future(password, stored).result()
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_hasher():
+    """The process-wide hasher, with one worker process per core, created on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PasswordHasher()
+            atexit.register(_default.close)
+        return _default
+
+def rehash_all(db, hasher, batch_size=100):
+    """Hash every plaintext password in ``users``; returns how many were converted."""
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.fetch("SELECT user_id, password FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                        (last_id, batch_size))
+        if not rows:
+            return converted
+        plaintext = [(user_id, password) for user_id, password in rows if not is_hashed(password)]
+        futures = [hasher.hash_future(password) for _, password in plaintext]
+        hashes = [future.result() for future in futures]
+        with db.transaction() as cursor:
+            for (user_id, password), hashed in zip(plaintext, hashes):
+                # Matches nothing if the password changed while we were hashing
+                cursor.execute("UPDATE users SET password = %s WHERE user_id = %s AND password = %s",
+                               (hashed, user_id, password))
+                converted += cursor.rowcount > 0
+        last_id = rows[-1][0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["hash", "rehash-all"])
+    parser.add_argument("--cost", type=int, default=DEFAULT_COST)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(args.cost)
+    try:
+        if args.command == "hash":
+            print(hasher.hash(getpass.getpass("Password: ")))
+            return
+        db = Database()
+        try:
+            print(f"✅ Hashed {rehash_all(db, hasher, args.batch_size):,} plaintext passwords.")
+        finally:
+            db.close()
+    finally:
+        hasher.close()
+
+if __name__ == "__main__":
+    main()
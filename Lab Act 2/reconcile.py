@@ -0,0 +1,182 @@
+"""Check ``campaigns.funds_raised`` against the donations ledger, and fix drift.
+
+``FundsReconciler.run`` splits the campaigns into ``chunk_size`` campaign ID
+ranges and sums each range's donations on ``workers`` processes, each with
+its own connection (``workers=0`` sums on the caller's ``Database``). Each
+range is one statement, so a campaign's counter and its donations are read
+from the same snapshot. Campaigns whose counter differs from the ledger by a
+cent or more are reported. ``repair=True`` rewrites them one at a time. Each
+rewrite holds the campaign row lock, which the donation paths also take, so
+donations that arrive meanwhile are counted exactly once.
+
+``incremental=True`` only checks the campaigns that received donations
+above the ``reconcile:funds_raised`` watermark, less an ``overlap`` of ids.
+The overlap catches transactions that commit after a later ``donation_id``.
+The watermark moves to the newest donation at the start of the run after a
+repair or a clean check, so unrepaired drift is reported again next time.
+Drift that no new donation touches (a manual UPDATE, a deleted donation)
+is only found by a full run::
+
+    python reconcile.py report [--incremental] [--workers 4] [--chunk-size 1000]
+    python reconcile.py repair [--incremental]
+
+Repairs skip the campaign cache and leaderboards. Their entries expire or
+are rebuilt on their own schedule.
+"""
+import argparse
+import atexit
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from database import Database
+from watermarks import get_watermark, read_watermark, set_watermark
+
+WATERMARK = "reconcile:funds_raised"
+CENT = Decimal("0.01")
+
+# Counter and ledger total for a set of campaigns, selected by the same condition on both tables
+LEDGER_SUMS = """
+SELECT c.campaign_id, c.funds_raised, COALESCE(d.total, 0)
+FROM campaigns c
+LEFT JOIN (
+    SELECT campaign_id, SUM(amount) AS total FROM donations WHERE {donations} GROUP BY campaign_id
+) d ON d.campaign_id = c.campaign_id
+WHERE {campaigns}
+"""
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+def _condition(chunk):
+    """SQL condition on ``{column}`` and values for a ``("range", low, high)`` or ``("ids", ids)`` chunk."""
+    if chunk[0] == "range":
+        return "{column} >= %s AND {column} < %s", (chunk[1], chunk[2])
+    ids = tuple(chunk[1])
+    return f"{{column}} IN ({', '.join(['%s'] * len(ids))})", ids
+
+def find_drift(db, chunk):
+    """Return ``(campaigns checked, [(campaign_id, funds_raised, ledger total), ...])`` for one chunk."""
+    condition, values = _condition(chunk)
+    with db.connection() as connection:
+        cursor = db.backend.cursor(connection)
+        try:
+            cursor.execute(LEDGER_SUMS.format(donations=condition.format(column="campaign_id"),
+                                              campaigns=condition.format(column="c.campaign_id")), values + values)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    drift = [(campaign_id, _money(funds_raised), _money(total))
+             for campaign_id, funds_raised, total in rows if _money(funds_raised) != _money(total)]
+    return len(rows), drift
+
+_worker_db = None
+
+def _start_worker(backend):
+    global _worker_db
+    with redirect_stdout(io.StringIO()):
+        _worker_db = Database(pool_size=1, backend=backend)
+    atexit.register(_worker_db.close)
+
+def _find_drift_in_worker(chunk):
+    return find_drift(_worker_db, chunk)
+
+class FundsReconciler:
+    def __init__(self, db, workers=None, chunk_size=1000, overlap=1000):
+        self.__db = db
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        if self.workers and getattr(db.backend, "path", None) == ":memory:":
+            raise ValueError("An in-memory SQLite database can't be shared with worker processes; use workers=0.")
+
+    def __chunks(self, since=None, up_to=None):
+        if since is None:
+            low, high = self.__db.fetch_one("SELECT MIN(campaign_id), MAX(campaign_id) FROM campaigns") or (None, None)
+            if low is None:
+                return []
+            return [("range", start, start + self.chunk_size) for start in range(low, high + 1, self.chunk_size)]
+        ids = [row[0] for row in self.__db.fetch(
+            "SELECT DISTINCT campaign_id FROM donations "
+            "WHERE donation_id > %s AND donation_id <= %s AND campaign_id IS NOT NULL ORDER BY campaign_id",
+            (since, up_to))]
+        return [("ids", ids[start:start + self.chunk_size]) for start in range(0, len(ids), self.chunk_size)]
+
+    def check(self, chunks):
+        """Run ``find_drift`` over the chunks; returns ``(campaigns checked, drift)``."""
+        if self.workers:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_start_worker,
+                                     initargs=(self.__db.backend,)) as executor:
+                results = list(executor.map(_find_drift_in_worker, chunks))
+        else:
+            results = [find_drift(self.__db, chunk) for chunk in chunks]
+        drift = sorted(row for _, rows in results for row in rows)
+        return sum(checked for checked, _ in results), drift
+
+    def repair(self, campaign_ids):
+        """Set each campaign's funds_raised to its ledger total; returns how many changed."""
+        repaired = 0
+        for campaign_id in campaign_ids:
+            with self.__db.transaction() as cursor:
+                # Donations update this row too, so they wait for the repair and then add on top
+                cursor.execute("SELECT funds_raised FROM campaigns WHERE campaign_id = %s FOR UPDATE", (campaign_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    continue
+                cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM donations WHERE campaign_id = %s", (campaign_id,))
+                total = _money(cursor.fetchone()[0])
+                if _money(row[0]) != total:
+                    cursor.execute("UPDATE campaigns SET funds_raised = %s WHERE campaign_id = %s", (total, campaign_id))
+                    repaired += 1
+        return repaired
+
+    def run(self, repair=False, incremental=False):
+        """Check (and optionally repair) the campaigns; returns a report dict."""
+        started = time.perf_counter()
+        newest = self.__db.fetch_one("SELECT COALESCE(MAX(donation_id), 0) FROM donations")[0]
+        since = None
+        if incremental:
+            since = max(0, read_watermark(self.__db, WATERMARK) - self.overlap)
+        chunks = self.__chunks(since, newest)
+        checked, drift = self.check(chunks)
+        repaired = self.repair([campaign_id for campaign_id, _, _ in drift]) if repair and drift else 0
+        moved = repair or not drift
+        if moved:
+            with self.__db.transaction() as cursor:
+                # Never move back, e.g. past a concurrent run that got further
+                set_watermark(cursor, WATERMARK, max(newest, get_watermark(cursor, WATERMARK, for_update=True)))
+        return {"chunks": len(chunks), "checked": checked, "drift": drift, "repaired": repaired,
+                "watermark": newest if moved else None, "seconds": time.perf_counter() - started}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report", "repair"])
+    parser.add_argument("--incremental", action="store_true", help="only campaigns with donations since the last run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes; 0 runs inline")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="campaigns per chunk")
+    parser.add_argument("--overlap", type=int, default=1000, help="donation ids below the watermark to recheck")
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        reconciler = FundsReconciler(db, args.workers, args.chunk_size, args.overlap)
+        report = reconciler.run(repair=args.command == "repair", incremental=args.incremental)
+        for campaign_id, funds_raised, total in report["drift"]:
+            print(f"❌ Campaign {campaign_id}: funds_raised {funds_raised}, donations {total} "
+                  f"(off by {funds_raised - total})")
+        if args.command == "repair" and report["drift"]:
+            print(f"✅ Repaired {report['repaired']} campaign(s).")
+        elif not report["drift"]:
+            print("✅ funds_raised matches the donations table.")
+        print(f"ℹ️ Checked {report['checked']:,} campaigns in {report['chunks']} chunk(s) "
+              f"in {report['seconds']:.2f}s.")
+        if report["watermark"] is not None:
+            print(f"ℹ️ Watermark moved to donation {report['watermark']}.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Hourly, daily and monthly donation totals per campaign.
+
+Migration 6 creates ``donation_rollups_hourly``, ``_daily`` and ``_monthly``,
+each keyed by (campaign_id, bucket_start). ``DonationRollups.refresh`` folds
+donations above the ``rollups:donations`` watermark into all three tables,
+one transaction per batch with the watermark moving in the same commit.
+``totals`` answers an arbitrary time range by covering it with the coarsest
+buckets that fit (whole months, then days, then hours at the edges), and
+``check`` compares every bucket with the raw ``donations`` rows::
+
+    python rollups.py refresh
+    python rollups.py totals --start 2025-03-01 --end 2025-04-01 [--campaign-id ID | --organization-id ID]
+    python rollups.py check
+    python rollups.py rebuild
+
+Range bounds are rounded down to whole hours, the finest bucket. Donations
+are only ever added in this system; run ``rebuild`` after deleting any.
+``refresh`` stops short of a missing donation_id until ``commit_lag``
+seconds have passed (see ``watermarks.committed``), so a donation that
+commits after a higher id is still folded in.
+"""
+import argparse
+import datetime
+from decimal import Decimal
+
+from database import Database
+from watermarks import COMMIT_LAG, committed, database_now, get_watermark, set_watermark
+
+TABLES = {
+    "hour": "donation_rollups_hourly",
+    "day": "donation_rollups_daily",
+    "month": "donation_rollups_monthly",
+}
+# Coarsest first
+GRANULARITIES = ("month", "day", "hour")
+WATERMARK = "rollups:donations"
+# Adds a batch of bucket totals, creating the buckets that don't exist yet
+UPSERT_TAIL = {
+    "mysql": "ON DUPLICATE KEY UPDATE total_amount = total_amount + VALUES(total_amount), "
+             "donation_count = donation_count + VALUES(donation_count)",
+    "sqlite": "ON CONFLICT (campaign_id, bucket_start) DO UPDATE SET "
+              "total_amount = total_amount + excluded.total_amount, "
+              "donation_count = donation_count + excluded.donation_count",
+}
+
+def bucket_start(moment, granularity):
+    """Start of the hour, day or month containing ``moment``."""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity in ("day", "month"):
+        moment = moment.replace(hour=0)
+    if granularity == "month":
+        moment = moment.replace(day=1)
+    return moment
+
+def next_bucket(start, granularity):
+    if granularity == "hour":
+        return start + datetime.timedelta(hours=1)
+    if granularity == "day":
+        return start + datetime.timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+def plan_range(start, end, granularities=GRANULARITIES):
+    """Cover ``[start, end)`` with ``(granularity, lo, hi)`` segments, coarsest buckets first.
+
+    Both bounds must be whole hours. Whole months in the middle are read from
+    the monthly table, the whole days either side of them from the daily
+    table and what is left from the hourly table.
+    """
+    if start >= end:
+        return []
+    granularity, finer = granularities[0], granularities[1:]
+    if not finer:
+        return [(granularity, start, end)]
+    lo = bucket_start(start, granularity)
+    if lo < start:
+        lo = next_bucket(lo, granularity)
+    hi = bucket_start(end, granularity)
+    if lo >= hi:
+        return plan_range(start, end, finer)
+    return plan_range(start, lo, finer) + [(granularity, lo, hi)] + plan_range(hi, end, finer)
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return value
+
+def _bucket_totals(rows):
+    """Sum ``(campaign_id, amount, donation_date)`` rows into ``{granularity: {(campaign_id, bucket_start): (total, count)}}``."""
+    buckets = {granularity: {} for granularity in TABLES}
+    hourly, daily, monthly = buckets["hour"], buckets["day"], buckets["month"]
+    for campaign_id, amount, donated_at in rows:
+        if campaign_id is None or donated_at is None:
+            continue
+        campaign_id, amount = int(campaign_id), Decimal(str(amount))
+        hour = _to_datetime(donated_at).replace(minute=0, second=0, microsecond=0)
+        day = hour.replace(hour=0)
+        for totals, start in ((hourly, hour), (daily, day), (monthly, day.replace(day=1))):
+            total, count = totals.get((campaign_id, start), (Decimal("0"), 0))
+            totals[(campaign_id, start)] = (total + amount, count + 1)
+    return buckets
+
+class DonationRollups:
+    def __init__(self, db, batch_size=10000, commit_lag=COMMIT_LAG):
+        self.__db = db
+        self.batch_size = batch_size
+        self.commit_lag = commit_lag
+
+    def refresh(self):
+        """Fold donations above the watermark into the rollups; returns how many were added."""
+        added = 0
+        try:
+            while True:
+                with self.__db.transaction() as cursor:
+                    last_id = get_watermark(cursor, WATERMARK, for_update=True)
+                    now = database_now(cursor)
+                    cursor.execute(
+                        """
+                        SELECT donation_id, campaign_id, amount, donation_date FROM donations
+                        WHERE donation_id > %s
+                        ORDER BY donation_id
+                        LIMIT %s
+                        """,
+                        (last_id, self.batch_size),
+                    )
+                    fetched = cursor.fetchall()
+                    rows = list(committed(fetched, last_id, now, self.commit_lag, date_index=3))
+                    if not rows:
+                        break
+                    self.__apply(cursor, rows)
+                    set_watermark(cursor, WATERMARK, rows[-1][0])
+                added += len(rows)
+                if len(fetched) < self.batch_size or len(rows) < len(fetched):
+                    break
+        except Exception as e:
+            print(f"❌ ERROR: Refreshing donation rollups failed! {e}")
+        return added
+
+    def __apply(self, cursor, rows):
+        buckets = _bucket_totals((campaign_id, amount, donated_at) for _, campaign_id, amount, donated_at in rows)
+        for granularity, totals in buckets.items():
+            if totals:
+                self.__merge(cursor, TABLES[granularity], totals)
+
+    def __merge(self, cursor, table, totals):
+        """Add ``{(campaign_id, bucket_start): (total, count)}`` to a rollup table with multi-row upserts."""
+        rows = [(campaign_id, start, total, count) for (campaign_id, start), (total, count) in totals.items()]
+        for offset in range(0, len(rows), 500):
+            chunk = rows[offset:offset + 500]
+            cursor.execute(
+                f"INSERT INTO {table} (campaign_id, bucket_start, total_amount, donation_count) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))} {UPSERT_TAIL[self.__db.dialect]}",
+                [value for row in chunk for value in row],
+            )
+
+    def __scope(self, campaign_id, organization_id):
+        """Join and WHERE clause restricting rollup rows ``r`` to a campaign or organization."""
+        if campaign_id is not None:
+            return "", "r.campaign_id = %s", [campaign_id]
+        if organization_id is not None:
+            return "JOIN campaigns c ON c.campaign_id = r.campaign_id", "c.user_id = %s", [organization_id]
+        return "", "1 = 1", []
+
+    def totals(self, start, end, campaign_id=None, organization_id=None):
+        """Return ``(total, count)`` of donations in ``[start, end)``, rounded down to whole hours.
+
+        One query reads at most five bucket ranges, whatever the length of the range.
+        """
+        start, end = bucket_start(_to_datetime(start), "hour"), bucket_start(_to_datetime(end), "hour")
+        segments = plan_range(start, end)
+        if not segments:
+            return Decimal("0.00"), 0
+        join, condition, values = self.__scope(campaign_id, organization_id)
+        parts = []
+        params = []
+        for granularity, lo, hi in segments:
+            parts.append(
+                f"SELECT r.total_amount, r.donation_count FROM {TABLES[granularity]} r {join} "
+                f"WHERE {condition} AND r.bucket_start >= %s AND r.bucket_start < %s")
+            params.extend(values + [lo, hi])
+        query = f"SELECT SUM(total_amount), SUM(donation_count) FROM ({' UNION ALL '.join(parts)}) AS buckets"
+        total, count = self.__db.fetch_one(query, params) or (None, None)
+        return Decimal(str(total or 0)).quantize(Decimal("0.01")), int(count or 0)
+
+    def series(self, start, end, granularity="day", campaign_id=None, organization_id=None):
+        """Return ``(bucket_start, total, count)`` per bucket of one granularity in ``[start, end)``."""
+        if granularity not in TABLES:
+            raise ValueError(f"granularity must be one of {', '.join(TABLES)}")
+        join, condition, values = self.__scope(campaign_id, organization_id)
+        query = f"""
+        SELECT r.bucket_start, SUM(r.total_amount), SUM(r.donation_count)
+        FROM {TABLES[granularity]} r {join}
+        WHERE {condition} AND r.bucket_start >= %s AND r.bucket_start < %s
+        GROUP BY r.bucket_start
+        ORDER BY r.bucket_start
+        """
+        rows = self.__db.fetch(query, values + [_to_datetime(start), _to_datetime(end)])
+        return [(_to_datetime(bucket), Decimal(str(total)).quantize(Decimal("0.01")), int(count))
+                for bucket, total, count in rows]
+
+    def check(self, chunk_size=10000):
+        """Compare every rollup bucket with the raw donations up to the watermark.
+
+        Returns ``(granularity, campaign_id, bucket_start, rollup, raw)`` for
+        each mismatch, where ``rollup`` and ``raw`` are ``(total, count)``.
+        Runs in one transaction so both sides see the same snapshot.
+        """
+        mismatches = []
+        with self.__db.transaction() as cursor:
+            last_id = get_watermark(cursor, WATERMARK)
+            cursor.execute(
+                "SELECT campaign_id, amount, donation_date FROM donations "
+                "WHERE donation_id <= %s AND campaign_id IS NOT NULL AND donation_date IS NOT NULL",
+                (last_id,),
+            )
+
+            def donations():
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield from rows
+
+            expected = _bucket_totals(donations())
+
+            for granularity, table in TABLES.items():
+                cursor.execute(f"SELECT campaign_id, bucket_start, total_amount, donation_count FROM {table}")
+                raw = expected[granularity]
+                for campaign_id, start, total, count in cursor.fetchall():
+                    key = (int(campaign_id), _to_datetime(start))
+                    rollup = (Decimal(str(total)).quantize(Decimal("0.01")), int(count))
+                    actual = raw.pop(key, (Decimal("0"), 0))
+                    actual = (actual[0].quantize(Decimal("0.01")), actual[1])
+                    if rollup != actual:
+                        mismatches.append((granularity, key[0], key[1], rollup, actual))
+                for (campaign_id, start), (total, count) in raw.items():
+                    mismatches.append((granularity, campaign_id, start, (Decimal("0.00"), 0),
+                                       (total.quantize(Decimal("0.01")), count)))
+        return mismatches
+
+    def rebuild(self):
+        """Empty the rollups and fold in every donation again."""
+        with self.__db.transaction() as cursor:
+            get_watermark(cursor, WATERMARK, for_update=True)
+            for table in TABLES.values():
+                cursor.execute(f"DELETE FROM {table}")
+            set_watermark(cursor, WATERMARK, 0)
+        return self.refresh()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["refresh", "totals", "check", "rebuild"])
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--campaign-id", type=int)
+    parser.add_argument("--organization-id", type=int)
+    args = parser.parse_args()
+    if args.command == "totals" and (args.start is None or args.end is None):
+        parser.error("totals needs --start and --end")
+
+    db = Database()
+    try:
+        rollups = DonationRollups(db)
+        if args.command == "refresh":
+            print(f"✅ Rolled up {rollups.refresh():,} new donations.")
+        elif args.command == "rebuild":
+            print(f"✅ Rolled up {rollups.rebuild():,} donations.")
+        elif args.command == "totals":
+            total, count = rollups.totals(args.start, args.end, args.campaign_id, args.organization_id)
+            print(f"💰 ${total:,.2f} from {count:,} donations between {args.start} and {args.end}.")
+        else:
+            mismatches = rollups.check()
+            for granularity, campaign_id, start, rollup, raw in mismatches:
+                print(f"❌ {granularity} {start} campaign {campaign_id}: rollup {rollup}, donations {raw}")
+            if not mismatches:
+                print("✅ Rollups match the donations table.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
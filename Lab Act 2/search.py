@@ -0,0 +1,352 @@
+"""Keyword search over campaigns and events.
+
+``SearchIndex`` keeps an in-process inverted index for each kind of document:
+campaigns by title and description, events by name, description and
+location. Text is lowercased and split into letters and digits, and common
+stopwords are dropped. Titles and names count twice. Results are ranked with
+BM25 and paged.
+
+The index is saved as JSON together with the highest ID it has read from each
+table. On startup only rows above those IDs are indexed. ``Campaign`` and
+``Event`` take a ``search`` argument and add what they create straight away::
+
+    python search.py "flood relief" [--events] [--page 2]
+    python search.py --rebuild
+
+Campaigns and events are never edited in this system. A result that has since
+been deleted is dropped from the index the first time a search returns it.
+Closed campaigns and past or inactive events stay in the index but are left
+out of the results.
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from database import Database
+
+DEFAULT_PATH = ".search_index.json"
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "our", "the", "this", "to", "we", "with", "you", "your",
+))
+# kind: (table, id column, ((column, weight), ...), columns shown in results, condition for results)
+KINDS = {
+    "campaign": ("campaigns", "campaign_id", (("title", 2), ("description", 1)),
+                 "campaign_id, title, description, goal_amount, funds_raised, deadline", "status = 'active'"),
+    "event": ("events", "event_id", (("name", 2), ("description", 1), ("location", 1)),
+              "event_id, name, description, date, location", "status = 'active' AND date >= CURDATE()"),
+}
+
+def tokenize(text):
+    return [term for term in TOKEN.findall((text or "").lower()) if term not in STOPWORDS]
+
+class InvertedIndex:
+    """Term -> {doc_id: weighted count} postings, ranked with BM25.
+
+    Each term also gets a list of its documents ordered by their BM25 term
+    score (without the IDF, which is the same for every document of a term),
+    built the first time the term is searched and dropped when its postings
+    change. A one-word query is a slice of that list. Longer queries walk the
+    lists side by side and stop once no unseen document can beat the page
+    (Fagin's threshold algorithm), so common words don't cost a full scan.
+    The average document length used for scoring is refreshed once it drifts
+    by more than ``AVERAGE_DRIFT``, which rebuilds the lists.
+    """
+    K1 = 1.2
+    B = 0.75
+    AVERAGE_DRIFT = 0.1
+
+    def __init__(self):
+        self.__postings = {}
+        self.__impacts = {}
+        self.__documents = {}
+        self.__lengths = {}
+        self.__total_length = 0
+        self.__average = None
+        # Every row up to here has been read from the table
+        self.last_id = 0
+
+    def __len__(self):
+        return len(self.__documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.__documents
+
+    def add(self, doc_id, fields):
+        """Index ``(text, weight)`` fields under ``doc_id``, replacing what was there."""
+        self.remove(doc_id)
+        counts = Counter()
+        for text, weight in fields:
+            for term in tokenize(text):
+                counts[term] += weight
+        if not counts:
+            return
+        self.__store(doc_id, dict(counts))
+
+    def __store(self, doc_id, counts):
+        self.__documents[doc_id] = counts
+        length = sum(counts.values())
+        self.__lengths[doc_id] = length
+        self.__total_length += length
+        for term, count in counts.items():
+            self.__postings.setdefault(term, {})[doc_id] = count
+            self.__impacts.pop(term, None)
+
+    def remove(self, doc_id):
+        counts = self.__documents.pop(doc_id, None)
+        if counts is None:
+            return
+        self.__total_length -= self.__lengths.pop(doc_id)
+        for term in counts:
+            self.__impacts.pop(term, None)
+            postings = self.__postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.__postings[term]
+
+    def search(self, query, limit, offset=0):
+        """Return ``(match_count, [(doc_id, score), ...])`` for one page of the best matches.
+
+        A document matches if it has any query term; ties go to the lower ID.
+        """
+        count = len(self.__documents)
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.__postings]
+        if not terms:
+            return 0, []
+        self.__settle_average()
+        lists = []
+        for term in terms:
+            postings = self.__postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            lists.append((idf * (self.K1 + 1), postings, self.__ranked(term, postings)))
+        wanted = offset + limit
+        if len(lists) == 1:
+            boost, postings, ranked = lists[0]
+            return len(postings), [(doc_id, -impact * boost) for impact, doc_id in ranked[offset:wanted]]
+
+        best = []  # min-heap of (score, -doc_id)
+        seen = set()
+        for depth in range(max(len(ranked) for _, _, ranked in lists)):
+            # Best score and lowest ID an unseen document could still have
+            threshold = 0.0
+            frontier = 0
+            for boost, _, ranked in lists:
+                if depth >= len(ranked):
+                    continue
+                impact, doc_id = ranked[depth]
+                threshold -= impact * boost
+                frontier = max(frontier, doc_id)
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                entry = (sum(boost * self.__impact(postings[doc_id], doc_id)
+                             for boost, postings, _ in lists if doc_id in postings), -doc_id)
+                if len(best) < wanted:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+            if len(best) >= wanted and (best[0][0], -best[0][1]) > (threshold, -frontier):
+                break
+        matches = len(set().union(*(postings for _, postings, _ in lists)))
+        return matches, [(-doc_id, score) for score, doc_id in sorted(best, reverse=True)[offset:]]
+
+    def __settle_average(self):
+        average = self.__total_length / len(self.__documents)
+        if self.__average is None or abs(average - self.__average) > self.AVERAGE_DRIFT * self.__average:
+            self.__average = average
+            self.__impacts.clear()
+
+    def __impact(self, frequency, doc_id):
+        """BM25 term score without the IDF."""
+        norm = self.K1 * (1 - self.B + self.B * self.__lengths[doc_id] / self.__average)
+        return frequency / (frequency + norm)
+
+    def __ranked(self, term, postings):
+        """``(-impact, doc_id)`` for every document with ``term``, best first."""
+        ranked = self.__impacts.get(term)
+        if ranked is None:
+            ranked = sorted((-self.__impact(frequency, doc_id), doc_id) for doc_id, frequency in postings.items())
+            self.__impacts[term] = ranked
+        return ranked
+
+    def to_json(self):
+        documents = {str(doc_id): counts for doc_id, counts in self.__documents.items()}
+        return {"last_id": self.last_id, "documents": documents}
+
+    @classmethod
+    def from_json(cls, data):
+        index = cls()
+        index.last_id = data["last_id"]
+        for doc_id, counts in data["documents"].items():
+            index.__store(int(doc_id), counts)
+        return index
+
+class SearchIndex:
+    def __init__(self, db, path=DEFAULT_PATH, save_every=1000, batch_size=5000, load=True):
+        self.__db = db
+        self.path = path
+        self.save_every = save_every
+        self.batch_size = batch_size
+        self.__lock = threading.RLock()
+        self.__indexes = {kind: InvertedIndex() for kind in KINDS}
+        self.__unsaved = 0
+        if path and os.path.exists(path):
+            self.__read(path)
+        if load:
+            self.refresh()
+
+    def __read(self, path):
+        try:
+            with open(path, encoding="utf-8") as saved:
+                data = json.load(saved)
+            self.__indexes = {kind: InvertedIndex.from_json(data[kind]) for kind in KINDS}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable search index {path}: {e}")
+
+    def save(self):
+        """Write the index to ``path`` (replacing the old file in one step)."""
+        if not self.path:
+            return
+        with self.__lock:
+            data = {kind: index.to_json() for kind, index in self.__indexes.items()}
+            self.__unsaved = 0
+        with open(self.path + ".tmp", "w", encoding="utf-8") as saved:
+            json.dump(data, saved, separators=(",", ":"))
+        os.replace(self.path + ".tmp", self.path)
+
+    def size(self, kind):
+        return len(self.__indexes[kind])
+
+    def refresh(self):
+        """Index rows above the saved IDs; returns how many were read."""
+        added = 0
+        for kind, (table, key, fields, _, _) in KINDS.items():
+            columns = ", ".join(column for column, _ in fields)
+            index = self.__indexes[kind]
+            while True:
+                rows = self.__db.fetch(
+                    f"SELECT {key}, {columns} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s",
+                    (index.last_id, self.batch_size),
+                )
+                if not rows:
+                    break
+                with self.__lock:
+                    for row in rows:
+                        index.add(int(row[0]), zip(row[1:], (weight for _, weight in fields)))
+                    index.last_id = max(index.last_id, int(rows[-1][0]))
+                added += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+        if added:
+            self.save()
+        return added
+
+    def rebuild(self):
+        """Drop the index and read both tables again."""
+        with self.__lock:
+            self.__indexes = {kind: InvertedIndex() for kind in KINDS}
+        return self.refresh()
+
+    def __add(self, kind, doc_id, texts):
+        """Index a row that was just created.
+
+        ``last_id`` stays put, so a row another process created with a lower
+        ID is still picked up by the next ``refresh``.
+        """
+        fields = KINDS[kind][2]
+        with self.__lock:
+            self.__indexes[kind].add(int(doc_id), zip(texts, (weight for _, weight in fields)))
+            self.__unsaved += 1
+            due = self.__unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def add_campaign(self, campaign_id, title, description):
+        self.__add("campaign", campaign_id, (title, description))
+
+    def add_event(self, event_id, name, description, location):
+        self.__add("event", event_id, (name, description, location))
+
+    def search(self, query, kind="campaign", page=1, page_size=20):
+        """Return ``(match_count, rows)`` for one page of ranked results.
+
+        Rows are the ``KINDS`` result columns plus the score, best first.
+        ``match_count`` counts every indexed match, so a page can come up
+        short when some of its matches are closed or in the past.
+        """
+        table, key, _, columns, condition = KINDS[kind]
+        index = self.__indexes[kind]
+        with self.__lock:
+            count, ranked = index.search(query, page_size, (page - 1) * page_size)
+        if not ranked:
+            return count, []
+        placeholders = ", ".join(["%s"] * len(ranked))
+        rows = self.__db.fetch(
+            f"SELECT {columns}, CASE WHEN {condition} THEN 1 ELSE 0 END FROM {table} WHERE {key} IN ({placeholders})",
+            [doc_id for doc_id, _ in ranked],
+        )
+        if rows is None:
+            return count, []
+        found = {int(row[0]): row for row in rows}
+        if len(found) < len(ranked):
+            with self.__lock:
+                for doc_id, _ in ranked:
+                    if doc_id not in found:
+                        index.remove(doc_id)
+        return count, [tuple(found[doc_id][:-1]) + (score,) for doc_id, score in ranked
+                       if doc_id in found and found[doc_id][-1]]
+
+    def view_search(self, query, kind="campaign", page_size=20):
+        """Print every page of results for ``query``."""
+        page = 1
+        while True:
+            count, rows = self.search(query, kind, page, page_size)
+            if page == 1:
+                if not count:
+                    print(f"ℹ️ No {kind}s match \"{query}\".")
+                    return
+                print(f"\n🔎 {count} {kind}(s) match \"{query}\":\n")
+            for row in rows:
+                if kind == "campaign":
+                    print(f"Campaign ID: {row[0]} \nTitle: {row[1]}, \nDescription: {row[2]}, \n"
+                          f"Goal: {row[3]}, Raised: {row[4]}\n")
+                else:
+                    print(f"📅 Event ID: {row[0]} \n{row[1]}  \n{row[2]} \non {row[3]} \nat {row[4]}\n")
+            if page * page_size >= count:
+                return
+            page += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--events", action="store_true", help="search events instead of campaigns")
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--index", default=DEFAULT_PATH, help="where the index is saved")
+    parser.add_argument("--rebuild", action="store_true", help="index both tables from scratch")
+    args = parser.parse_args()
+    if not args.rebuild and not args.query:
+        parser.error("give a query or --rebuild")
+
+    db = Database()
+    try:
+        search = SearchIndex(db, args.index, load=not args.rebuild)
+        if args.rebuild:
+            print(f"✅ Indexed {search.rebuild():,} campaigns and events.")
+            return
+        kind = "event" if args.events else "campaign"
+        count, rows = search.search(args.query, kind, args.page, args.page_size)
+        print(f"\n🔎 {count} {kind}(s) match \"{args.query}\" (page {args.page}):\n")
+        for row in rows:
+            print(f"{row[0]}: {row[1]} (score {row[-1]:.2f})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
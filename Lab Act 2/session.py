@@ -0,0 +1,118 @@
+"""A logged-in user's session, backed by a user cache shared across sessions.
+
+``Session`` reads the user's name, e-mail, role and balance with one query
+and keeps them in a ``TTLCache`` under ``user_key(user_id)``, so the
+dashboard's per-loop balance check and the name shown on signups don't go
+back to the database. Balance changes made through the session
+(``add_funds``, ``process_payment``, ``donate``) write through: the row is
+updated first and the cached balance is then moved by the same amount.
+``User.update_profile`` drops the entry when it is given the same cache.
+
+Writes that don't go through a session (the API, another process) are
+picked up when the entry expires; keep the TTL short enough for that.
+``stats`` counts the lookups served from the cache, i.e. round trips saved.
+"""
+import threading
+from decimal import Decimal
+
+from cache import user_key
+
+# Serializes read-modify-write of cached balances between sessions
+_balance_lock = threading.Lock()
+
+class Session:
+    def __init__(self, db, user_row, cache=None):
+        self.__db = db
+        self.user_id = user_row[0]
+        self.__login_row = tuple(user_row)
+        self.__cache = cache
+        self.__stats = {"lookups": 0, "round_trips": 0, "round_trips_saved": 0}
+
+    def __load(self):
+        self.__stats["round_trips"] += 1
+        row = self.__db.fetch_one("SELECT name, email, role, balance FROM users WHERE user_id = %s", (self.user_id,))
+        if row is None:
+            return None
+        name, email, role, balance = row
+        return {"name": name, "email": email, "role": role, "balance": Decimal(str(balance or 0))}
+
+    def __profile(self):
+        self.__stats["lookups"] += 1
+        if self.__cache is None:
+            return self.__load()
+        found, profile = self.__cache.get(user_key(self.user_id))
+        if found:
+            self.__stats["round_trips_saved"] += 1
+            return profile
+        profile = self.__load()
+        if profile is not None:
+            self.__cache.set(user_key(self.user_id), profile)
+        return profile
+
+    @property
+    def name(self):
+        profile = self.__profile()
+        return profile["name"] if profile else self.__login_row[1]
+
+    @property
+    def role(self):
+        profile = self.__profile()
+        return profile["role"] if profile else self.__login_row[-1]
+
+    @property
+    def balance(self):
+        profile = self.__profile()
+        return profile["balance"] if profile else Decimal("0")
+
+    def __move_balance(self, delta):
+        """Write a committed balance change through to the cached profile."""
+        if self.__cache is None:
+            return
+        key = user_key(self.user_id)
+        with _balance_lock:
+            found, profile = self.__cache.get(key)
+            if found:
+                self.__cache.set(key, dict(profile, balance=profile["balance"] + Decimal(str(delta))))
+
+    def add_funds(self, amount):
+        """Credit ``amount`` to the balance; returns whether the row was updated."""
+        try:
+            with self.__db.transaction() as cursor:
+                cursor.execute("UPDATE users SET balance = balance + %s WHERE user_id = %s", (amount, self.user_id))
+                added = cursor.rowcount > 0
+        except Exception as e:
+            print(f"❌ Adding funds failed due to an error: {e}")
+            return False
+        if added:
+            self.__move_balance(amount)
+        return added
+
+    def process_payment(self, amount):
+        """Debit ``amount`` if the balance covers it; returns whether it did."""
+        with self.__db.transaction() as cursor:
+            cursor.execute("UPDATE users SET balance = balance - %s WHERE user_id = %s AND balance >= %s",
+                           (amount, self.user_id, amount))
+            paid = cursor.rowcount > 0
+        if paid:
+            self.__move_balance(-amount)
+        return paid
+
+    def donate(self, donation, campaign_id, amount):
+        """``Donation.donate_with_payment`` for this user, keeping the cached balance current."""
+        ok = donation.donate_with_payment(self.user_id, campaign_id, amount)
+        if ok:
+            self.__move_balance(-amount)
+        return ok
+
+    def volunteer(self, event, event_id):
+        return event.volunteer_for_event(self.user_id, event_id, user_name=self.name)
+
+    def update_profile(self, user, new_name, new_email, new_password):
+        """``User.update_profile`` for this user; pass a ``User`` sharing this cache so the entry is dropped."""
+        user.update_profile(self.user_id, new_name, new_email, new_password)
+        self.__login_row = (self.user_id, new_name, new_email, self.__login_row[-1])
+
+    def stats(self):
+        stats = dict(self.__stats)
+        stats["hit_rate"] = stats["round_trips_saved"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
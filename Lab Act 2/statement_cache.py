@@ -0,0 +1,165 @@
+"""Per-connection cache of prepared statements.
+
+``Database`` gives every pooled connection a ``StatementCache``: an LRU of
+cursors prepared by the backend, keyed by SQL text. On MySQL each entry is a
+server-side prepared statement (``cursor(prepared=True)``), so a hot query is
+parsed once per connection and its rows come back over the binary protocol.
+SQLite compiles statements through the same API; its driver keeps compiled
+statements per connection, sized to match. Evicted cursors are closed, which
+deallocates the statement on the server.
+
+SQL whose text changes with its arguments (``IN (%s, %s, ...)`` lists,
+multi-row ``VALUES``, ``EXPLAIN``) would take a new entry per shape and
+push the hot statements out, so it runs on a plain one-off cursor instead
+and is counted as ``skipped``.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+_DYNAMIC = re.compile(r"^\s*EXPLAIN\b|\bIN\s*\(\s*%s\s*,|\)\s*,\s*\(\s*%s", re.IGNORECASE)
+
+def is_dynamic(query):
+    """True for SQL built with a variable number of placeholders, or an EXPLAIN."""
+    return _DYNAMIC.search(query) is not None
+
+class StatementCacheStats:
+    """Hit/miss/eviction counters shared by the caches of one pool."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counts = {"hits": 0, "misses": 0, "evictions": 0, "prepared": 0, "skipped": 0}
+
+    def add(self, **deltas):
+        with self.__lock:
+            for name, delta in deltas.items():
+                self.__counts[name] += delta
+
+    def snapshot(self):
+        with self.__lock:
+            stats = dict(self.__counts)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+class StatementCache:
+    """LRU of prepared cursors for one connection; not shared between threads.
+
+    ``plain`` makes the one-off cursors for dynamic SQL (default: ``prepare``).
+    """
+
+    def __init__(self, prepare, capacity, stats, plain=None):
+        self.__prepare = prepare
+        self.__plain = plain or prepare
+        self.capacity = capacity
+        self.__stats = stats
+        self.__statements = OrderedDict()
+
+    def __len__(self):
+        return len(self.__statements)
+
+    def one_off(self):
+        """An uncached cursor; the caller closes it."""
+        self.__stats.add(skipped=1)
+        return self.__plain()
+
+    def get(self, query):
+        cursor = self.__statements.get(query)
+        if cursor is not None:
+            self.__statements.move_to_end(query)
+            self.__stats.add(hits=1)
+            return cursor
+        cursor = self.__prepare()
+        self.__statements[query] = cursor
+        self.__stats.add(misses=1, prepared=1)
+        if len(self.__statements) > self.capacity:
+            _, evicted = self.__statements.popitem(last=False)
+            self.__stats.add(evictions=1, prepared=-1)
+            self.close_cursor(evicted)
+        return cursor
+
+    @staticmethod
+    def close_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def close(self):
+        self.__stats.add(prepared=-len(self.__statements))
+        for cursor in self.__statements.values():
+            self.close_cursor(cursor)
+        self.__statements.clear()
+
+class CachedStatementCursor:
+    """Cursor that runs each statement on that statement's cached prepared cursor.
+
+    Fetches, ``rowcount`` and ``lastrowid`` refer to the last executed
+    statement. Rows left unread after ``fetchone`` are drained before the
+    next statement so the connection never has a pending result. Dynamic SQL
+    (see ``is_dynamic``) runs on a one-off cursor, closed once the next
+    statement starts.
+    """
+
+    def __init__(self, cache):
+        self.__cache = cache
+        self.__current = None
+        self.__partial = False
+        self.__one_off = False
+
+    def __drain(self):
+        if self.__partial:
+            self.__partial = False
+            try:
+                self.__current.fetchall()
+            except Exception:
+                pass
+        if self.__one_off:
+            self.__one_off = False
+            StatementCache.close_cursor(self.__current)
+
+    def __select(self, query):
+        self.__drain()
+        if is_dynamic(query):
+            self.__current = self.__cache.one_off()
+            self.__one_off = True
+        else:
+            self.__current = self.__cache.get(query)
+        return self.__current
+
+    def execute(self, query, values=None):
+        return self.__select(query).execute(query, values or ())
+
+    def executemany(self, query, seq_values):
+        return self.__select(query).executemany(query, seq_values)
+
+    def fetchone(self):
+        self.__partial = True
+        return self.__current.fetchone()
+
+    def fetchmany(self, size=None):
+        self.__partial = True
+        if size is None:
+            return self.__current.fetchmany()
+        return self.__current.fetchmany(size)
+
+    def fetchall(self):
+        self.__partial = False
+        return self.__current.fetchall()
+
+    @property
+    def rowcount(self):
+        return self.__current.rowcount if self.__current is not None else -1
+
+    @property
+    def lastrowid(self):
+        return self.__current.lastrowid if self.__current is not None else None
+
+    @property
+    def description(self):
+        return self.__current.description if self.__current is not None else None
+
+    def close(self):
+        # The prepared cursors stay in the cache for the next caller
+        self.__drain()
+        self.__current = None
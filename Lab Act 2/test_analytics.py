@@ -0,0 +1,92 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+# Import the analytics module (needs NumPy)
+from analytics import DonationAnalytics, np
+from test_backends import make_sqlite_db
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestDonationAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database and an empty cache directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = make_sqlite_db(migrate=True)
+        self.analytics = DonationAnalytics(self.db, self.directory.name)
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+        self.directory.cleanup()
+
+    def donate(self, user_id, amount, at):
+        self.db.execute("INSERT INTO donations (user_id, campaign_id, amount, donation_date) VALUES (%s, %s, %s, %s)",
+                        (user_id, 2, amount, at))
+
+    def test_metrics_match_sample_donations(self):
+        """Test daily totals, gift sizes, retention and goal progress over the sample ledger"""
+        print("\n🧪 TEST: Donation Analytics - Metrics")
+
+        self.analytics.refresh()
+        self.donate(6, 50.00, "2025-04-02 10:00:00")
+        self.donate(9, 5.00, "2025-04-03 10:00:00")
+        added = self.analytics.refresh()
+
+        daily = self.analytics.totals_by_period("day", organization_id=8)
+        histogram = {row[0]: row[2] for row in self.analytics.gift_histogram(organization_id=8)}
+        retention = self.analytics.donor_retention()
+        progress = self.analytics.goal_progress(8)
+
+        print(f"Daily: {daily}\nRetention: {retention}\nProgress: {progress}")
+        self.assertEqual(added, 2)
+        self.assertEqual(daily[0][1:], (Decimal("9111.00"), 4))
+        self.assertEqual(sum(row[2] for row in daily), 8)
+        self.assertEqual(histogram[Decimal("1000.00")], 4)
+        self.assertEqual(histogram[Decimal("0.00")], 1)
+        self.assertEqual(retention[-1][1:], (2, 1, 1, 1.0))
+        self.assertEqual(progress[0][3], Decimal("9397.00"))
+        self.assertEqual(progress[0][5], 2)
+
+    def test_refresh_is_incremental_and_survives_restart(self):
+        """Test only new donations are extracted and unrecorded bytes are cut off on reopen"""
+        print("\n🧪 TEST: Donation Analytics - Incremental Cache")
+
+        first = self.analytics.refresh()
+        again = self.analytics.refresh()
+        self.donate(9, 12.50, "2025-04-01 09:00:00")
+        # A refresh that crashed before writing the manifest leaves extra bytes behind
+        with open(os.path.join(self.directory.name, "amount_cents.bin"), "ab") as column:
+            column.write(b"\0" * 8)
+
+        reopened = DonationAnalytics(self.db, self.directory.name)
+        added = reopened.refresh()
+        amounts = reopened.columns.columns()["amount_cents"]
+
+        print(f"First: {first}, again: {again}, after restart: {added}, rows: {len(reopened.columns)}")
+        self.assertEqual((first, again, added), (6, 0, 1))
+        self.assertEqual(len(amounts), 7)
+        self.assertEqual(int(amounts[-1]), 1250)
+
+    def test_refresh_waits_for_late_commits(self):
+        """Test a donation that commits after a higher donation_id is still copied"""
+        print("\n🧪 TEST: Donation Analytics - Late Commits")
+
+        self.analytics.refresh()
+        top = self.analytics.columns.last_donation_id
+        insert = ("INSERT INTO donations (donation_id, user_id, campaign_id, amount, donation_date) "
+                  "VALUES (%s, %s, %s, %s, NOW())")
+        self.db.execute(insert, (top + 2, 9, 2, 3.00))
+        early = self.analytics.refresh()
+        self.db.execute(insert, (top + 1, 9, 2, 4.00))
+        late = self.analytics.refresh()
+        ids = self.analytics.columns.columns()["donation_id"]
+
+        print(f"Refreshed: {early}, {late}; last ids: {list(ids[-2:])}")
+        self.assertEqual((early, late), (0, 2))
+        self.assertEqual([int(donation_id) for donation_id in ids[-2:]], [top + 1, top + 2])
+
+if __name__ == "__main__":
+    unittest.main()
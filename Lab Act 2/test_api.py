@@ -0,0 +1,189 @@
+import unittest
+import http.client
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from contextlib import redirect_stdout
+
+# Import the HTTP front-end
+from api import make_server
+from cache import TTLCache
+from test_backends import make_sqlite_db
+
+class TestApi(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Serve a migrated embedded database on a free port"""
+        cls.db = make_sqlite_db(migrate=True)
+        cls.server = make_server(cls.db, TTLCache(ttl=60), port=0, workers=4)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def request(self, method, path, body=None, token=None):
+        """Helper method to call the API and decode the JSON response"""
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"}
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with redirect_stdout(io.StringIO()), urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def login(self, email="nil"):
+        """Helper method to log in as user 6 (or another user) and return the session token"""
+        _, login = self.request("POST", "/login", {"email": email, "password": "123"})
+        return login["token"]
+
+    def test_login_and_browse(self):
+        """Test login returns the user and campaigns are listed as objects"""
+        print("\n🧪 TEST: API - Login and Browse")
+
+        status, login = self.request("POST", "/login", {"email": "nil", "password": "123"})
+        _, campaigns = self.request("GET", "/campaigns")
+        bad_status, bad_login = self.request("POST", "/login", {"email": "nil", "password": "wrong"})
+
+        print(f"Login: {status} {login}")
+        print(f"Campaign titles: {[campaign['title'] for campaign in campaigns['items']]}")
+        self.assertEqual(status, 200)
+        self.assertEqual(login["user"]["user_id"], 6)
+        self.assertTrue(login["token"])
+        self.assertTrue(all("funds_raised" in campaign for campaign in campaigns["items"]))
+        self.assertEqual(bad_status, 401)
+
+    def test_donate_then_history(self):
+        """Test a donation shows up first in the paged history"""
+        print("\n🧪 TEST: API - Donate and History")
+
+        token = self.login()
+        status, result = self.request("POST", "/donations", {"campaign_id": 2, "amount": "12.50"}, token)
+        _, history = self.request("GET", "/users/6/donations?page_size=1", token=token)
+        _, next_page = self.request(
+            "GET", f"/users/6/donations?page_size=1&after_date={history['next']['after_date']}"
+                   f"&after_id={history['next']['after_id']}", token=token)
+
+        print(f"Donation: {status} {result}")
+        print(f"History: {history}")
+        self.assertEqual(status, 201)
+        self.assertEqual(history["items"][0]["amount"], "12.5")
+        self.assertNotEqual(next_page["items"][0]["donation_id"], history["items"][0]["donation_id"])
+
+    def test_errors(self):
+        """Test unknown routes, invalid amounts and rejected donations"""
+        print("\n🧪 TEST: API - Error Responses")
+
+        token = self.login()
+        missing, _ = self.request("GET", "/nope")
+        invalid, invalid_body = self.request("POST", "/donations", {"campaign_id": 2, "amount": -1}, token)
+        rejected, rejected_body = self.request("POST", "/donations", {"campaign_id": 999, "amount": 1}, token)
+        bad_inputs = [
+            self.request("POST", "/donations", {"campaign_id": 2, "amount": "NaN"}, token)[0],
+            self.request("POST", "/donations", {"campaign_id": 2, "amount": "Infinity"}, token)[0],
+            self.request("POST", "/donations", {"campaign_id": 2, "amount": "0.001"}, token)[0],
+            self.request("POST", "/donations", {"campaign_id": "two", "amount": 1}, token)[0],
+            self.request("GET", "/users/6/donations?page_size=abc", token=token)[0],
+        ]
+        empty_page, empty_body = self.request("GET", "/users/6/donations?page_size=0", token=token)
+        negative_page, _ = self.request("GET", "/events/1/volunteers?page_size=-5")
+
+        print(f"Statuses: {missing}, {invalid}, {rejected}, {bad_inputs}, {empty_page}, {negative_page}")
+        self.assertEqual(missing, 404)
+        self.assertEqual(invalid, 400)
+        self.assertEqual(invalid_body["error"], "amount must be positive")
+        self.assertEqual(rejected, 409)
+        self.assertIn("does not exist", rejected_body["error"])
+        self.assertEqual(bad_inputs, [400] * len(bad_inputs))
+        self.assertEqual((empty_page, negative_page), (200, 200))
+        self.assertEqual(len(empty_body["items"]), 1)
+
+    def test_routes_act_as_the_logged_in_user(self):
+        """Test user routes need a session token and only reach the token's own user"""
+        print("\n🧪 TEST: API - Session Tokens")
+
+        token = self.login()
+        anonymous, _ = self.request("POST", "/donations", {"user_id": 9, "campaign_id": 2, "amount": 1})
+        forged, _ = self.request("GET", "/users/6/balance", token="not-a-token")
+        other_balance, _ = self.request("GET", "/users/9/balance", token=token)
+        other_opt_out, _ = self.request("DELETE", "/events/1/volunteers/9", token=token)
+        own_status, own_balance = self.request("GET", "/users/6/balance", token=token)
+        before_9 = self.db.fetch_one("SELECT balance FROM users WHERE user_id = 9")[0]
+        donated, _ = self.request("POST", "/donations", {"user_id": 9, "campaign_id": 2, "amount": 1}, token)
+        after_9 = self.db.fetch_one("SELECT balance FROM users WHERE user_id = 9")[0]
+        self.request("POST", "/logout", token=token)
+        logged_out, _ = self.request("GET", "/users/6/balance", token=token)
+
+        print(f"Statuses: {anonymous}, {forged}, {other_balance}, {other_opt_out}, {own_status}, {logged_out}")
+        self.assertEqual((anonymous, forged, logged_out), (401, 401, 401))
+        self.assertEqual((other_balance, other_opt_out), (403, 403))
+        self.assertEqual(own_status, 200)
+        self.assertEqual(own_balance["user_id"], 6)
+        self.assertEqual(donated, 201)
+        self.assertEqual(after_9, before_9)
+
+    def test_content_length_limits(self):
+        """Test negative and oversized Content-Length headers are refused without reading the body"""
+        print("\n🧪 TEST: API - Content-Length Limits")
+
+        statuses = []
+        for length in ("-1", str(10 ** 9)):
+            connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+            try:
+                connection.putrequest("POST", "/login")
+                connection.putheader("Content-Length", length)
+                connection.endheaders()
+                response = connection.getresponse()
+                statuses.append((response.status, response.getheader("Connection")))
+            finally:
+                connection.close()
+
+        print(f"Statuses: {statuses}")
+        self.assertEqual(statuses, [(400, "close"), (413, "close")])
+
+    def test_internal_errors_are_not_leaked(self):
+        """Test a 500 response hides the exception and the server logs it"""
+        print("\n🧪 TEST: API - Internal Errors")
+
+        service = self.server.RequestHandlerClass.service
+
+        def failing_dispatch(*args):
+            raise RuntimeError("SELECT password FROM users")
+
+        service.dispatch = failing_dispatch
+        try:
+            with self.assertLogs("donations.api", level="ERROR") as logs:
+                status, body = self.request("GET", "/stats")
+        finally:
+            del service.dispatch
+
+        print(f"Status: {status}, body: {body}")
+        self.assertEqual((status, body), (500, {"error": "Internal error"}))
+        self.assertIn("SELECT password FROM users", "\n".join(logs.output))
+
+    def test_only_organizations_create(self):
+        """Test donors get 403 on campaign and event creation while organizations succeed"""
+        print("\n🧪 TEST: API - Organization Routes")
+
+        campaign = {"title": "Roof", "description": "Fix it", "goal_amount": "500.00", "deadline": "2099-01-01"}
+        event = {"title": "Cleanup", "description": "Beach", "date": "2099-01-01", "location": "Cebu"}
+        donor, organization = self.login(), self.login("yes")
+        donor_statuses = (self.request("POST", "/campaigns", campaign, donor)[0],
+                          self.request("POST", "/events", event, donor)[0])
+        organization_statuses = (self.request("POST", "/campaigns", campaign, organization)[0],
+                                 self.request("POST", "/events", event, organization)[0])
+
+        print(f"Donor: {donor_statuses}, organization: {organization_statuses}")
+        self.assertEqual(donor_statuses, (403, 403))
+        self.assertEqual(organization_statuses, (201, 201))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import asyncio
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+# Import the asyncio database layer and services
+from async_database import AsyncDatabase
+from async_services import AsyncDonation, donor_dashboard
+from backends import SQLiteBackend
+from test_backends import make_sqlite_db
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Set up a migrated SQLite file shared by a small async pool"""
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "async.db")
+        make_sqlite_db(path, migrate=True).close()
+        with redirect_stdout(io.StringIO()):
+            self.db = await AsyncDatabase(pool_size=3, backend=SQLiteBackend(path)).open()
+
+    async def asyncTearDown(self):
+        with redirect_stdout(io.StringIO()):
+            await self.db.close()
+        self.directory.cleanup()
+
+    async def test_fetch_and_transaction_rollback(self):
+        """Test queries run off the loop and failed transactions roll back"""
+        print("\n🧪 TEST: AsyncDatabase - Fetch and Rollback")
+
+        user = await self.db.fetch_one("SELECT name FROM users WHERE user_id = %s", (6,))
+        with self.assertRaises(RuntimeError):
+            async with self.db.transaction() as cursor:
+                await cursor.execute("UPDATE users SET balance = 0 WHERE user_id = %s", (6,))
+                raise RuntimeError("abort")
+        balance = await self.db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (6,))
+
+        print(f"User: {user}, balance after rollback: {balance}")
+        self.assertEqual(user[0], "nil")
+        self.assertEqual(float(balance[0]), 3316.00)
+
+    async def test_donor_dashboard_gathers_queries(self):
+        """Test the dashboard combines the concurrent queries of one donor"""
+        print("\n🧪 TEST: AsyncDatabase - Donor Dashboard")
+
+        ok, message = await AsyncDonation(self.db).donate_with_payment(6, 2, 16.0)
+        dashboard = await donor_dashboard(self.db, 6, history_size=3)
+
+        print(f"Donation: {ok}, '{message}'")
+        print(f"Balance: {dashboard['balance']}, recent: {dashboard['recent_donations']}")
+        self.assertTrue(ok)
+        self.assertEqual(float(dashboard["balance"]), 3300.00)
+        self.assertEqual(len(dashboard["recent_donations"]), 3)
+        self.assertEqual(dashboard["recent_donations"][0][1], 16)
+        self.assertTrue(dashboard["campaigns"])
+
+    async def test_donate_with_payment_insufficient_balance(self):
+        """Test an async donation above the balance is rejected with no writes"""
+        print("\n🧪 TEST: AsyncDatabase - Insufficient Balance")
+
+        before = await self.db.fetch_one("SELECT COUNT(*) FROM donations")
+        ok, message = await AsyncDonation(self.db).donate_with_payment(6, 2, 1000000.0)
+        after = await self.db.fetch_one("SELECT COUNT(*) FROM donations")
+
+        print(f"Result: {ok}, '{message}'")
+        self.assertFalse(ok)
+        self.assertEqual(message, "Insufficient balance! Please add funds.")
+        self.assertEqual(before, after)
+
+    async def test_transaction_is_not_starved_by_waiting_fetches(self):
+        """Test fetches queued behind a transaction on a one-connection pool don't deadlock it"""
+        print("\n🧪 TEST: AsyncDatabase - Transaction Beside Waiting Fetches")
+
+        path = os.path.join(self.directory.name, "async.db")
+        with redirect_stdout(io.StringIO()):
+            db = await AsyncDatabase(pool_size=1, backend=SQLiteBackend(path)).open()
+        try:
+            query = "SELECT balance FROM users WHERE user_id = %s"
+            results = await asyncio.wait_for(asyncio.gather(
+                AsyncDonation(db).donate_with_payment(6, 2, 16.0), db.fetch(query, (6,)), db.fetch(query, (6,))),
+                timeout=10)
+        finally:
+            with redirect_stdout(io.StringIO()):
+                await db.close()
+
+        print(f"Results: {results}")
+        self.assertTrue(results[0][0])
+        self.assertEqual(len(results[1]), 1)
+        self.assertEqual(len(results[2]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
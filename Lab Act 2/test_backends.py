@@ -0,0 +1,128 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+# Import the Database class and the embedded backend
+from database import Database
+from backends import SQLiteBackend, translate_insert, translate_to_sqlite
+from donation import Donation
+from event import Event
+from user import User
+from migrations import MigrationRunner
+
+def make_sqlite_db(path=":memory:", migrate=False, **kwargs):
+    """Build a Database on the embedded SQLite backend without the connect banner"""
+    with redirect_stdout(io.StringIO()):
+        db = Database(backend=SQLiteBackend(path), **kwargs)
+        if migrate:
+            MigrationRunner(db).migrate()
+    return db
+
+class TestSQLiteBackend(unittest.TestCase):
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def test_translate_mysql_syntax(self):
+        """Test placeholders, NOW() and GROUP_CONCAT are rewritten for SQLite"""
+        print("\n🧪 TEST: SQLite Backend - Query Translation")
+
+        query = "SELECT GROUP_CONCAT(u.name SEPARATOR ', ') FROM users u WHERE u.user_id = %s AND NOW() > 0"
+        translated = translate_to_sqlite(query)
+
+        print(f"Actual translation: '{translated}'")
+        self.assertIn("GROUP_CONCAT(u.name, ', ')", translated)
+        self.assertIn("u.user_id = ?", translated)
+        self.assertIn("datetime('now', 'localtime')", translated)
+
+    def test_schema_loaded_from_dumps(self):
+        """Test the tables and sample rows from Database/*.sql are available"""
+        print("\n🧪 TEST: SQLite Backend - Schema From Dumps")
+
+        db = make_sqlite_db()
+        users = db.fetch("SELECT user_id, name FROM users ORDER BY user_id")
+        donations = db.fetch_one("SELECT COUNT(*) FROM donations")
+
+        print(f"Users: {users}")
+        print(f"Donation rows: {donations[0]}")
+        self.assertEqual([row[0] for row in users], [1, 6, 8, 9])
+        self.assertEqual(donations[0], 6)
+
+    def test_domain_classes_run_unchanged(self):
+        """Test User, Donation and Event work against the embedded engine"""
+        print("\n🧪 TEST: SQLite Backend - Domain Classes")
+
+        db = make_sqlite_db(migrate=True)
+        logged_in = User(db).login("nil", "123")
+        _, donated = self.capture_output(Donation(db).donate_with_payment, 6, 2, 25.0)
+        output, _ = self.capture_output(Event(db).view_my_events, 8)
+        balance = db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (6,))[0]
+
+        print(f"Login result: {logged_in}")
+        print(f"Balance after donation: {balance}")
+        self.assertEqual(logged_in[0][0], 6)
+        self.assertTrue(donated)
+        self.assertEqual(float(balance), 3316.00 - 25.0)
+        # Migration 2 collapsed the duplicated signups of user 6
+        self.assertIn("Volunteers: nil\n", output)
+
+    def test_decimals_stored_exactly(self):
+        """Test Decimal amounts round-trip without going through a binary float"""
+        print("\n🧪 TEST: SQLite Backend - Exact Decimals")
+
+        db = make_sqlite_db()
+        amounts = [Decimal("0.10") + Decimal("0.20"), Decimal("99999999.99")]
+        balances = []
+        for amount in amounts:
+            db.execute("UPDATE users SET balance = %s WHERE user_id = %s", (amount, 6))
+            balances.append(db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (6,))[0])
+        greatest = db.fetch_one("SELECT GREATEST(balance, %s) FROM users WHERE user_id = %s", (Decimal("5.00"), 6))[0]
+
+        print(f"Balances: {balances}, greatest: {greatest}")
+        self.assertEqual(balances, amounts)
+        self.assertEqual(Decimal(str(greatest)), amounts[-1])
+
+    def test_dump_escapes_restored(self):
+        """Test dumped string escapes load as the characters they stand for"""
+        print("\n🧪 TEST: SQLite Backend - Dump Escapes")
+
+        db = make_sqlite_db()
+        statement = ("INSERT INTO `users` (`user_id`, `name`, `email`, `password`, `role`) "
+                     "VALUES (42,'O\\'Neil','line\\none\\r\\ntwo\\0end\\\\','pw','donor');")
+        with db.connection() as connection:
+            connection.execute(translate_insert(statement))
+        name, email = db.fetch_one("SELECT name, email FROM users WHERE user_id = %s", (42,))
+
+        print(f"Name: {name!r}, email: {email!r}")
+        self.assertEqual(name, "O'Neil")
+        self.assertEqual(email, "line\none\r\ntwo\0end\\")
+
+    def test_file_mode_persists_and_pools(self):
+        """Test a file database keeps its rows across Database instances"""
+        print("\n🧪 TEST: SQLite Backend - File Mode")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "donations.db")
+            db = make_sqlite_db(path, pool_size=3)
+            db.execute("UPDATE users SET balance = %s WHERE user_id = %s", (42, 1))
+            pool_size = db.pool_stats()["pool_size"]
+            with redirect_stdout(io.StringIO()):
+                db.close()
+
+            reopened = make_sqlite_db(path)
+            balance = reopened.fetch_one("SELECT balance FROM users WHERE user_id = %s", (1,))[0]
+            with redirect_stdout(io.StringIO()):
+                reopened.close()
+
+        print(f"Pool size: {pool_size}, balance after reopen: {balance}")
+        self.assertEqual(pool_size, 3)
+        self.assertEqual(float(balance), 42)
+
+if __name__ == "__main__":
+    unittest.main()
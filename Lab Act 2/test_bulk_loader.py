@@ -0,0 +1,121 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+# Import the bulk loader and the backends it loads into
+from backends import SCHEMA_DIR, SQLiteBackend
+from bulk_loader import export, load, read_rows
+from database import Database
+from migrations import MigrationRunner
+from test_backends import make_sqlite_db
+
+TABLES = ["campaigns", "donations", "event_volunteers", "events", "users"]
+
+def make_empty_db():
+    """A SQLite database with the dumped tables but none of their rows"""
+    with redirect_stdout(io.StringIO()):
+        return Database(backend=SQLiteBackend(load_data=False))
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self):
+        """Set up the sample database, an empty one and a scratch directory"""
+        self.db = make_sqlite_db()
+        self.empty_db = make_empty_db()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+            self.empty_db.close()
+        self.directory.cleanup()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def table_rows(self, db):
+        return {table: db.fetch(f"SELECT * FROM `{table}` ORDER BY 1") for table in TABLES}
+
+    def test_parser_handles_escapes_across_buffers(self):
+        """Test quoted values with escapes, separators and NULLs parse the same at any buffer size"""
+        print("\n🧪 TEST: Bulk Loader - Streaming Dump Parser")
+
+        path = os.path.join(self.directory.name, "tricky.sql")
+        with open(path, "w", encoding="utf-8") as dump:
+            dump.write("-- comment\nCREATE TABLE `t` (\n  `a` int,\n  `b` text\n);\n"
+                       "INSERT INTO `t` VALUES (1,'it\\'s, (fine);'),(2,NULL),(3,'line\\nbreak \\\\ ''q''');\n"
+                       "INSERT INTO `t` (`a`, `b`) VALUES (-4.5,'');\n")
+
+        expected = [("t", None, ("1", "it's, (fine);")), ("t", None, ("2", None)),
+                    ("t", None, ("3", "line\nbreak \\ 'q'")), ("t", ("a", "b"), ("-4.5", ""))]
+        results = {size: list(read_rows(path, chunk_size=size)) for size in (1, 7, 1 << 20)}
+
+        print(f"Rows: {results[1 << 20]}")
+        for rows in results.values():
+            self.assertEqual(rows, expected)
+
+    def test_restores_the_dumps_into_an_empty_database(self):
+        """Test loading Database/*.sql recreates the tables with the sample rows"""
+        print("\n🧪 TEST: Bulk Loader - Restore Dumps")
+
+        paths = sorted(os.path.join(SCHEMA_DIR, name) for name in os.listdir(SCHEMA_DIR))
+        report = load(self.empty_db, paths, workers=3, batch_size=2)
+
+        print(f"Loaded {report['rows']} rows at {report['rows_per_sec']:,.0f} rows/sec")
+        self.assertEqual(self.table_rows(self.empty_db), self.table_rows(self.db))
+        self.assertEqual(self.empty_db.fetch("PRAGMA foreign_key_check"), [])
+        self.assertEqual(self.empty_db.fetch_one("PRAGMA foreign_keys")[0], 1)
+
+    def test_migrated_database_keeps_its_schema_and_summaries(self):
+        """Test dumps load as data only into a migrated database and the summaries are rebuilt"""
+        print("\n🧪 TEST: Bulk Loader - Migrated Database")
+
+        self.capture_output(MigrationRunner(self.empty_db).migrate)
+        indexes = "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        before = self.empty_db.fetch(indexes)
+        # The sample signups hold duplicates that the migrated unique index rejects
+        paths = sorted(os.path.join(SCHEMA_DIR, name) for name in os.listdir(SCHEMA_DIR) if "volunteers" not in name)
+        output, report = self.capture_output(load, self.empty_db, paths, workers=3)
+        with self.assertRaises(ValueError):
+            load(self.empty_db, paths, schema=True)
+        stats = self.empty_db.fetch_one("SELECT total_amount FROM campaign_stats WHERE campaign_id = %s", (2,))
+        rollup = self.empty_db.fetch_one("SELECT SUM(total_amount) FROM donation_rollups_monthly WHERE campaign_id = %s",
+                                         (2,))
+
+        print(f"Loaded {report['rows']} rows; campaign 2 stats {stats[0]}, rollups {rollup[0]}")
+        self.assertIn("loading data only", output)
+        self.assertEqual(self.empty_db.fetch(indexes), before)
+        self.assertIn(("uq_event_volunteers_user_event",), before)
+        # Migration 10 added acknowledged_at, which the dump doesn't have
+        loaded = self.table_rows(self.empty_db)["donations"]
+        self.assertEqual([row[:-1] for row in loaded], self.table_rows(self.db)["donations"])
+        self.assertEqual({row[-1] for row in loaded}, {None})
+        self.assertEqual(float(stats[0]), 9342.0)
+        self.assertEqual(float(rollup[0]), 9342.0)
+
+    def test_export_round_trips_in_both_formats(self):
+        """Test exported CSV and SQL chunks load back into identical tables"""
+        print("\n🧪 TEST: Bulk Loader - Export Round Trip")
+
+        for fmt in ("csv", "sql"):
+            directory = os.path.join(self.directory.name, fmt)
+            exported = export(self.db, directory, TABLES, fmt, chunk_rows=2, rows_per_statement=1)
+            target = make_empty_db()
+            try:
+                paths = [path for result in exported["results"] for path in result["files"]]
+                loaded = load(target, paths, workers=2)
+
+                print(f"{fmt}: {exported['rows']} rows to {len(paths)} files, {loaded['rows']} loaded")
+                self.assertEqual(loaded["rows"], exported["rows"])
+                self.assertEqual(self.table_rows(target), self.table_rows(self.db))
+            finally:
+                with redirect_stdout(io.StringIO()):
+                    target.close()
+
+if __name__ == '__main__':
+    unittest.main()
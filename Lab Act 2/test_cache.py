@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch
+import io
+from contextlib import redirect_stdout
+
+# Import the cache and the classes that use it
+from cache import TTLCache, ACTIVE_CAMPAIGNS
+from campaign import Campaign
+from donation import Donation
+from test_backends import make_sqlite_db
+
+class CountingDatabase:
+    """Database wrapper that counts fetch calls"""
+
+    def __init__(self, db):
+        self.db = db
+        self.fetches = 0
+
+    def fetch(self, query, values=None):
+        self.fetches += 1
+        return self.db.fetch(query, values)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+class TestTTLCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        """Test hit/miss counters and read-through loading"""
+        print("\n🧪 TEST: TTL Cache - Hits and Misses")
+
+        cache = TTLCache(ttl=60)
+        loads = []
+        for _ in range(3):
+            cache.get_or_load("key", lambda: loads.append(1) or [1, 2])
+        stats = cache.stats()
+
+        print(f"Actual stats: {stats}")
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_entries_expire(self):
+        """Test entries are reloaded once their TTL has passed"""
+        print("\n🧪 TEST: TTL Cache - Expiry")
+
+        cache = TTLCache(ttl=10)
+        with patch("cache.time.monotonic", return_value=100.0):
+            cache.set("key", "value")
+        with patch("cache.time.monotonic", return_value=111.0):
+            found, _ = cache.get("key")
+
+        print(f"Found after TTL: {found}")
+        self.assertFalse(found)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_bounded_by_entries_and_rows(self):
+        """Test least recently used entries are evicted when limits are hit"""
+        print("\n🧪 TEST: TTL Cache - LRU Eviction")
+
+        cache = TTLCache(max_entries=2, max_rows=5)
+        cache.set("a", [1, 2])
+        cache.set("b", [3])
+        cache.get("a")
+        cache.set("c", [4])
+        evicted_by_count = not cache.get("b")[0]
+        cache.set("d", [5, 6, 7])
+        stats = cache.stats()
+
+        print(f"Actual stats: {stats}")
+        self.assertTrue(evicted_by_count)
+        self.assertLessEqual(stats["rows"], 5)
+        self.assertLessEqual(stats["entries"], 2)
+        self.assertTrue(cache.get("d")[0])
+
+class TestCampaignCache(unittest.TestCase):
+    def test_listing_served_from_cache_until_donation(self):
+        """Test donations and new campaigns invalidate the active listing"""
+        print("\n🧪 TEST: Campaign Cache - Invalidation on Writes")
+
+        db = CountingDatabase(make_sqlite_db(migrate=True))
+        cache = TTLCache(ttl=60)
+        campaign = Campaign(db, cache)
+        donation = Donation(db, cache)
+
+        with redirect_stdout(io.StringIO()):
+            campaign.view_active_campaigns()
+            campaign.view_active_campaigns()
+            fetches_while_cached = db.fetches
+            donation.donate_with_payment(6, 2, 10.0)
+            invalidated = not cache.get(ACTIVE_CAMPAIGNS)[0]
+            campaign.view_active_campaigns()
+            campaign.create_campaign(8, "New", "Fresh campaign", 500, "2099-01-01")
+            output = io.StringIO()
+        with redirect_stdout(output):
+            campaign.view_active_campaigns()
+
+        print(f"Fetches while cached: {fetches_while_cached}")
+        print(f"Cache stats: {cache.stats()}")
+        self.assertEqual(fetches_while_cached, 1)
+        self.assertTrue(invalidated)
+        self.assertIn("Title: New", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
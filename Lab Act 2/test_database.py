@@ -0,0 +1,162 @@
+import unittest
+from unittest.mock import patch
+import io
+import threading
+import time
+from contextlib import redirect_stdout
+
+# Import the Database class
+from database import Database
+
+class FakeCursor:
+    """Fake cursor that records the statements it runs"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lastrowid = None
+
+    def execute(self, query, values=None):
+        self.connection.queries.append((query, values))
+        if self.connection.delay:
+            time.sleep(self.connection.delay)
+        self.lastrowid = len(self.connection.queries)
+
+    def fetchall(self):
+        return [(self.connection.connection_id,)]
+
+    def fetchone(self):
+        return (self.connection.connection_id,)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """Fake MySQL connection to exercise the pool without a server"""
+
+    created = 0
+
+    def __init__(self, delay=0):
+        FakeConnection.created += 1
+        self.connection_id = FakeConnection.created
+        self.queries = []
+        self.delay = delay
+        self.alive = True
+        self.commits = 0
+
+    def is_connected(self):
+        return self.alive
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.alive = False
+
+class TestDatabasePool(unittest.TestCase):
+    def make_db(self, delay=0, **kwargs):
+        """Helper method to build a pooled Database on top of fake connections"""
+        FakeConnection.created = 0
+        with patch("backends.mysql.connector.connect", side_effect=lambda **_: FakeConnection(delay)), \
+                redirect_stdout(io.StringIO()):
+            db = Database(**kwargs)
+        return db
+
+    def test_pool_is_prewarmed(self):
+        """Test that all pooled connections are opened up front"""
+        print("\n🧪 TEST: Database Pool - Pre-warmed Connections")
+
+        db = self.make_db(pool_size=4)
+        stats = db.pool_stats()
+
+        print(f"Expected idle connections: 4")
+        print(f"Actual idle connections: {stats['idle']}")
+        self.assertEqual(FakeConnection.created, 4)
+        self.assertEqual(stats["idle"], 4)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_api_returns_connection_to_pool(self):
+        """Test that execute/fetch/fetch_one check connections back in"""
+        print("\n🧪 TEST: Database Pool - Checkout and Return")
+
+        db = self.make_db(pool_size=2)
+        last_id = db.execute("UPDATE users SET balance = balance + %s WHERE user_id = %s", (5, 1))
+        rows = db.fetch("SELECT balance FROM users WHERE user_id = %s", (1,))
+        row = db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (1,))
+        stats = db.pool_stats()
+
+        print(f"Actual stats: {stats}")
+        self.assertEqual(last_id, 1)
+        self.assertEqual(len(rows), 1)
+        self.assertIsNotNone(row)
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["idle"], 2)
+
+    def test_concurrent_threads_share_database(self):
+        """Test that worker threads never share a connection and waits are measured"""
+        print("\n🧪 TEST: Database Pool - Concurrent Threads")
+
+        db = self.make_db(delay=0.02, pool_size=2)
+        in_use = set()
+        overlap = []
+        lock = threading.Lock()
+
+        def worker():
+            with db.connection() as connection:
+                with lock:
+                    if connection.connection_id in in_use:
+                        overlap.append(connection.connection_id)
+                    in_use.add(connection.connection_id)
+                connection.cursor().execute("SELECT 1")
+                with lock:
+                    in_use.discard(connection.connection_id)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = db.pool_stats()
+
+        print(f"Connections used concurrently by two threads: {overlap}")
+        print(f"Pool waits: {stats['waits']}, max wait: {stats['max_wait']:.3f}s")
+        self.assertEqual(overlap, [])
+        self.assertEqual(stats["checkouts"], 8)
+        self.assertGreater(stats["waits"], 0)
+        self.assertEqual(stats["idle"], 2)
+
+    def test_dead_connection_is_replaced(self):
+        """Test that the health check reconnects stale connections on checkout"""
+        print("\n🧪 TEST: Database Pool - Health Check on Checkout")
+
+        db = self.make_db(pool_size=1, health_check_interval=0)
+        with db.connection() as connection:
+            connection.alive = False
+
+        with patch("backends.mysql.connector.connect", side_effect=lambda **_: FakeConnection()):
+            with db.connection() as connection:
+                replaced = connection.alive
+        stats = db.pool_stats()
+
+        print(f"Reconnects: {stats['reconnects']}")
+        self.assertTrue(replaced)
+        self.assertEqual(stats["reconnects"], 1)
+
+    def test_closed_pool_reports_error(self):
+        """Test that using a closed Database prints an error instead of raising"""
+        print("\n🧪 TEST: Database Pool - Closed Pool")
+
+        db = self.make_db(pool_size=1)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            db.close()
+            result = db.fetch("SELECT 1")
+
+        print(f"Actual output: '{output.getvalue().strip()}'")
+        self.assertEqual(result, [])
+        self.assertIn("Connection pool is not initialized.", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+import unittest
+import io
+from contextlib import contextmanager, redirect_stdout
+
+# Import the Donation class
+from donation import Donation
+from campaign_stats import CampaignStats
+from test_backends import make_sqlite_db
+
+class MockCursor:
+    """Mock cursor that records statements and answers campaign lookups"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.lastrowid = 0
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.db.executed_queries.append(query)
+        self.db.executed_params.append(params)
+        self.rowcount = 1
+        self.rows = []
+        if "FROM campaigns WHERE campaign_id IN" in query:
+            self.rows = [(campaign_id,) for campaign_id in params if campaign_id in self.db.campaign_ids]
+        elif query.startswith("UPDATE users SET balance = balance -"):
+            amount, user_id, _ = params
+            self.rowcount = 1 if self.db.balances.get(user_id, 0) >= amount else 0
+        elif query.startswith("UPDATE campaigns"):
+            self.rowcount = 1 if params[1] in self.db.campaign_ids else 0
+
+    def executemany(self, query, seq_params):
+        for params in seq_params:
+            self.execute(query, params)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+class MockDatabase:
+    """Mock Database class to simulate transactional database interactions"""
+
+    def __init__(self, campaign_ids=(), balances=None):
+        self.executed_queries = []
+        self.executed_params = []
+        self.campaign_ids = set(campaign_ids)
+        self.balances = balances or {}
+        self.commits = 0
+        self.rollbacks = 0
+
+    @contextmanager
+    def transaction(self):
+        try:
+            yield MockCursor(self)
+            self.commits += 1
+        except Exception:
+            self.rollbacks += 1
+            raise
+
+class TestDonation(unittest.TestCase):
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def test_donate_many_success(self):
+        """Test bulk donations are inserted and aggregated per campaign"""
+        print("\n🧪 TEST: Donate Many - Success Case")
+
+        mock_db = MockDatabase(campaign_ids=[1, 2])
+        donation = Donation(mock_db)
+        batch = [(6, 1, 10.00), (6, 1, 15.50), (9, 2, 20.00)]
+
+        output, results = self.capture_output(donation.donate_many, batch, batch_size=2)
+
+        inserts = [q for q in mock_db.executed_queries if q.startswith("INSERT INTO donations")]
+        updates = [p for q, p in zip(mock_db.executed_queries, mock_db.executed_params)
+                   if q.startswith("UPDATE campaigns")]
+        print(f"Actual output: '{output.strip()}'")
+        print(f"Statuses: {[row['status'] for row in results]}")
+        print(f"Multi-row INSERTs: {len(inserts)}, funds_raised updates: {updates}")
+
+        self.assertEqual([row["status"] for row in results], ["ok", "ok", "ok"])
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(sorted((campaign_id, str(total)) for total, campaign_id in updates),
+                         [(1, "25.5"), (2, "20.0")])
+        self.assertEqual(mock_db.commits, 1)
+        self.assertIn("✅ Recorded 3 of 3 donations.", output)
+
+    def test_donate_many_reports_invalid_rows(self):
+        """Test unknown campaigns and bad amounts are rejected per row"""
+        print("\n🧪 TEST: Donate Many - Invalid Rows")
+
+        mock_db = MockDatabase(campaign_ids=[1])
+        donation = Donation(mock_db)
+        batch = [(6, 1, 10.00), (6, 99, 15.00), (6, 1, -5), (6, 1, "abc"), (6, 1, float("nan")), (6, 1, float("inf"))]
+
+        output, results = self.capture_output(donation.donate_many, batch)
+
+        statuses = [row["status"] for row in results]
+        print(f"Statuses: {statuses}")
+        self.assertEqual(statuses, ["ok", "campaign_not_found"] + ["invalid_amount"] * 4)
+        self.assertIn("✅ Recorded 1 of 6 donations.", output)
+
+    def test_donate_many_rolls_back_on_error(self):
+        """Test a failing statement rolls back the whole batch"""
+        print("\n🧪 TEST: Donate Many - Rollback on Error")
+
+        mock_db = MockDatabase(campaign_ids=[1])
+
+        def failing_executemany(self, query, seq_params):
+            raise Exception("Database error")
+
+        original = MockCursor.executemany
+        MockCursor.executemany = failing_executemany
+        try:
+            output, results = self.capture_output(Donation(mock_db).donate_many, [(6, 1, 10.00)])
+        finally:
+            MockCursor.executemany = original
+
+        print(f"Actual output: '{output.strip()}'")
+        self.assertEqual(mock_db.rollbacks, 1)
+        self.assertEqual(mock_db.commits, 0)
+        self.assertEqual([row["status"] for row in results], ["failed"])
+        self.assertIn("❌ Bulk donation failed", output)
+
+    def test_donate_with_payment_success(self):
+        """Test the debit, funds update, stats and donor total updates and insert share one commit"""
+        print("\n🧪 TEST: Donate With Payment - Success Case")
+
+        mock_db = MockDatabase(campaign_ids=[2], balances={6: 100})
+        output, result = self.capture_output(Donation(mock_db).donate_with_payment, 6, 2, 40.0)
+
+        print(f"Actual output: '{output.strip()}'")
+        print(f"Statements: {len(mock_db.executed_queries)}, commits: {mock_db.commits}")
+        self.assertTrue(result)
+        self.assertEqual(len(mock_db.executed_queries), 5)
+        self.assertEqual(mock_db.commits, 1)
+        self.assertIn("✅ Successfully donated $40.00 to campaign ID: 2", output)
+
+    def test_donate_with_payment_insufficient_balance(self):
+        """Test a donor without enough balance is rolled back before any insert"""
+        print("\n🧪 TEST: Donate With Payment - Insufficient Balance")
+
+        mock_db = MockDatabase(campaign_ids=[2], balances={6: 10})
+        output, result = self.capture_output(Donation(mock_db).donate_with_payment, 6, 2, 40.0)
+
+        print(f"Actual output: '{output.strip()}'")
+        self.assertFalse(result)
+        self.assertEqual(mock_db.rollbacks, 1)
+        self.assertFalse(any(q.startswith("INSERT") for q in mock_db.executed_queries))
+        self.assertIn("Insufficient balance! Please add funds.", output)
+
+    def test_donate_with_payment_unknown_campaign(self):
+        """Test the debit is rolled back when the campaign does not exist"""
+        print("\n🧪 TEST: Donate With Payment - Unknown Campaign")
+
+        mock_db = MockDatabase(campaign_ids=[2], balances={6: 100})
+        output, result = self.capture_output(Donation(mock_db).donate_with_payment, 6, 99, 40.0)
+
+        print(f"Actual output: '{output.strip()}'")
+        self.assertFalse(result)
+        self.assertEqual(mock_db.rollbacks, 1)
+        self.assertIn("❌ Campaign ID 99 does not exist.", output)
+
+    def test_donate_with_payment_rejects_bad_amounts(self):
+        """Test negative, zero, non-finite and fractional-cent amounts never reach the database"""
+        print("\n🧪 TEST: Donate With Payment - Invalid Amounts")
+
+        mock_db = MockDatabase(campaign_ids=[2], balances={6: 100})
+        donation = Donation(mock_db)
+        results = [donation.donate(6, 2, amount) for amount in (-500, 0, float("nan"), float("inf"), 1.005, "abc")]
+
+        print(f"Results: {results}")
+        self.assertEqual([ok for ok, _ in results], [False] * 6)
+        self.assertIn("❌ Donation amount must be positive.", results[0][1])
+        self.assertEqual(mock_db.executed_queries, [])
+
+    def test_donation_history_keyset_pages(self):
+        """Test keyset pages cover the whole history exactly once, newest first"""
+        print("\n🧪 TEST: Donation History - Keyset Pagination")
+
+        db = make_sqlite_db()
+        donation = Donation(db)
+        seen = []
+        after = None
+        while True:
+            page = donation.get_donation_history_page(6, page_size=4, after=after)
+            seen.extend(row[3] for row in page)
+            if len(page) < 4:
+                break
+            after = (page[-1][2], page[-1][3])
+        streamed = [row[0] for row in db.stream(
+            "SELECT donation_id FROM donations WHERE user_id = %s ORDER BY donation_date DESC, donation_id DESC",
+            (6,), chunk_size=2)]
+
+        print(f"Donation IDs by page: {seen}")
+        self.assertEqual(seen, [17, 15, 9, 8, 7, 6])
+        self.assertEqual(streamed, seen)
+
+    def test_campaign_stats_match_rebuild(self):
+        """Test incremental stats agree with a rebuild from the donations ledger"""
+        print("\n🧪 TEST: Campaign Stats - Incremental vs Rebuild")
+
+        db = make_sqlite_db(migrate=True)
+        donation = Donation(db)
+        stats = CampaignStats(db)
+        self.capture_output(donation.donate_with_payment, 9, 2, 75.0)
+        self.capture_output(donation.donate_to_campaign, 6, 2, 10.0)
+        self.capture_output(donation.donate_many, [(9, 2, 5.0), (8, 2, 20.0), (8, 3, 1.0)])
+        incremental = stats.for_campaign(2)
+        self.capture_output(stats.rebuild, [2])
+        rebuilt = stats.for_campaign(2)
+
+        print(f"Incremental: {incremental}")
+        print(f"Rebuilt: {rebuilt}")
+        for key in ("total_amount", "donation_count", "unique_donors", "largest_gift", "first_donation_at"):
+            self.assertEqual(incremental[key], rebuilt[key], key)
+
+if __name__ == "__main__":
+    unittest.main()
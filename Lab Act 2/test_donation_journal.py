@@ -0,0 +1,155 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+# Import the write-behind journal
+from donation import Donation
+from donation_journal import DonationJournal
+from test_backends import make_sqlite_db
+
+class TestDonationJournal(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite file and a journal path next to it"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = make_sqlite_db(os.path.join(self.directory.name, "journal.db"), migrate=True)
+        self.path = os.path.join(self.directory.name, "donations.journal")
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+        self.directory.cleanup()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def funds_raised(self, campaign_id):
+        return float(self.db.fetch_one("SELECT funds_raised FROM campaigns WHERE campaign_id = %s", (campaign_id,))[0])
+
+    def test_donations_applied_in_group_commits(self):
+        """Test acknowledged donations reach the tables in batched transactions"""
+        print("\n🧪 TEST: Donation Journal - Group Commit")
+
+        before = self.funds_raised(2)
+        journal = DonationJournal(self.db, self.path, batch_size=3, max_latency_ms=10)
+        donation = Donation(self.db, journal=journal)
+        for amount in (1.0, 2.0, 3.0, 4.0):
+            self.capture_output(donation.donate_to_campaign, 9, 2, amount)
+        output, rejected = self.capture_output(donation.donate_to_campaign, 9, 999, 1.0)
+        journal.flush(timeout=5)
+        stats = journal.stats()
+        journal.close()
+
+        print(f"Journal stats: {stats}")
+        self.assertEqual(self.funds_raised(2), before + 10.0)
+        self.assertEqual(stats["applied"], 4)
+        self.assertLessEqual(stats["batches"], 4)
+        self.assertIsNone(rejected)
+        self.assertIn("❌ Campaign ID 999 does not exist.", output)
+
+    def test_replay_after_crash(self):
+        """Test unapplied entries are replayed once and a torn last line is dropped"""
+        print("\n🧪 TEST: Donation Journal - Crash Recovery")
+
+        before = self.funds_raised(2)
+        with open(self.path, "w", encoding="utf-8") as journal_file:
+            for seq in (1, 2):
+                journal_file.write(json.dumps({"seq": seq, "user_id": 6, "campaign_id": 2, "amount": "5.00",
+                                               "at": "2025-03-20 10:00:00"}) + "\n")
+            journal_file.write('{"seq": 3, "user_id": 6, "camp')
+
+        self.capture_output(lambda: DonationJournal(self.db, self.path).close())
+        after_replay = self.funds_raised(2)
+        self.capture_output(lambda: DonationJournal(self.db, self.path).close())
+        replayed = self.db.fetch("SELECT acknowledged_at FROM donations WHERE campaign_id = %s AND amount = %s",
+                                 (2, 5.0))
+
+        print(f"Funds before: {before}, after replay: {after_replay}, after restart: {self.funds_raised(2)}")
+        self.assertEqual(after_replay, before + 10.0)
+        self.assertEqual(self.funds_raised(2), after_replay)
+        self.assertEqual(len(replayed), 2)
+        self.assertEqual(str(replayed[0][0]), "2025-03-20 10:00:00")
+
+    def test_invalid_donations_rejected_before_acknowledging(self):
+        """Test unknown users and sub-cent or non-finite amounts never reach the journal"""
+        print("\n🧪 TEST: Donation Journal - Validation")
+
+        journal = DonationJournal(self.db, self.path)
+        try:
+            for user_id, amount, message in ((999, "5.00", "User ID 999 does not exist."),
+                                             (6, "0.001", "at most two decimal places"),
+                                             (6, "NaN", "must be positive")):
+                with self.assertRaises(ValueError) as raised:
+                    journal.append(user_id, 2, amount)
+                self.assertIn(message, str(raised.exception))
+            stats = journal.stats()
+        finally:
+            self.capture_output(journal.close)
+
+        print(f"Journal stats: {stats}")
+        self.assertEqual(stats["appended"], 0)
+
+    def test_entry_that_cannot_apply_is_dead_lettered(self):
+        """Test a bad entry is moved aside so the entries behind it still apply"""
+        print("\n🧪 TEST: Donation Journal - Dead Letters")
+
+        before = self.funds_raised(2)
+        with open(self.path, "w", encoding="utf-8") as journal_file:
+            for seq, user_id in ((1, 999), (2, 6)):
+                journal_file.write(json.dumps({"seq": seq, "user_id": user_id, "campaign_id": 2, "amount": "5.00",
+                                               "at": "2025-03-20 10:00:00"}) + "\n")
+
+        def replay():
+            journal = DonationJournal(self.db, self.path, fsync=False)
+            try:
+                return journal.flush(timeout=5), journal.stats()
+            finally:
+                journal.close()
+
+        output, (flushed, stats) = self.capture_output(replay)
+        with open(self.path + ".dead", encoding="utf-8") as dead_letters:
+            dead = [json.loads(line) for line in dead_letters]
+        self.capture_output(lambda: DonationJournal(self.db, self.path).close())
+
+        print(f"Journal stats: {stats}")
+        self.assertTrue(flushed)
+        self.assertEqual(stats["dead_lettered"], 1)
+        self.assertEqual(self.funds_raised(2), before + 5.0)
+        self.assertEqual([entry["user_id"] for entry in dead], [999])
+        self.assertIn("error", dead[0])
+        self.assertIn("⚠️ Journaled donation 1 can't be applied", output)
+
+    def test_entry_for_deleted_campaign_is_dead_lettered(self):
+        """Test an acknowledged donation whose campaign is gone is kept for a refund"""
+        print("\n🧪 TEST: Donation Journal - Deleted Campaign")
+
+        with open(self.path, "w", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps({"seq": 1, "user_id": 6, "campaign_id": 999, "amount": "5.00",
+                                           "at": "2025-03-20 10:00:00"}) + "\n")
+
+        def replay():
+            journal = DonationJournal(self.db, self.path, fsync=False)
+            try:
+                return journal.flush(timeout=5), journal.stats()
+            finally:
+                journal.close()
+
+        output, (flushed, stats) = self.capture_output(replay)
+        with open(self.path + ".dead", encoding="utf-8") as dead_letters:
+            dead = [json.loads(line) for line in dead_letters]
+
+        print(f"Journal stats: {stats}")
+        self.assertTrue(flushed)
+        self.assertEqual(stats["dead_lettered"], 1)
+        self.assertEqual([(entry["seq"], entry["amount"]) for entry in dead], [(1, "5.00")])
+        self.assertEqual(dead[0]["error"], "campaign no longer exists")
+        self.assertIn("⚠️ Journaled donation 1 can't be applied", output)
+
+if __name__ == "__main__":
+    unittest.main()
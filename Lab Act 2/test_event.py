@@ -1,11 +1,29 @@
 import unittest
+import datetime
 from unittest.mock import MagicMock
 import io
 import sys
-from contextlib import redirect_stdout
+from contextlib import contextmanager, redirect_stdout
 
 # Import the Event class
+from cache import TTLCache
 from event import Event
+from test_backends import make_sqlite_db
+
+class MockCursor:
+    """Mock cursor handed out by MockDatabase.transaction"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.db.executed_queries.append(query)
+        self.db.executed_params.append(params)
+        self.rowcount = self.db.insert_rowcount
+
+    def fetchall(self):
+        return self.db.mock_data
 
 class MockDatabase:
     """Mock Database class to simulate database interactions without actual DB connections"""
@@ -15,6 +33,7 @@ class MockDatabase:
         self.executed_params = []
         self.mock_data = mock_data or []
         self.last_insert_id = 0
+        self.insert_rowcount = 1
     
     def execute(self, query, params=None):
         self.executed_queries.append(query)
@@ -27,6 +46,10 @@ class MockDatabase:
         self.executed_params.append(params)
         return self.mock_data
 
+    @contextmanager
+    def transaction(self):
+        yield MockCursor(self)
+
 class TestEvent(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures before each test method"""
@@ -273,7 +296,85 @@ class TestEvent(unittest.TestCase):
         
         # Unittest assertion
         self.assertTrue(is_success)
-        
+
+    def test_volunteer_single_statement_and_roster(self):
+        """Test a signup with the name known is one statement, repeats are rejected and rosters skip bad rows"""
+        print("\n🧪 TEST: Volunteer For Event - Single Statement And Roster")
+
+        db = make_sqlite_db(migrate=True)
+        event = Event(db)
+        db.execute("DELETE FROM event_volunteers")
+        executed = []
+        hook = db.add_query_hook(executed.append)
+
+        first, _ = self.capture_output(event.volunteer_for_event, 9, 1, "Billymer")
+        statements = len(executed)
+        db.remove_query_hook(hook)
+        again, _ = self.capture_output(event.volunteer_for_event, 9, 1, "Billymer")
+        output, registered = self.capture_output(event.volunteer_many, 1, [1, 6, 8, 9, 999, 6])
+        rows = db.fetch("SELECT user_id FROM event_volunteers WHERE event_id = %s ORDER BY user_id", (1,))
+
+        print(f"Statements per signup: {statements}, roster registered: {registered}, rows: {rows}")
+        self.assertIn("✅ Billymer, you have successfully volunteered for the event!", first)
+        self.assertEqual(statements, 1)
+        self.assertIn("ℹ️ You have already volunteered for this event.", again)
+        self.assertEqual(registered, 3)
+        self.assertIn("✅ Registered 3 of 5 volunteers for event 1.", output)
+        self.assertEqual([row[0] for row in rows], [1, 6, 8, 9])
+        
+    def test_opt_out_only_updates_index_after_delete(self):
+        """Test a failed or empty DELETE leaves the event index alone"""
+        print("\n🧪 TEST: Opt Out - Failed Delete")
+
+        index = MagicMock()
+        mock_db = MockDatabase()
+        event = Event(mock_db, index=index)
+        mock_db.insert_rowcount = 0
+        not_registered = event.opt_out(1, 1)
+
+        @contextmanager
+        def failing_transaction():
+            raise Exception("Lock wait timeout")
+            yield
+
+        mock_db.transaction = failing_transaction
+        failed = event.opt_out(1, 1)
+        mock_db.transaction = MockDatabase.transaction.__get__(mock_db)
+        mock_db.insert_rowcount = 1
+        removed = event.opt_out(1, 1)
+
+        print(f"Results: {not_registered}, {failed}, {removed}")
+        self.assertEqual((not_registered[0], failed[0], removed[0]), (False, False, True))
+        self.assertIn("Lock wait timeout", failed[1])
+        index.volunteers_changed.assert_called_once_with(1, -1)
+
+    def test_active_events_pages_and_cached_signups(self):
+        """Test upcoming events are paged by date and the cached joined set follows signups"""
+        print("\n🧪 TEST: Active Events - Paging And Cached Signups")
+
+        db = make_sqlite_db(migrate=True)
+        cache = TTLCache()
+        event = Event(db, cache)
+        today = datetime.date.today()
+        for days, name in ((3, "Later"), (1, "Soon"), (1, "Soon Too"), (-5, "Past")):
+            db.execute("INSERT INTO events (user_id, name, description, date, location) VALUES (%s, %s, %s, %s, %s)",
+                       (8, name, "Help out", today + datetime.timedelta(days=days), "Batangas City"))
+
+        first = event.get_active_events(9, page_size=2)
+        rest = event.get_active_events(9, page_size=2, after=(first[-1][3], first[-1][0]))
+        self.capture_output(event.volunteer_for_event, 9, first[0][0])
+        after_signup = event.get_active_events(9, page_size=None)
+        uncached = Event(db).get_active_events(9, page_size=None)
+        self.capture_output(event.opt_out_of_event, 9, first[0][0])
+        after_opt_out = event.get_active_events(9, page_size=None)
+
+        print(f"Pages: {[e[1] for e in first]} {[e[1] for e in rest]}, after signup: {[e[1] for e in after_signup]}")
+        self.assertEqual([e[1] for e in first + rest], ["Soon", "Soon Too", "Later"])
+        self.assertEqual([e[1] for e in after_signup], ["Soon Too", "Later"])
+        self.assertEqual(after_signup, uncached)
+        self.assertEqual([e[1] for e in after_opt_out], ["Soon", "Soon Too", "Later"])
+        self.assertGreater(cache.stats()["hits"], 0)
+
     def test_view_volunteer_history_with_data(self):
         """Test viewing volunteer history when data exists"""
         print("\n🧪 TEST: View Volunteer History - With Data")
@@ -0,0 +1,91 @@
+import unittest
+import io
+import datetime
+from contextlib import redirect_stdout
+
+# Import the event discovery index and the Event class that keeps it current
+from event import Event
+from event_index import EventIndex, normalize_location
+from test_backends import make_sqlite_db
+
+class TestEventIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database with upcoming events in three places"""
+        self.db = make_sqlite_db(migrate=True)
+        self.today = datetime.date.today()
+        self.ids = {}
+        for name, days, location, status in (("Beach", 5, "Batangas City", "active"),
+                                             ("Trees", 6, "BATANGAS CITY", "active"),
+                                             ("Books", 6, "Lipa City", "active"),
+                                             ("Closed", 6, "Batangas Port", "inactive"),
+                                             ("Later", 40, "Batangas City", "active")):
+            self.ids[name] = self.db.execute(
+                "INSERT INTO events (user_id, name, description, date, location, status) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                (8, name, "Test event", self.today + datetime.timedelta(days=days), location, status))
+        self.db.execute("INSERT INTO event_volunteers (user_id, event_id, name) VALUES (%s, %s, %s)",
+                        (6, self.ids["Trees"], "nil"))
+        self.index = EventIndex(self.db)
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def test_index_and_sql_agree(self):
+        """Test date range, location prefix, status and signup filters give the same pages both ways"""
+        print("\n🧪 TEST: Event Index - Same Results As SQL")
+
+        indexed, plain = Event(self.db, index=self.index), Event(self.db)
+        weekend = (self.today + datetime.timedelta(days=5), self.today + datetime.timedelta(days=7))
+        filters = [
+            {"start": weekend[0], "end": weekend[1], "location": "BATANGAS"},
+            {"location": "batangas city"},
+            {"start": weekend[0], "end": weekend[1], "status": None},
+            {"start": weekend[0], "end": weekend[1], "user_id": 6},
+            {"location": "lipa", "page_size": 1, "after": (weekend[0], self.ids["Books"])},
+        ]
+        for kwargs in filters:
+            self.assertEqual(indexed.find_events(**kwargs), plain.find_events(**kwargs), kwargs)
+
+        rows = indexed.find_events(weekend[0], weekend[1], "batangas")
+        first = indexed.find_events(weekend[0], weekend[1], "batangas", page_size=1)
+        second = indexed.find_events(weekend[0], weekend[1], "batangas", page_size=1,
+                                     after=(first[0][3], first[0][0]))
+        print(f"Weekend in Batangas: {rows}")
+        self.assertEqual([row[1] for row in rows], ["Beach", "Trees"])
+        self.assertEqual(rows[1][5], 1)
+        self.assertEqual([row[1] for row in first + second], ["Beach", "Trees"])
+        self.assertEqual(normalize_location(" Batangas  City,"), "batangas city")
+
+    def test_changes_keep_index_current(self):
+        """Test created events, signups and opt-outs show up at once, and older ranges fall back to SQL"""
+        print("\n🧪 TEST: Event Index - Incremental Updates")
+
+        event = Event(self.db, index=self.index)
+        when = self.today + datetime.timedelta(days=6)
+        self.capture_output(event.create_event, 8, "Clinic", "Help out", when.isoformat(), "Batangas City")
+        self.db.execute("DELETE FROM events WHERE name = %s", ("Trees",))
+        created = event.find_events(when, when, "batangas")
+        clinic_id = created[0][0]
+
+        event.volunteer(6, clinic_id)
+        event.volunteer(9, clinic_id)
+        event.opt_out(6, clinic_id)
+        counts = {row[1]: row[5] for row in event.find_events(when, when)}
+        past = event.find_events(datetime.date(2025, 3, 1), datetime.date(2025, 3, 31))
+
+        print(f"Volunteer counts: {counts}, past events: {past}")
+        self.assertEqual([row[1] for row in created], ["Clinic"])
+        self.assertEqual(counts, {"Books": 0, "Clinic": 1})
+        self.assertNotIn(self.ids["Trees"], self.index)
+        self.assertEqual([row[1] for row in past], ["Fun RUn "])
+
+if __name__ == '__main__':
+    unittest.main()
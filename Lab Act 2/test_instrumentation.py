@@ -0,0 +1,76 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+
+# Import the instrumentation helpers
+from backends import SQLiteBackend
+from database import Database
+from instrumentation import normalize_sql
+
+class TestQueryInstrumentation(unittest.TestCase):
+    def make_db(self, **kwargs):
+        """Helper method to build an instrumented in-memory database"""
+        with redirect_stdout(io.StringIO()):
+            return Database(backend=SQLiteBackend(), **kwargs)
+
+    def test_normalize_sql(self):
+        """Test literals, placeholders and value lists collapse to one shape"""
+        print("\n🧪 TEST: Instrumentation - Normalize SQL")
+
+        first = normalize_sql("SELECT * FROM users\n  WHERE email = 'a@b.c' AND user_id IN (%s, %s, %s)")
+        second = normalize_sql("SELECT * FROM users WHERE email = %s AND user_id IN (%s, %s)")
+        insert = normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+
+        print(f"Normalized: '{first}'")
+        print(f"Normalized insert: '{insert}'")
+        self.assertEqual(first, second)
+        self.assertEqual(first, "SELECT * FROM users WHERE email = ? AND user_id IN (...)")
+        self.assertEqual(insert, "INSERT INTO t (a, b) VALUES (?, ?), ...")
+
+    def test_stats_grouped_by_statement(self):
+        """Test calls and returned rows are aggregated per normalized statement"""
+        print("\n🧪 TEST: Instrumentation - Stats Snapshot")
+
+        db = self.make_db()
+        for user_id in (1, 6, 8):
+            db.fetch("SELECT name FROM users WHERE user_id = %s", (user_id,))
+        db.fetch("SELECT donation_id FROM donations")
+        stats = db.query_stats()
+        entry = stats["SELECT name FROM users WHERE user_id = ?"]
+
+        print(f"Actual stats: {entry}")
+        self.assertEqual(entry["calls"], 3)
+        self.assertEqual(entry["rows"], 3)
+        self.assertEqual(stats["SELECT donation_id FROM donations"]["rows"], 6)
+
+    def test_slow_queries_logged_with_plan(self):
+        """Test slow statements reach the structured log with an EXPLAIN plan"""
+        print("\n🧪 TEST: Instrumentation - Slow Query Log")
+
+        db = self.make_db(slow_query_ms=0, explain_slow_queries=True)
+        with self.assertLogs("donations.slow_query", level="WARNING") as logs:
+            db.fetch("SELECT campaign_id FROM donations WHERE user_id = %s", (6,))
+
+        print(f"Log output: {logs.output[0]}")
+        self.assertIn('"slow": true', logs.output[0])
+        self.assertIn('"plan"', logs.output[0])
+
+    def test_hooks_receive_events(self):
+        """Test subscribed hooks see every statement, including transactions"""
+        print("\n🧪 TEST: Instrumentation - Hooks")
+
+        db = self.make_db()
+        events = []
+        hook = db.add_query_hook(events.append)
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE users SET balance = balance + %s WHERE user_id = %s", (1, 6))
+        db.remove_query_hook(hook)
+        db.fetch("SELECT 1")
+
+        print(f"Events: {events}")
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["rows"], 1)
+        self.assertEqual(events[0]["sql"], "UPDATE users SET balance = balance + ? WHERE user_id = ?")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+# Import the leaderboard service
+from donation import Donation
+from leaderboard import BoundedRanking, Leaderboards
+from test_backends import make_sqlite_db
+
+class TestLeaderboards(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database with three more campaigns for organization 8"""
+        self.db = make_sqlite_db(migrate=True)
+        for title, goal, raised in (("Books", 1000, 900), ("Water", 5000, 1000), ("Roof", 800, 100)):
+            self.db.execute(
+                "INSERT INTO campaigns (title, description, goal_amount, funds_raised, deadline, user_id) "
+                "VALUES (%s, %s, %s, %s, %s, %s)", (title, "Test campaign", goal, raised, "2030-01-01", 8))
+        self.ids = {row[1]: row[0] for row in self.db.fetch("SELECT campaign_id, title FROM campaigns")}
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def test_bounded_ranking_keeps_best_entries(self):
+        """Test the ranking stays sorted, bounded and ignores stale lower scores"""
+        print("\n🧪 TEST: Leaderboards - Bounded Ranking")
+
+        ranking = BoundedRanking(size=2, capacity=3)
+        for item_id, score in ((1, 5), (2, 9), (3, 7), (4, 1), (1, 8)):
+            ranking.offer(item_id, score)
+        ranking.offer(2, 3)
+        top = [(item_id, score) for item_id, score, _ in ranking.top(3)]
+
+        print(f"Top: {top}, complete: {ranking.complete}")
+        self.assertEqual(top, [(2, 9), (1, 8), (3, 7)])
+        self.assertFalse(ranking.complete)
+        ranking.remove(2)
+        ranking.remove(1)
+        self.assertTrue(ranking.needs_reload)
+
+    def test_donations_update_boards(self):
+        """Test boards load on startup and follow donations made through Donation"""
+        print("\n🧪 TEST: Leaderboards - Incremental Updates")
+
+        boards = Leaderboards(self.db, size=2, slack=1)
+        before = [row[0] for row in boards.nearest_to_goal()]
+        donation = Donation(self.db, leaderboard=boards)
+        self.capture_output(donation.donate_to_campaign, 9, self.ids["Water"], 4000.00)
+        self.capture_output(donation.donate_with_payment, 6, self.ids["Roof"], 500.00)
+
+        top = [(row[0], row[1]) for row in boards.top_campaigns()]
+        nearest = [row[0] for row in boards.nearest_to_goal()]
+        donors = [(row[0], row[1]) for row in boards.top_donors()]
+        organization = [row[0] for row in boards.top_campaigns_for_organization(8, 3)]
+
+        print(f"Top: {top}\nNearest before: {before}, after: {nearest}\nDonors: {donors}")
+        self.assertEqual(before, [self.ids["Books"], self.ids["Water"]])
+        self.assertEqual(top, [(self.ids["Water"], Decimal("5000.00")), (2, Decimal("4231.00"))])
+        self.assertEqual(nearest, [self.ids["Books"], self.ids["Roof"]])
+        self.assertEqual(donors, [(6, Decimal("9842.00")), (9, Decimal("4000.00"))])
+        self.assertEqual(organization, [self.ids["Water"], 2, self.ids["Books"]])
+        self.assertEqual(self.db.fetch("SELECT user_id, total_amount FROM donor_totals ORDER BY user_id"),
+                         self.db.fetch("SELECT user_id, SUM(amount) FROM donations GROUP BY user_id ORDER BY user_id"))
+
+    def test_short_board_reloads_alone_in_the_background(self):
+        """Test a board emptied by reached goals is reloaded off the read path without touching the others"""
+        print("\n🧪 TEST: Leaderboards - Background Reload")
+
+        boards = Leaderboards(self.db, size=1, slack=0)
+        donation = Donation(self.db, leaderboard=boards)
+        # A change only the database knows about; a reload of the donors board would pick it up
+        self.db.execute("UPDATE donor_totals SET total_amount = 1 WHERE user_id = 6")
+        # Books reaches its goal and leaves the one-entry "nearest" board, which is now short
+        self.capture_output(donation.donate_to_campaign, 9, self.ids["Books"], 100.00)
+        boards.wait_for_reloads(timeout=5)
+
+        nearest = [row[0] for row in boards.nearest_to_goal()]
+        donors = [(row[0], row[1]) for row in boards.top_donors()]
+
+        print(f"Nearest after reload: {nearest}, donors: {donors}")
+        self.assertEqual(nearest, [self.ids["Water"]])
+        self.assertEqual(donors, [(6, Decimal("9342.00"))])
+
+if __name__ == "__main__":
+    unittest.main()
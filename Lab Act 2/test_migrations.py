@@ -0,0 +1,98 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+
+# Import the migration runner
+from migrations import MigrationRunner
+from test_backends import make_sqlite_db
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        """Set up a fresh embedded database with the sample data"""
+        self.db = make_sqlite_db()
+        self.runner = MigrationRunner(self.db)
+
+    def run_quietly(self, func, *args):
+        with redirect_stdout(io.StringIO()):
+            return func(*args)
+
+    def index_names(self):
+        rows = self.db.fetch("SELECT name FROM sqlite_master WHERE type = 'index'")
+        return {row[0] for row in rows}
+
+    def test_migrate_records_versions(self):
+        """Test migrations apply in order, are recorded and are not re-applied"""
+        print("\n🧪 TEST: Migrations - Apply and Record")
+
+        applied = self.run_quietly(self.runner.migrate)
+        applied_again = self.run_quietly(self.runner.migrate)
+
+        print(f"Applied: {applied}, second run: {applied_again}")
+        self.assertEqual(applied[:2], [1, 2])
+        self.assertEqual(applied_again, [])
+        self.assertEqual(self.runner.applied_versions()[:2], [1, 2])
+        self.assertIn("idx_donations_user_date", self.index_names())
+
+    def test_migrate_to_target_and_rollback(self):
+        """Test migrating to a version and rolling back drops the indexes again"""
+        print("\n🧪 TEST: Migrations - Target Version and Rollback")
+
+        self.run_quietly(self.runner.migrate, 1)
+        version_after_up = self.runner.current_version()
+        self.run_quietly(self.runner.rollback, 0)
+
+        print(f"Version after up: {version_after_up}, after rollback: {self.runner.current_version()}")
+        self.assertEqual(version_after_up, 1)
+        self.assertEqual(self.runner.current_version(), 0)
+        self.assertNotIn("idx_donations_user_date", self.index_names())
+
+    def test_rerun_after_partial_failure(self):
+        """Test a migration whose DDL was partly committed before it failed applies cleanly on the rerun"""
+        print("\n🧪 TEST: Migrations - Resume After Partial Failure")
+
+        self.run_quietly(self.runner.migrate, 2)
+        # What MySQL keeps of migration 3 when its INSERT fails: the table and index, but no version row
+        self.db.execute("CREATE TABLE campaign_stats (campaign_id INT NOT NULL PRIMARY KEY, "
+                        "total_amount DECIMAL(12,2) NOT NULL DEFAULT 0, donation_count INT NOT NULL DEFAULT 0, "
+                        "unique_donors INT NOT NULL DEFAULT 0, first_donation_at TIMESTAMP DEFAULT NULL, "
+                        "last_donation_at TIMESTAMP DEFAULT NULL, largest_gift DECIMAL(10,2) NOT NULL DEFAULT 0)")
+        self.db.execute("CREATE INDEX idx_donations_campaign_user ON donations (campaign_id, user_id)")
+        applied = self.run_quietly(self.runner.migrate, 3)
+        stats = self.db.fetch_one("SELECT total_amount FROM campaign_stats WHERE campaign_id = 2")
+
+        print(f"Applied on rerun: {applied}, campaign 2 stats: {stats}")
+        self.assertEqual(applied, [3])
+        self.assertEqual(float(stats[0]), 9342.0)
+
+    def test_email_indexes_left_to_the_unique_key(self):
+        """Test login relies on UNIQUE KEY email and no migration adds an (email, password) index"""
+        print("\n🧪 TEST: Migrations - Email Index")
+
+        self.run_quietly(self.runner.migrate, 7)
+        before_login_migration = self.index_names()
+        applied = self.run_quietly(self.runner.migrate)
+        indexes = self.index_names()
+
+        print(f"Applied: {applied}, user indexes: {sorted(name for name in indexes if 'users' in name)}")
+        self.assertEqual(applied[0], 8)
+        self.assertNotIn("idx_users_email_password", before_login_migration)
+        self.assertNotIn("idx_users_email_password", indexes)
+
+    def test_volunteer_duplicates_removed_and_blocked(self):
+        """Test the unique volunteer key removes duplicates and rejects new ones"""
+        print("\n🧪 TEST: Migrations - Unique Volunteer Signup")
+
+        self.run_quietly(self.runner.migrate, 2)
+        remaining = self.db.fetch("SELECT volunteer_id FROM event_volunteers WHERE user_id = 6 AND event_id = 1")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.db.execute("INSERT INTO event_volunteers (user_id, event_id, name) VALUES (%s, %s, %s)",
+                            (6, 1, "nil"))
+
+        print(f"Remaining signups: {remaining}")
+        print(f"Duplicate insert output: '{output.getvalue().strip()}'")
+        self.assertEqual(remaining, [(2,)])
+        self.assertIn("UNIQUE constraint failed", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
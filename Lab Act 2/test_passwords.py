@@ -0,0 +1,111 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+
+# Import the password hashing helpers and the User class that uses them
+from passwords import PasswordHasher, hash_password, is_hashed, needs_rehash, rehash_all, verify_password
+from test_backends import make_sqlite_db
+from user import User
+
+# Cheap enough for tests; production hashes use DEFAULT_COST
+COST = 4
+
+class TestPasswords(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database and a User with an inline hasher"""
+        self.db = make_sqlite_db(migrate=True)
+        self.hasher = PasswordHasher(cost=COST, workers=0)
+        self.user = User(self.db, self.hasher)
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def stored_password(self, user_id):
+        return self.db.fetch_one("SELECT password FROM users WHERE user_id = %s", (user_id,))[0]
+
+    def test_hashes_are_salted_and_carry_their_cost(self):
+        """Test two hashes of one password differ, verify, and go stale when the cost changes"""
+        print("\n🧪 TEST: Passwords - Hash Format")
+
+        first, second = hash_password("secret", COST), hash_password("secret", COST)
+
+        print(f"Hash: {first}")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith(f"scrypt${COST}$"))
+        self.assertTrue(verify_password("secret", first))
+        self.assertFalse(verify_password("Secret", first))
+        self.assertFalse(needs_rehash(first, COST))
+        self.assertTrue(needs_rehash(first, COST + 1))
+        self.assertTrue(needs_rehash("secret", COST))
+
+    def test_login_rehashes_plaintext_passwords(self):
+        """Test a plaintext row logs in once and is stored hashed; new and updated passwords are hashed"""
+        print("\n🧪 TEST: Passwords - Transparent Rehash On Login")
+
+        first = self.user.login("nil", "123")
+        rehashed = self.stored_password(6)
+        second = self.user.login("nil", "123")
+        wrong = self.user.login("nil", "wrong")
+        unknown = self.user.login("nobody@example.com", "123")
+        _, user_id = self.capture_output(self.user.register, "Bea", "bea@example.com", "pw1", "donor")
+        self.capture_output(self.user.update_profile, user_id, "Bea", "bea@example.com", "pw2")
+
+        print(f"Stored after first login: {rehashed}")
+        self.assertEqual(first, ((6, "nil", "nil", "donor"), True))
+        self.assertTrue(is_hashed(rehashed))
+        self.assertEqual(second, first)
+        self.assertEqual(self.stored_password(6), rehashed)
+        self.assertIsNone(wrong)
+        self.assertIsNone(unknown)
+        self.assertTrue(verify_password("pw2", self.stored_password(user_id)))
+        self.assertEqual(self.user.login("bea@example.com", "pw2")[0][0], user_id)
+
+    def test_rehash_all_counts_only_written_rows(self):
+        """Test rehash_all converts every plaintext password but doesn't count one changed meanwhile"""
+        print("\n🧪 TEST: Passwords - Rehash All")
+
+        db, hasher = self.db, self.hasher
+
+        class ChangingHasher:
+            """Changes user 9's password while its hash is being computed"""
+
+            def hash_future(self, password):
+                if password == "floodro":
+                    db.execute("UPDATE users SET password = %s WHERE user_id = %s", ("changed", 9))
+                return hasher.hash_future(password)
+
+        converted = rehash_all(self.db, ChangingHasher())
+
+        print(f"Converted: {converted}")
+        self.assertEqual(converted, 3)
+        self.assertTrue(all(is_hashed(self.stored_password(user_id)) for user_id in (1, 6, 8)))
+        self.assertEqual(self.stored_password(9), "changed")
+
+    def test_process_pool_checks(self):
+        """Test hashing and checking on worker processes give the same answers"""
+        print("\n🧪 TEST: Passwords - Process Pool")
+
+        hasher = PasswordHasher(cost=COST, workers=2)
+        try:
+            stored = hasher.hash("secret")
+            results = [future.result() for future in (hasher.check_future("secret", stored),
+                                                      hasher.check_future("nope", stored),
+                                                      hasher.check_future("plain", "plain"))]
+        finally:
+            hasher.close()
+
+        print(f"Results: {[(ok, bool(new_hash)) for ok, new_hash in results]}")
+        self.assertEqual(results[0], (True, None))
+        self.assertEqual(results[1], (False, None))
+        self.assertTrue(results[2][0] and verify_password("plain", results[2][1]))
+
+if __name__ == '__main__':
+    unittest.main()
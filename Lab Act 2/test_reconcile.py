@@ -0,0 +1,93 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+# Import the reconciler and the donation path whose counter it checks
+from donation import Donation
+from reconcile import WATERMARK, FundsReconciler
+from test_backends import make_sqlite_db
+from watermarks import read_watermark
+
+class TestReconcile(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database with a second, consistent campaign"""
+        self.db = make_sqlite_db(migrate=True)
+        self.db.execute("INSERT INTO campaigns (campaign_id, user_id, title, description, goal_amount, deadline, "
+                        "status, funds_raised) VALUES (5, 8, 'Books', 'School books', 1000, '2099-01-01', "
+                        "'active', 0)")
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def test_reports_and_repairs_sample_drift(self):
+        """Test campaign 2's 4231.00 counter is reported against its 9342.00 ledger and repaired"""
+        print("\n🧪 TEST: Reconcile - Report And Repair")
+
+        reconciler = FundsReconciler(self.db, workers=0, chunk_size=2)
+        report = reconciler.run()
+        repaired = reconciler.run(repair=True)
+        clean = reconciler.run()
+
+        print(f"Report: {report['drift']} over {report['chunks']} chunks; repaired {repaired['repaired']}")
+        self.assertEqual(report["drift"], [(2, Decimal("4231.00"), Decimal("9342.00"))])
+        self.assertEqual((report["checked"], report["chunks"]), (2, 2))
+        self.assertEqual(repaired["repaired"], 1)
+        self.assertEqual(clean["drift"], [])
+        self.assertEqual(Decimal(str(self.db.fetch_one("SELECT funds_raised FROM campaigns WHERE campaign_id = 2")[0])),
+                         Decimal("9342"))
+
+    def test_incremental_checks_only_touched_campaigns(self):
+        """Test incremental runs follow the watermark and keep reporting drift until it is repaired"""
+        print("\n🧪 TEST: Reconcile - Incremental Watermark")
+
+        reconciler = FundsReconciler(self.db, workers=0, overlap=0)
+        first = reconciler.run(incremental=True)
+        watermark_after_report = read_watermark(self.db, WATERMARK)
+        reconciler.run(repair=True, incremental=True)
+        # A lost counter update on campaign 5, and a manual edit on untouched campaign 2
+        self.db.execute("INSERT INTO donations (user_id, campaign_id, amount, donation_date) "
+                        "VALUES (6, 5, 50, NOW())")
+        self.db.execute("UPDATE campaigns SET funds_raised = funds_raised + 1 WHERE campaign_id = 2")
+        self.capture_output(Donation(self.db).donate_to_campaign, 6, 5, 25)
+        incremental = reconciler.run(incremental=True)
+        full = reconciler.run()
+
+        print(f"Incremental: {incremental['drift']}; full: {full['drift']}")
+        self.assertEqual([row[0] for row in first["drift"]], [2])
+        self.assertEqual(watermark_after_report, 0)
+        self.assertEqual(incremental["checked"], 1)
+        self.assertEqual(incremental["drift"], [(5, Decimal("25.00"), Decimal("75.00"))])
+        self.assertEqual([row[0] for row in full["drift"]], [2, 5])
+
+    def test_worker_processes_agree_with_inline(self):
+        """Test summing chunks on worker processes finds the same drift"""
+        print("\n🧪 TEST: Reconcile - Worker Processes")
+
+        with tempfile.TemporaryDirectory() as directory:
+            db = make_sqlite_db(os.path.join(directory, "reconcile.db"), migrate=True)
+            try:
+                inline = FundsReconciler(db, workers=0, chunk_size=1).run()
+                parallel = FundsReconciler(db, workers=2, chunk_size=1).run()
+            finally:
+                with redirect_stdout(io.StringIO()):
+                    db.close()
+
+        print(f"Inline: {inline['drift']}; parallel: {parallel['drift']}")
+        self.assertEqual(parallel["drift"], inline["drift"])
+        self.assertEqual(parallel["checked"], inline["checked"])
+        with self.assertRaises(ValueError):
+            FundsReconciler(self.db, workers=2)
+
+if __name__ == '__main__':
+    unittest.main()
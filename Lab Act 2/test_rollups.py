@@ -0,0 +1,92 @@
+import unittest
+import io
+import datetime
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+# Import the rollup maintenance and query API
+from rollups import DonationRollups, plan_range
+from test_backends import make_sqlite_db
+
+class TestDonationRollups(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database with rollups built in small batches"""
+        self.db = make_sqlite_db(migrate=True)
+        self.rollups = DonationRollups(self.db, batch_size=4)
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+
+    def test_plan_uses_coarsest_buckets(self):
+        """Test a range is covered by months in the middle and days/hours at the edges"""
+        print("\n🧪 TEST: Donation Rollups - Range Plan")
+
+        plan = plan_range(datetime.datetime(2025, 1, 30, 5), datetime.datetime(2025, 4, 2, 3))
+
+        print(f"Plan: {plan}")
+        self.assertEqual([segment[0] for segment in plan], ["hour", "day", "month", "day", "hour"])
+        self.assertEqual(plan[2][1:], (datetime.datetime(2025, 2, 1), datetime.datetime(2025, 4, 1)))
+
+    def test_incremental_refresh_and_range_totals(self):
+        """Test new donations are folded in once and ranges add up across granularities"""
+        print("\n🧪 TEST: Donation Rollups - Incremental Refresh")
+
+        first = self.rollups.refresh()
+        self.db.execute("INSERT INTO donations (user_id, campaign_id, amount, donation_date) VALUES (%s, %s, %s, %s)",
+                        (9, 2, 8.00, "2025-04-01 09:30:00"))
+        second = self.rollups.refresh()
+        third = self.rollups.refresh()
+
+        march = self.rollups.totals("2025-03-01", "2025-04-01")
+        edges = self.rollups.totals("2025-03-13 10:00", "2025-04-01 10:00", organization_id=8)
+        daily = self.rollups.series("2025-03-01", "2025-05-01", "day", campaign_id=2)
+
+        print(f"Refreshed: {first}, {second}, {third}; March: {march}; edges: {edges}")
+        self.assertEqual((first, second, third), (6, 1, 0))
+        self.assertEqual(march, (Decimal("9342.00"), 6))
+        self.assertEqual(edges, (Decimal("5350.00"), 5))
+        self.assertEqual(daily[-1], (datetime.datetime(2025, 4, 1), Decimal("8.00"), 1))
+
+    def test_refresh_waits_for_late_commits(self):
+        """Test a donation that commits after a higher donation_id is still folded in"""
+        print("\n🧪 TEST: Donation Rollups - Late Commits")
+
+        self.rollups.refresh()
+        top = self.db.fetch_one("SELECT MAX(donation_id) FROM donations")[0]
+        insert = ("INSERT INTO donations (donation_id, user_id, campaign_id, amount, donation_date) "
+                  "VALUES (%s, %s, %s, %s, NOW())")
+        # The second new id commits first while the first is still in flight
+        self.db.execute(insert, (top + 2, 9, 2, 3.00))
+        early = self.rollups.refresh()
+        self.db.execute(insert, (top + 1, 9, 2, 4.00))
+        late = self.rollups.refresh()
+        # The third never commits; once the lag has passed, the fourth goes through
+        self.db.execute(insert, (top + 4, 9, 2, 5.00))
+        waiting = self.rollups.refresh()
+        lag_passed = DonationRollups(self.db, commit_lag=0).refresh()
+
+        print(f"Refreshed: {early}, {late}, {waiting}, {lag_passed}")
+        self.assertEqual((early, late, waiting, lag_passed), (0, 2, 0, 1))
+        self.assertEqual(self.rollups.check(), [])
+        self.assertEqual(self.rollups.totals("2025-01-01", "2100-01-01", campaign_id=2), (Decimal("9354.00"), 9))
+
+    def test_check_reports_drift_and_rebuild_fixes_it(self):
+        """Test the consistency checker finds a corrupted bucket until the rollups are rebuilt"""
+        print("\n🧪 TEST: Donation Rollups - Consistency Check")
+
+        self.rollups.refresh()
+        clean = self.rollups.check()
+        self.db.execute("UPDATE donation_rollups_daily SET total_amount = total_amount + 1 WHERE bucket_start = %s",
+                        (datetime.datetime(2025, 3, 14),))
+        drift = self.rollups.check()
+        self.rollups.rebuild()
+
+        print(f"Mismatches: {drift}")
+        self.assertEqual(clean, [])
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(drift[0][3:], ((Decimal("32.00"), 1), (Decimal("31.00"), 1)))
+        self.assertEqual(self.rollups.check(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+# Import the search index and the classes that feed it
+from campaign import Campaign
+from event import Event
+from search import SearchIndex, tokenize
+from test_backends import make_sqlite_db
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database and an index saved in a temporary directory"""
+        self.db = make_sqlite_db(migrate=True)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "index.json")
+        self.search = SearchIndex(self.db, self.path)
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+        self.directory.cleanup()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def test_created_campaigns_are_ranked_and_paged(self):
+        """Test new campaigns are searchable at once, best match first, one page at a time"""
+        print("\n🧪 TEST: Search - Ranked Campaign Results")
+
+        campaign = Campaign(self.db, search=self.search)
+        for title, description in (("Flood relief", "Flood relief for coastal towns after the flood"),
+                                   ("School books", "Books for the flood-hit school"),
+                                   ("Clinic roof", "Repairs to the clinic")):
+            self.capture_output(campaign.create_campaign, 8, title, description, 1000, "2030-01-01")
+        closed = self.db.execute(
+            "INSERT INTO campaigns (title, description, goal_amount, deadline, status, user_id) "
+            "VALUES (%s, %s, %s, %s, %s, %s)", ("Old flood fund", "Closed", 100, "2024-01-01", "closed", 8))
+        self.search.add_campaign(closed, "Old flood fund", "Closed")
+
+        count, first = self.search.search("The FLOOD relief", page_size=2)
+        _, second = self.search.search("The FLOOD relief", page=2, page_size=2)
+
+        print(f"Tokens: {tokenize('The FLOOD relief, 2025!')}, matches: {count}")
+        self.assertEqual(tokenize("The FLOOD relief, 2025!"), ["flood", "relief", "2025"])
+        # The closed campaign ranks second but is left out of its page
+        self.assertEqual(count, 3)
+        self.assertEqual([row[1] for row in first], ["Flood relief"])
+        self.assertEqual([row[1] for row in second], ["School books"])
+        self.assertGreater(first[0][-1], second[0][-1])
+
+    def test_saved_index_reads_only_new_rows(self):
+        """Test a restarted index loads from disk, reads only newer rows and forgets deleted ones"""
+        print("\n🧪 TEST: Search - Incremental Startup")
+
+        event = Event(self.db, search=self.search)
+        self.capture_output(event.create_event, 8, "Beach cleanup", "Pick up litter", "2099-01-01", "Lipa City")
+        self.search.save()
+        later = self.db.execute(
+            "INSERT INTO campaigns (title, description, goal_amount, deadline, user_id) VALUES (%s, %s, %s, %s, %s)",
+            ("Tree planting", "Plant trees", 500, "2030-01-01", 8))
+
+        restarted = SearchIndex(self.db, self.path, load=False)
+        read = restarted.refresh()
+        _, events = restarted.search("lipa", kind="event")
+        _, campaigns = restarted.search("trees planting")
+        self.db.execute("DELETE FROM campaigns WHERE campaign_id = %s", (later,))
+        count, _ = restarted.search("trees")
+        _, past = restarted.search("batangas", kind="event")
+
+        print(f"Rows read on restart: {read}, events: {events}")
+        self.assertEqual(read, 2)
+        self.assertEqual([row[1] for row in events], ["Beach cleanup"])
+        self.assertEqual([row[0] for row in campaigns], [later])
+        self.assertEqual(restarted.search("trees"), (0, []))
+        self.assertEqual(count, 1)
+        self.assertEqual(past, [])
+        self.assertEqual(restarted.size("event"), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+# Import the Session class and the cache it shares between sessions
+from cache import TTLCache, user_key
+from donation import Donation
+from passwords import PasswordHasher
+from session import Session
+from test_backends import make_sqlite_db
+from user import User
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        """Set up a migrated SQLite database, a shared user cache and a session for user 6"""
+        self.db = make_sqlite_db(migrate=True)
+        self.cache = TTLCache(ttl=60)
+        self.user = User(self.db, PasswordHasher(cost=4, workers=0), cache=self.cache)
+        self.session = Session(self.db, (6, "nil", "nil", "donor"), self.cache)
+
+    def tearDown(self):
+        with redirect_stdout(io.StringIO()):
+            self.db.close()
+
+    def capture_output(self, func, *args, **kwargs):
+        """Helper method to capture and return stdout from a function call"""
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            result = func(*args, **kwargs)
+        return captured_output.getvalue(), result
+
+    def stored_balance(self, user_id=6):
+        return Decimal(str(self.db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (user_id,))[0]))
+
+    def test_balance_writes_through(self):
+        """Test add_funds, process_payment and donate keep the cached balance equal to the row"""
+        print("\n🧪 TEST: Session - Write-Through Balance")
+
+        start = self.session.balance
+        added = self.session.add_funds(100)
+        paid = self.session.process_payment(30)
+        refused = self.session.process_payment(10 ** 9)
+        output, donated = self.capture_output(self.session.donate, Donation(self.db), 2, 20)
+        stats = self.session.stats()
+
+        print(output.strip())
+        print(f"Balance: {start} -> {self.session.balance}; stats: {stats}")
+        self.assertTrue(added)
+        self.assertTrue(paid)
+        self.assertFalse(refused)
+        self.assertTrue(donated)
+        self.assertEqual(self.session.balance, start + 50)
+        self.assertEqual(self.session.balance, self.stored_balance())
+        self.assertEqual(stats["round_trips"], 1)
+        self.assertEqual(stats["round_trips_saved"], 0)
+
+    def test_failed_add_funds_leaves_cache(self):
+        """Test the cached balance only moves when the UPDATE changed a row"""
+        print("\n🧪 TEST: Session - Failed Add Funds")
+
+        self.cache.set(user_key(999), {"name": "ghost", "email": "ghost", "role": "donor", "balance": Decimal("0")})
+        ghost = Session(self.db, (999, "ghost", "ghost", "donor"), self.cache)
+        added = ghost.add_funds(50)
+
+        print(f"Added: {added}, cached balance: {ghost.balance}")
+        self.assertFalse(added)
+        self.assertEqual(ghost.balance, Decimal("0"))
+
+    def test_cache_is_shared_and_invalidated_by_update_profile(self):
+        """Test a second session reuses the cached profile and update_profile drops it"""
+        print("\n🧪 TEST: Session - Shared Cache And Invalidation")
+
+        other = Session(self.db, (6, "nil", "nil", "donor"), self.cache)
+        names = [self.session.name, other.name, other.role]
+        self.capture_output(self.session.update_profile, self.user, "Nil", "nil", "123")
+        cached_after_update = self.cache.get(user_key(6))[0]
+        renamed = other.name
+
+        print(f"Names: {names} -> {renamed}; stats: {other.stats()}")
+        self.assertEqual(names, ["nil", "nil", "donor"])
+        self.assertFalse(cached_after_update)
+        self.assertEqual(renamed, "Nil")
+        self.assertEqual(self.session.stats()["round_trips"], 1)
+        self.assertEqual(other.stats(), {"lookups": 3, "round_trips": 1, "round_trips_saved": 2,
+                                         "hit_rate": 2 / 3})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+# Import the prepared-statement cache
+from statement_cache import StatementCache, StatementCacheStats
+from test_backends import make_sqlite_db
+
+class FakePreparedCursor:
+    """Stand-in for a server-side prepared cursor"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class TestStatementCache(unittest.TestCase):
+    def test_lru_eviction_closes_statement(self):
+        """Test the least recently used statement is evicted and closed"""
+        print("\n🧪 TEST: Statement Cache - LRU Eviction")
+
+        stats = StatementCacheStats()
+        cache = StatementCache(FakePreparedCursor, 2, stats)
+        first = cache.get("SELECT 1")
+        cache.get("SELECT 2")
+        cache.get("SELECT 1")
+        second_again = cache.get("SELECT 3")
+        snapshot = stats.snapshot()
+
+        print(f"Actual stats: {snapshot}")
+        self.assertFalse(first.closed)
+        self.assertIsNot(second_again, first)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((snapshot["hits"], snapshot["misses"], snapshot["evictions"]), (1, 3, 1))
+        self.assertEqual(snapshot["prepared"], 2)
+
+    def test_database_reuses_statements(self):
+        """Test repeated queries hit the cache and partial fetches don't leak rows"""
+        print("\n🧪 TEST: Statement Cache - Database Integration")
+
+        db = make_sqlite_db(statement_cache_size=8)
+        names = [db.fetch_one("SELECT name FROM users WHERE user_id = %s", (user_id,)) for user_id in (1, 6, 8)]
+        first_user = db.fetch_one("SELECT user_id FROM users ORDER BY user_id")
+        all_users = db.fetch("SELECT user_id FROM users ORDER BY user_id")
+        stats = db.statement_cache_stats()
+
+        print(f"Names: {names}, stats: {stats}")
+        self.assertEqual([name[0] for name in names], ["Alice", "nil", "yes"])
+        self.assertEqual(first_user, (1,))
+        self.assertEqual(len(all_users), 4)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_dynamic_sql_skips_cache(self):
+        """Test IN-lists, multi-row VALUES and EXPLAIN run without filling the cache"""
+        print("\n🧪 TEST: Statement Cache - Dynamic SQL")
+
+        db = make_sqlite_db(statement_cache_size=8)
+        counts = [db.fetch_one(f"SELECT COUNT(*) FROM users WHERE user_id IN ({', '.join(['%s'] * size)})",
+                               tuple(range(1, size + 1)))[0] for size in (2, 3, 4)]
+        db.execute("INSERT INTO donations (campaign_id, amount) VALUES (%s, %s), (%s, %s)", (2, 1, 2, 2))
+        name = db.fetch_one("SELECT name FROM users WHERE user_id IN (%s)", (6,))
+        stats = db.statement_cache_stats()
+
+        print(f"Counts: {counts}, stats: {stats}")
+        self.assertEqual(name, ("nil",))
+        self.assertEqual(stats["skipped"], 4)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["prepared"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,49 @@
+from cache import user_key
+from passwords import default_hasher
+
 class User:
-    def __init__(self, db):
+    def __init__(self, db, hasher=None, cache=None):
         self.__db = db  # ✅ Correct attribute
+        self.__hasher = hasher or default_hasher()
+        self.__cache = cache
 
     def register(self, name, email, password, role):
         query = "INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)"
-        self.__db.execute(query, (name, email, password, role))
+        user_id = self.__db.execute(query, (name, email, self.__hasher.hash(password), role))
         print("User registered successfully!")
+        return user_id
 
     def login(self, email, password):
-        query = "SELECT user_id, name, email, role FROM users WHERE email = %s AND password = %s"
-        result = self.__db.fetch(query, (email, password))
+        """Look the user up by e-mail and check the password against the stored hash.
 
-        if result and len(result) > 0:
-            return result[0], True  # User found, return user details
-        else:
+        A password still stored in plaintext, or hashed at another cost, is
+        replaced by a fresh hash on the way in.
+        """
+        query = "SELECT user_id, name, email, role, password FROM users WHERE email = %s ORDER BY user_id"
+        result = self.__db.fetch(query, (email,))
+        if not result:
+            self.__hasher.check(password, self.__hasher.decoy)
             return None
 
+        for row in result:
+            ok, new_hash = self.__hasher.check(password, row[4])
+            if not ok:
+                continue
+            if new_hash:
+                # Leave the row alone if the password changed since we read it
+                self.__db.execute("UPDATE users SET password = %s WHERE user_id = %s AND password = %s",
+                                  (new_hash, row[0], row[4]))
+            return tuple(row[:4]), True  # User found, return user details
+        return None
+
+
+    def get_balance(self, user_id):
+        result = self.__db.fetch_one("SELECT balance FROM users WHERE user_id = %s", (user_id,))
+        return result[0] if result else 0
 
     def update_profile(self, user_id, new_name, new_email, new_password):
         query = "UPDATE users SET name=%s, email=%s, password=%s WHERE user_id=%s"
-        self.__db.execute(query, (new_name, new_email, new_password, user_id))
+        self.__db.execute(query, (new_name, new_email, self.__hasher.hash(new_password), user_id))
+        if self.__cache is not None:
+            self.__cache.invalidate(user_key(user_id))
         print("Profile updated successfully!")
@@ -0,0 +1,65 @@
+"""Named progress markers stored in the ``watermarks`` table (migration 4).
+
+Background jobs record how far they got (a journal sequence, the last
+donation_id they processed, ...) with ``set_watermark`` on the cursor of the
+transaction that did the work, so the marker and the data always agree.
+
+An auto-increment id is taken at INSERT but only visible after COMMIT, so
+a job reading ``id > watermark`` can see id 11 while id 10 is still in an
+open transaction. ``committed`` cuts the rows off at such a gap until the
+row after it is ``lag`` seconds old; by then the missing id was rolled back.
+"""
+import datetime
+
+# Seconds a transaction may hold an uncommitted donation_id
+COMMIT_LAG = 60
+
+def get_watermark(cursor, name, default=0, for_update=False):
+    """Read a watermark; ``for_update`` locks it until the transaction ends."""
+    query = "SELECT value FROM watermarks WHERE name = %s"
+    if for_update:
+        query += " FOR UPDATE"
+    cursor.execute(query, (name,))
+    row = cursor.fetchone()
+    return row[0] if row else default
+
+def set_watermark(cursor, name, value):
+    # Look first: MySQL reports 0 affected rows for an UPDATE that changes nothing
+    cursor.execute("SELECT 1 FROM watermarks WHERE name = %s", (name,))
+    if cursor.fetchone():
+        cursor.execute("UPDATE watermarks SET value = %s, updated_at = NOW() WHERE name = %s", (value, name))
+    else:
+        cursor.execute("INSERT INTO watermarks (name, value, updated_at) VALUES (%s, %s, NOW())", (name, value))
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+def database_now(cursor):
+    """The database clock, which stamps ``NOW()`` defaults; the local clock may differ."""
+    cursor.execute("SELECT NOW()")
+    return _as_datetime(cursor.fetchone()[0])
+
+def committed(rows, last_id, now, lag=COMMIT_LAG, date_index=-1):
+    """Yield ``rows`` (ordered by the id in column 0) until a gap that may still fill.
+
+    ``now`` comes from ``database_now``; ``date_index`` is the column holding
+    the row's insert time. Every donation writer stamps ``donation_date``
+    with ``NOW()``; the journal keeps its acknowledgement time apart.
+    """
+    cutoff = now - datetime.timedelta(seconds=lag)
+    expected = last_id + 1
+    for row in rows:
+        inserted_at = row[date_index]
+        if row[0] != expected and inserted_at is not None and _as_datetime(inserted_at) > cutoff:
+            return
+        yield row
+        expected = row[0] + 1
+
+def read_watermark(db, name, default=0):
+    """``get_watermark`` in its own transaction."""
+    with db.transaction() as cursor:
+        return get_watermark(cursor, name, default)